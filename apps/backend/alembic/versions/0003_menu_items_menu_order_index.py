@@ -0,0 +1,21 @@
+"""Index menu_items by menu and display order
+
+Revision ID: 0003_menu_items_menu_order_index
+Revises: 0002_add_settings_menus
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0003_menu_items_menu_order_index'
+down_revision = '0002_add_settings_menus'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_menu_items_menu_id_order', 'menu_items', ['menu_id', 'order'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_menu_items_menu_id_order', table_name='menu_items')
@@ -0,0 +1,44 @@
+"""Add category_closure ancestry index and backfill it from categories.parent_id
+
+Revision ID: 0004_add_category_closure
+Revises: 0003_menu_items_menu_order_index
+Create Date: 2026-10-18 00:00:00.000001
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_add_category_closure'
+down_revision = '0003_menu_items_menu_order_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    closure = op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id'], name='fk_cclosure_ancestor'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['categories.id'], name='fk_cclosure_descendant'),
+    )
+    op.create_index('ix_category_closure_descendant_depth', 'category_closure', ['descendant_id', 'depth'])
+
+    # Backfill: walk each category up its parent chain (cycles and dangling parents stop the walk)
+    parents = dict(op.get_bind().execute(sa.text('SELECT id, parent_id FROM categories')).fetchall())
+    rows = []
+    for category_id in parents:
+        ancestor, depth, seen = category_id, 0, set()
+        while ancestor is not None and ancestor in parents and ancestor not in seen:
+            seen.add(ancestor)
+            rows.append({'ancestor_id': ancestor, 'descendant_id': category_id, 'depth': depth})
+            ancestor, depth = parents[ancestor], depth + 1
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_category_closure_descendant_depth', table_name='category_closure')
+    op.drop_table('category_closure')
@@ -0,0 +1,31 @@
+"""Add composite indexes for filtered content listings
+
+Revision ID: 0005_add_content_listing_indexes
+Revises: 0004_add_category_closure
+Create Date: 2026-10-18 00:00:00.000002
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0005_add_content_listing_indexes'
+down_revision = '0004_add_category_closure'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_contents_published_at', ['published_at']),
+    ('ix_contents_status_published_at', ['status', 'published_at']),
+    ('ix_contents_type_published_at', ['content_type', 'published_at']),
+    ('ix_contents_status_type_published_at', ['status', 'content_type', 'published_at']),
+    ('ix_contents_author_published_at', ['author_id', 'published_at']),
+]
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, 'contents', columns)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='contents')
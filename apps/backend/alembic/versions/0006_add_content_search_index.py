@@ -0,0 +1,36 @@
+"""Add the content full-text search index
+
+Revision ID: 0006_add_content_search_index
+Revises: 0005_add_content_listing_indexes
+Create Date: 2026-10-18 00:00:00.000003
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006_add_content_search_index'
+down_revision = '0005_add_content_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS contents_fts "
+            "USING fts5(title, excerpt, content, tokenize='unicode61')"
+        )
+        op.execute(
+            "INSERT INTO contents_fts (rowid, title, excerpt, content) "
+            "SELECT id, title, excerpt, content FROM contents"
+        )
+    elif dialect == 'mysql':
+        op.execute("CREATE FULLTEXT INDEX ft_contents_search ON contents (title, excerpt, content)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS contents_fts")
+    elif dialect == 'mysql':
+        op.drop_index('ft_contents_search', table_name='contents')
@@ -0,0 +1,34 @@
+"""Make content tag and category assignments unique
+
+Revision ID: 0007_unique_content_assignments
+Revises: 0006_add_content_search_index
+Create Date: 2026-10-18 00:00:00.000004
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007_unique_content_assignments'
+down_revision = '0006_add_content_search_index'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ux_content_tags_content_tag', 'content_tags', 'tag_id'),
+    ('ux_content_categories_content_category', 'content_categories', 'category_id'),
+]
+
+
+def upgrade() -> None:
+    for name, table, column in INDEXES:
+        # Keep the oldest row of each duplicated pair; the derived table lets MySQL
+        # delete from the table it is reading
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN ("
+            f"SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY content_id, {column}) AS keep)"
+        )
+        op.create_index(name, table, ['content_id', column], unique=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
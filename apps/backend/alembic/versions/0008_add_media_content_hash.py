@@ -0,0 +1,29 @@
+"""Add media content hash and widen media size for large uploads
+
+Revision ID: 0008_add_media_content_hash
+Revises: 0007_unique_content_assignments
+Create Date: 2026-10-18 00:00:00.000005
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_add_media_content_hash'
+down_revision = '0007_unique_content_assignments'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_media_content_hash', 'media', ['content_hash'], unique=True)
+    # SQLite integers are already 64-bit and it can't ALTER a column type in place
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('media', 'size', type_=sa.BigInteger(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('media', 'size', type_=sa.Integer(), existing_nullable=True)
+    op.drop_index('ix_media_content_hash', table_name='media')
+    op.drop_column('media', 'content_hash')
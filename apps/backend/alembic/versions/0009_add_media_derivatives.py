@@ -0,0 +1,41 @@
+"""Add media derivatives (resized image renditions)
+
+Revision ID: 0009_add_media_derivatives
+Revises: 0008_add_media_content_hash
+Create Date: 2026-10-18 00:00:00.000006
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_add_media_derivatives'
+down_revision = '0008_add_media_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_derivatives',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('media_id', sa.Integer(), nullable=False),
+        sa.Column('preset', sa.String(length=50), nullable=False),
+        sa.Column('file_path', sa.String(length=1024), nullable=False),
+        sa.Column('file_url', sa.String(length=1024), nullable=True),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('mime_type', sa.String(length=100), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id'], name='fk_media_derivatives_media', ondelete='CASCADE'),
+    )
+    op.create_index('ix_media_derivatives_id', 'media_derivatives', ['id'])
+    op.create_index('ux_media_derivatives_media_preset', 'media_derivatives', ['media_id', 'preset'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_media_derivatives_media_preset', table_name='media_derivatives')
+    op.drop_index('ix_media_derivatives_id', table_name='media_derivatives')
+    op.drop_table('media_derivatives')
@@ -0,0 +1,34 @@
+"""Add rendered body columns to contents
+
+Revision ID: 0010_add_content_render_columns
+Revises: 0009_add_media_derivatives
+Create Date: 2026-10-18 00:00:00.000007
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_add_content_render_columns'
+down_revision = '0009_add_media_derivatives'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['content_html', 'excerpt_auto', 'word_count', 'reading_time', 'render_version']
+
+
+def upgrade() -> None:
+    # Existing rows stay unrendered (render_version NULL) until
+    # `python -m inorta_backend.cli render-contents` backfills them
+    op.add_column('contents', sa.Column('content_html', sa.Text(), nullable=True))
+    op.add_column('contents', sa.Column('excerpt_auto', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('contents', sa.Column('word_count', sa.Integer(), nullable=True))
+    op.add_column('contents', sa.Column('reading_time', sa.Integer(), nullable=True))
+    op.add_column('contents', sa.Column('render_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    # Batch mode rebuilds the table on SQLite, which can't drop a column from under
+    # the other tables' indexes; other backends get plain ALTER TABLE ... DROP COLUMN
+    with op.batch_alter_table('contents') as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column)
@@ -0,0 +1,85 @@
+import inspect
+import re
+from typing import Any, Callable
+
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from inorta_backend.api import routes
+from inorta_backend.db.session import get_async_db
+
+# `async def` twins of the CRUD routes in api/routes.py, mounted ahead of them when
+# settings.use_async_db is on. Each twin runs its sync endpoint, body and all,
+# through `AsyncSession.run_sync`, so both routers share one implementation and
+# the same request/response shapes; they stay out of the OpenAPI schema and the
+# sync routes document both. Id segments use the `:int` converter so literal
+# sibling paths (e.g. /settings/snapshot) fall through to the sync router instead
+# of failing id validation here.
+router = APIRouter(include_in_schema=False)
+
+# Sync endpoints served on the async session; the rest keep running on the sync one
+ASYNC_ENDPOINTS = (
+    # Roles
+    routes.create_role, routes.get_roles, routes.get_role, routes.update_role, routes.delete_role,
+    # Categories
+    routes.create_category, routes.bulk_create_categories, routes.get_categories, routes.get_category,
+    routes.update_category, routes.delete_category,
+    # Tags
+    routes.create_tag, routes.bulk_create_tags, routes.get_tags, routes.get_tag, routes.update_tag,
+    routes.delete_tag,
+    # Contents and their tag/category assignments
+    routes.create_content, routes.get_contents, routes.get_contents_by_tags, routes.get_content,
+    routes.update_content, routes.delete_content, routes.get_content_tags, routes.set_content_tags,
+    routes.batch_set_content_tags, routes.get_content_categories, routes.set_content_categories,
+    routes.batch_set_content_categories,
+    # Media
+    routes.create_media, routes.bulk_create_media, routes.get_media, routes.get_media_item,
+    routes.update_media, routes.delete_media,
+    # Settings
+    routes.create_setting, routes.get_settings, routes.get_setting, routes.update_setting,
+    routes.delete_setting,
+    # Menus and menu items
+    routes.create_menu, routes.get_menus, routes.get_menu, routes.update_menu, routes.delete_menu,
+    routes.create_menu_item, routes.get_menu_items, routes.get_menu_item, routes.update_menu_item,
+    routes.delete_menu_item,
+    # Users
+    routes.create_user, routes.bulk_create_users, routes.get_users, routes.get_user, routes.update_user,
+    routes.delete_user,
+)
+
+ID_SEGMENT = re.compile(r"\{(\w+_id)\}")
+
+
+def async_twin(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Coroutine endpoint running the sync `endpoint` on an `AsyncSession`.
+
+    The twin takes the same parameters, with `db` resolved by `get_async_db`, and
+    hands the session's sync side to `endpoint` inside `run_sync`.
+    """
+    signature = inspect.signature(endpoint)
+    parameters = [
+        parameter.replace(annotation=AsyncSession, default=Depends(get_async_db)) if name == "db" else parameter
+        for name, parameter in signature.parameters.items()
+    ]
+
+    async def twin(db: AsyncSession, **kwargs: Any) -> Any:
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    twin.__signature__ = signature.replace(parameters=parameters)
+    twin.__name__ = endpoint.__name__
+    twin.__doc__ = endpoint.__doc__
+    return twin
+
+
+for route in routes.router.routes:
+    if isinstance(route, APIRoute) and route.endpoint in ASYNC_ENDPOINTS:
+        router.add_api_route(
+            ID_SEGMENT.sub(r"{\1:int}", route.path),
+            async_twin(route.endpoint),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            response_class=route.response_class,
+            name=route.name,
+        )
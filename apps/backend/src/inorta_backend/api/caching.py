@@ -0,0 +1,102 @@
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from inorta_backend.api.conditional import is_fresh
+from inorta_backend.api.metrics import route_template
+from inorta_backend.services.response_cache import CachedResponse, ResponseCache, response_cache
+
+# Reads under a resource that also depend on writes to other resources
+RELATED_TAGS = {
+    "categories": ("contents",),
+    "menus": ("menu-items",),
+}
+
+# Response header telling whether a GET was served from the cache (HIT) or not (MISS)
+CACHE_STATUS_HEADER = b"x-cache"
+
+
+def cache_tags(path: str, prefix: str) -> Tuple[str, ...]:
+    """Tags of a read: its resource (first path segment after `prefix`) and related ones"""
+    resource = path[len(prefix):].split("/", 1)[0]
+    return (resource, *RELATED_TAGS.get(resource, ()))
+
+
+class ResponseCacheMiddleware:
+    """Serve repeated GETs under `prefix` from `cache` as stored JSON bytes.
+
+    Keyed on path plus the sorted query string. Only 200 JSON responses without
+    cookies are stored, along with their headers (validators and cursor included),
+    so a hit also answers If-None-Match with a 304. `Cache-Control: no-cache` on the
+    request skips the lookup. A hit reports the route template of the response it
+    replays, so per-route metrics count it where it belongs. Paths under `{prefix}internal/` are never cached.
+    """
+
+    def __init__(self, app: ASGIApp, cache: ResponseCache = response_cache, prefix: str = "/api/"):
+        self.app = app
+        self.cache = cache
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not self.cache.enabled
+            or not path.startswith(self.prefix)
+            or path.startswith(self.prefix + "internal/")
+        ):
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)))
+        key = f"{path}?{query}"
+        tags = cache_tags(path, self.prefix)
+
+        if "no-cache" not in request_headers.get("cache-control", ""):
+            cached = self.cache.get(key)
+            if cached is not None:
+                # The router never sees a hit; keep it counted under the route that built it
+                if cached.route is not None:
+                    scope["route_template"] = cached.route
+                await self._replay(cached, request_headers, send)
+                return
+
+        generation = self.cache.generation(tags)
+        start: Optional[Message] = None
+        body: List[bytes] = []
+
+        async def send_and_store(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] == status.HTTP_200_OK
+                    and headers.get("content-type", "").startswith("application/json")
+                    and "set-cookie" not in headers
+                ):
+                    start = message
+                message = {**message, "headers": [*message["headers"], (CACHE_STATUS_HEADER, b"MISS")]}
+            elif message["type"] == "http.response.body" and start is not None:
+                body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    cached = CachedResponse(
+                        start["status"], list(start["headers"]), b"".join(body), route_template(scope)
+                    )
+                    self.cache.set(key, cached, tags, generation)
+            await send(message)
+
+        await self.app(scope, receive, send_and_store)
+
+    @staticmethod
+    async def _replay(cached: CachedResponse, request_headers: Headers, send: Send) -> None:
+        headers = Headers(raw=cached.headers)
+        status_code, raw, body = cached.status, cached.headers, cached.body
+        if is_fresh(request_headers, headers.get("etag"), headers.get("last-modified")):
+            status_code, body = status.HTTP_304_NOT_MODIFIED, b""
+            raw = [(name, value) for name, value in raw if name not in (b"content-length", b"content-type")]
+        await send({"type": "http.response.start", "status": status_code, "headers": [*raw, (CACHE_STATUS_HEADER, b"HIT")]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,119 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Validators of a single row: (ETag, Last-Modified or None)
+Validators = Tuple[str, Optional[str]]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def is_fresh(headers: Headers, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Whether the request's If-None-Match / If-Modified-Since shows the client copy is current"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def probe_item(db: Session, model: Any, item_id: int, *counters: Any) -> Optional[Validators]:
+    """Validators of one row from its `updated_at`, without loading the row.
+
+    `counters` are columns written without touching `updated_at` (like
+    `Content.views_count`); they go into the ETag, and the row gets no
+    Last-Modified, as its date alone would call a changed row current.
+    """
+    row = db.query(model.updated_at, *counters).filter(model.id == item_id).first()
+    if row is None or row[0] is None:
+        return None
+    updated_at: datetime = row[0]
+    etag = "-".join([model.__tablename__, str(item_id), updated_at.isoformat(), *(str(value or 0) for value in row[1:])])
+    if counters:
+        return f'"{etag}"', None
+    return f'"{etag}"', format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def not_modified(request: Request, response: Response, validators: Optional[Validators]) -> Optional[Response]:
+    """A 304 response when the client's copy is current, otherwise set validators on `response`"""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = last_modified
+    if is_fresh(request.headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+class ConditionalGetMiddleware:
+    """Strong ETag from a hash of the body for JSON GET responses that carry none.
+
+    Covers lists, trees and other composite reads; single-row routes set their own
+    validators from `updated_at` via `probe_item`. A matching If-None-Match turns the
+    response into a bodiless 304.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        body: List[bytes] = []
+
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] == status.HTTP_200_OK
+                    and "etag" not in headers
+                    and headers.get("content-type", "").startswith("application/json")
+                ):
+                    start = message
+                    return
+            elif message["type"] == "http.response.body" and start is not None:
+                body.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                content = b"".join(body)
+                etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+                headers = MutableHeaders(raw=start["headers"])
+                headers["ETag"] = etag
+                if etag_matches(if_none_match, etag):
+                    del headers["content-length"]
+                    del headers["content-type"]
+                    await send({**start, "status": status.HTTP_304_NOT_MODIFIED})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send(start)
+                await send({"type": "http.response.body", "body": content})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,271 @@
+import mimetypes
+import re
+import secrets
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import APIRouter, HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from inorta_backend.api.conditional import etag_matches, is_fresh
+from inorta_backend.services.media_storage import media_storage
+from inorta_backend.services.open_files import OpenFile, OpenFileCache, open_files
+
+router = APIRouter()
+
+# Paths written by MediaStorage, named after the SHA-256 of the bytes, and of their
+# derivatives (<hash>-<preset>-<box>.<ext>), so they never change
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60}(?:-[\w-]+)?)(\.[\w.-]+)?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Requests asking for more ranges than this get the whole file instead
+MAX_RANGES = 16
+
+# (first byte, last byte), both inclusive
+ByteRange = Tuple[int, int]
+
+
+def parse_range(header: str, size: int) -> Optional[List[ByteRange]]:
+    """The satisfiable ranges of a `Range: bytes=...` header, sorted and merged.
+
+    None means the header is to be ignored (malformed, another unit or too many
+    ranges) and the whole file served; an empty list means nothing in it is
+    satisfiable (416).
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+    parts = specs.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+    ranges: List[ByteRange] = []
+    for part in parts:
+        first, dash, last = (value.strip() for value in part.partition("-"))
+        if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+            return None
+        if not first:
+            suffix = int(last)
+            if suffix and size:
+                ranges.append((max(0, size - suffix), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+    ranges.sort()
+    merged: List[ByteRange] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MediaFileResponse(Response):
+    """A stored file, sent zero-copy when the server supports it.
+
+    Answers conditional requests (If-None-Match / If-Modified-Since with 304,
+    If-Match with 412) and byte ranges: one range as a 206 with Content-Range,
+    several as multipart/byteranges, none satisfiable as 416; If-Range falls back to
+    the whole file when the client's copy is outdated.
+
+    The body goes out as an ASGI `http.response.pathsend` (whole file) or
+    `http.response.zerocopysend` (any range) message when the server lists the
+    extension, so the kernel copies the file to the socket with sendfile. Otherwise
+    it is read with pread in `chunk_size` blocks off the event loop. The file comes
+    from the open descriptor cache and is released when the response is done.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        entry: OpenFile,
+        media_type: str,
+        etag: str,
+        cache_control: str = REVALIDATE_CACHE_CONTROL,
+        filename: Optional[str] = None,
+        cache: OpenFileCache = open_files,
+    ):
+        self.entry = entry
+        self.cache = cache
+        self.status_code = status.HTTP_200_OK
+        self.media_type = media_type
+        self.background = None
+        self.body = b""
+        self.etag = etag
+        self.last_modified = format_datetime(datetime.fromtimestamp(entry.mtime, timezone.utc), usegmt=True)
+        self.raw_headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"last-modified", self.last_modified.encode("latin-1")),
+            (b"cache-control", cache_control.encode("latin-1")),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if filename:
+            self.raw_headers.append(
+                (b"content-disposition", f"inline; filename*=utf-8''{quote(filename)}".encode("latin-1"))
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self._respond(scope, send)
+        finally:
+            self.cache.release(self.entry)
+
+    def _if_range_matches(self, if_range: Optional[str]) -> bool:
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            # If-Range needs a strong match
+            return not if_range.startswith("W/") and if_range == self.etag
+        return if_range == self.last_modified
+
+    async def _respond(self, scope: Scope, send: Send) -> None:
+        headers = Headers(scope=scope)
+        size = self.entry.size
+        if_match = headers.get("if-match")
+        if if_match is not None and not etag_matches(if_match, self.etag):
+            await self._send_empty(send, status.HTTP_412_PRECONDITION_FAILED, [])
+            return
+        if is_fresh(headers, self.etag, self.last_modified):
+            await self._send_empty(send, status.HTTP_304_NOT_MODIFIED, self.raw_headers)
+            return
+
+        ranges = None
+        if "range" in headers and self._if_range_matches(headers.get("if-range")):
+            ranges = parse_range(headers["range"], size)
+        if ranges == []:
+            await self._send_empty(
+                send, status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                [*self.raw_headers, (b"content-range", f"bytes */{size}".encode("latin-1"))],
+            )
+            return
+        head_only = scope["method"] == "HEAD"
+        extensions = scope.get("extensions") or {}
+        content_type = self.media_type.encode("latin-1")
+
+        if not ranges:
+            await self._start(send, status.HTTP_200_OK, content_type, size, [])
+            if head_only or not size:
+                await send({"type": "http.response.body", "body": b""})
+            elif "http.response.pathsend" in extensions:
+                await send({"type": "http.response.pathsend", "path": self.entry.path})
+            else:
+                await self._send_range(send, extensions, 0, size - 1, more_body=False)
+            return
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            content_range = f"bytes {start}-{end}/{size}".encode("latin-1")
+            await self._start(
+                send, status.HTTP_206_PARTIAL_CONTENT, content_type, end - start + 1, [(b"content-range", content_range)]
+            )
+            if head_only:
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await self._send_range(send, extensions, start, end, more_body=False)
+            return
+
+        boundary = secrets.token_hex(16)
+        part_headers = [
+            (
+                f"--{boundary}\r\nContent-Type: {self.media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode("latin-1")
+        length = sum(len(part) + end - start + 1 + 2 for part, (start, end) in zip(part_headers, ranges)) + len(closing)
+        await self._start(
+            send, status.HTTP_206_PARTIAL_CONTENT,
+            f"multipart/byteranges; boundary={boundary}".encode("latin-1"), length, [],
+        )
+        if head_only:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        for index, (part, (start, end)) in enumerate(zip(part_headers, ranges)):
+            await send({"type": "http.response.body", "body": (b"\r\n" if index else b"") + part, "more_body": True})
+            await self._send_range(send, extensions, start, end, more_body=True)
+        await send({"type": "http.response.body", "body": b"\r\n" + closing})
+
+    async def _start(self, send: Send, status_code: int, content_type: bytes, length: int, extra: list) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                *self.raw_headers, *extra,
+                (b"content-type", content_type),
+                (b"content-length", str(length).encode("latin-1")),
+            ],
+        })
+
+    async def _send_empty(self, send: Send, status_code: int, headers: list) -> None:
+        if status_code != status.HTTP_304_NOT_MODIFIED:
+            headers = [*headers, (b"content-length", b"0")]
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send_range(self, send: Send, extensions: dict, start: int, end: int, more_body: bool) -> None:
+        """Bytes `start`..`end` of the file as body messages, the last with `more_body`"""
+        if "http.response.zerocopysend" in extensions:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": self.entry.file,
+                "offset": start,
+                "count": end - start + 1,
+                "more_body": more_body,
+            })
+            return
+        offset = start
+        while offset <= end:
+            chunk = await anyio.to_thread.run_sync(self.entry.read, offset, min(self.chunk_size, end - offset + 1))
+            if not chunk:
+                raise RuntimeError(f"{self.entry.path} is shorter than its cached size")
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body or offset <= end})
+
+
+def media_file_response(
+    file_path: str,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    immutable: bool = True,
+) -> MediaFileResponse:
+    """Response serving a file of the media store, or 404.
+
+    Content-addressed files get their hash as ETag and, when `immutable`, a year of
+    caching; other files are revalidated on each use.
+    """
+    if file_path.startswith("tmp/"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    try:
+        entry = open_files.acquire(media_storage.path(file_path))
+    except (OSError, ValueError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    match = CONTENT_ADDRESSED.match(file_path)
+    if match:
+        etag = f'"{match.group(3)}"'
+    else:
+        etag = f'"{entry.identity[3]:x}-{entry.size:x}"'
+    return MediaFileResponse(
+        entry,
+        media_type or mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        etag,
+        IMMUTABLE_CACHE_CONTROL if match and immutable else REVALIDATE_CACHE_CONTROL,
+        filename,
+    )
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def get_media_file(file_path: str):
+    """A stored media file by the path in its `file_url`"""
+    return media_file_response(file_path)
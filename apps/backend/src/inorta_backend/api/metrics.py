@@ -0,0 +1,81 @@
+import time
+from contextlib import nullcontext
+
+from fastapi import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from inorta_backend.db.instrumentation import current_query_stats, track_queries
+from inorta_backend.services.metrics import Metrics, metrics
+
+# Route label of requests that matched no route, so unknown paths can't grow the series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that served `scope`, e.g. `/api/users/{user_id}`
+
+    Responses sent without routing, like response cache hits, carry the template
+    of the route that first built them in `scope["route_template"]`.
+    """
+    if "route_template" in scope:
+        return scope["route_template"]
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Routes of an included router may report their path without the router's prefix
+    path = scope["path"]
+    depth = path.count("/") - template.count("/")
+    if depth > 0 and ":path}" not in template:
+        template = "/".join(path.split("/")[:depth + 1]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """Record count, latency, response size and SQL work of each request by route template.
+
+    The template (`/api/users/{user_id}`) comes from the route Starlette matched,
+    so series stay bounded whatever ids are requested. In-progress requests are
+    counted per method, as the route is only known once the request is routed.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics = metrics):
+        self.app = app
+        self.registry = metrics.registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        in_progress = (("method", method),)
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        size = 0
+        start = time.perf_counter()
+        self.registry.inc("http_requests_in_progress", in_progress)
+        stats = current_query_stats()
+        with nullcontext(stats) if stats is not None else track_queries() as stats:
+
+            async def send_and_measure(message: Message) -> None:
+                nonlocal status_code, size
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                elif message["type"] == "http.response.body":
+                    size += len(message.get("body", b""))
+                elif message["type"] == "http.response.zerocopysend":
+                    size += message.get("count", 0)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_and_measure)
+            finally:
+                self.registry.inc("http_requests_in_progress", in_progress, -1)
+                self.registry.record_request(
+                    method,
+                    route_template(scope),
+                    str(status_code),
+                    time.perf_counter() - start,
+                    size,
+                    stats.count,
+                    stats.duration_ms / 1000,
+                )
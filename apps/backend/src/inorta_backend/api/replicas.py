@@ -0,0 +1,55 @@
+import time
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from inorta_backend.core.config import settings
+from inorta_backend.db.routing import allow_replica_reads, track_writes
+
+# Cookie holding the time (epoch seconds) until which a client reads from the primary
+STICKY_COOKIE = "inorta_primary_until"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    """Route the sessions of read-only requests to replicas, with read-your-writes.
+
+    GET, HEAD and OPTIONS requests may read from a replica. A successful request
+    that wrote to the database sets a cookie that keeps the client's reads on the
+    primary for `sticky_seconds`, long enough for replicas to catch up, so the
+    client never reads back an older state than the one it just wrote. Requests
+    that write nothing, like the buffered page-view beacon, leave reads on replicas.
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: float = settings.db_replica_sticky_seconds):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    def _sticky(self, scope: Scope) -> bool:
+        try:
+            return float(HTTPConnection(scope).cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] in SAFE_METHODS:
+            with allow_replica_reads(not self._sticky(scope)):
+                await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400 and writes.wrote:
+                until = time.time() + self.sticky_seconds
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message["headers"], (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        with track_writes() as writes:
+            await self.app(scope, receive, send_with_cookie)
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-
-from inorta_backend.db.session import get_db
+from starlette.concurrency import run_in_threadpool
+from typing import Any, List, Optional, Sequence
+
+from inorta_backend.api.conditional import not_modified, probe_item
+from inorta_backend.api.media_files import media_file_response
+from inorta_backend.db.pool import get_pool_stats
+from inorta_backend.db.session import get_db, replica_set
+from inorta_backend.services.pagination import decode_cursor, next_cursor
+from inorta_backend.schemas.assignment import AssignmentResult, AssignmentUpdate, BatchAssignmentUpdate
+from inorta_backend.schemas.bulk import BULK_MAX_ITEMS, BulkResult
 from inorta_backend.schemas.user import UserCreate, UserUpdate, UserResponse
 from inorta_backend.services.user_service import UserService
 
@@ -10,8 +17,59 @@ from inorta_backend.services.user_service import UserService
 from inorta_backend.schemas.role import RoleCreate, RoleUpdate, RoleResponse
 from inorta_backend.services.role_service import RoleService
 
+# CMS imports
+from inorta_backend.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from inorta_backend.schemas.content import ContentCreate, ContentUpdate, ContentResponse, ContentSearchResult, ContentOrder, ContentStatus, ContentType
+from inorta_backend.schemas.media import MediaCreate, MediaDerivativeResponse, MediaUpdate, MediaResponse
+from inorta_backend.schemas.menu import MenuCreate, MenuUpdate, MenuResponse, MenuItemCreate, MenuItemUpdate, MenuItemResponse, MenuTreeResponse
+from inorta_backend.schemas.setting import SettingCreate, SettingUpdate, SettingResponse, SettingsSnapshotResponse
+from inorta_backend.schemas.tag import TagCreate, TagUpdate, TagResponse
+from inorta_backend.services.category_service import CategoryService
+from inorta_backend.services.content_service import ContentService
+from inorta_backend.services.search_service import SearchService
+from inorta_backend.services.media_service import MediaService
+from inorta_backend.services.media_derivatives import ImageProcessingUnavailable, images_available, media_derivatives
+from inorta_backend.services.media_storage import UploadTooLarge, media_storage
+from inorta_backend.services.open_files import open_files
+from inorta_backend.services.menu_service import MenuService
+from inorta_backend.services.setting_service import SettingService
+from inorta_backend.services.tag_service import TagService
+from inorta_backend.services.taxonomy_service import TaxonomyService
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.view_counter import view_counter
+
+# Models whose updated_at backs the conditional GET validators
+from inorta_backend.models.category import Category
+from inorta_backend.models.content import Content
+from inorta_backend.models.media import Media
+from inorta_backend.models.menu import Menu
+from inorta_backend.models.menu_item import MenuItem
+from inorta_backend.models.role import Role
+from inorta_backend.models.settings import Setting
+from inorta_backend.models.tag import Tag
+from inorta_backend.models.user import User
+
 router = APIRouter()
 
+# Header carrying the opaque cursor of the next page on every collection route
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def decode_after_cursor(after: Optional[str], size: int = 1) -> Optional[List[Any]]:
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after, size)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, items: list, limit: int, attrs: Sequence[str] = ("id",)) -> list:
+    cursor = next_cursor(items, limit, attrs)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return items
+
 
 @router.get("/")
 def read_root():
@@ -26,19 +84,29 @@ def health():
 # Role endpoints
 @router.post("/roles", response_model=RoleResponse, status_code=status.HTTP_201_CREATED)
 def create_role(role: RoleCreate, db: Session = Depends(get_db)):
-    existing = RoleService.get_role_by_name(db, role.name)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Role already exists")
-    return RoleService.create_role(db, role)
+    try:
+        return RoleService.create_role(db, role)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/roles", response_model=List[RoleResponse])
-def get_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return RoleService.get_roles(db, skip=skip, limit=limit)
+def get_roles(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = RoleService.get_roles(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
 
 
 @router.get("/roles/{role_id}", response_model=RoleResponse)
-def get_role(role_id: int, db: Session = Depends(get_db)):
+def get_role(role_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Role, role_id))
+    if cached:
+        return cached
     role = RoleService.get_role_by_id(db, role_id)
     if not role:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
@@ -62,30 +130,88 @@ def delete_role(role_id: int, db: Session = Depends(get_db)):
 
 
 # Category endpoints
-@router.post("/categories", response_model="inorta_backend.schemas.category.CategoryResponse", status_code=status.HTTP_201_CREATED)
-def create_category(category: "inorta_backend.schemas.category.CategoryCreate", db: Session = Depends(get_db)):
-    existing = __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.get_category_by_slug(db, category.slug)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category slug already exists")
-    return __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.create_category(db, category)
-
-
-@router.get("/categories", response_model=List["inorta_backend.schemas.category.CategoryResponse"])
-def get_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.get_categories(db, skip=skip, limit=limit)
-
-
-@router.get("/categories/{category_id}", response_model="inorta_backend.schemas.category.CategoryResponse")
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.get_category_by_id(db, category_id)
+@router.post("/categories", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
+def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+    try:
+        return CategoryService.create_category(db, category)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/categories/bulk", response_model=BulkResult)
+def bulk_create_categories(
+    categories: List[CategoryCreate] = Body(..., max_length=BULK_MAX_ITEMS),
+    upsert: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Create many categories at once; with `upsert=true` existing slugs are updated instead of rejected"""
+    try:
+        return BulkResult.from_items(CategoryService.bulk_create_categories(db, categories, upsert=upsert))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/categories", response_model=List[CategoryResponse])
+def get_categories(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = CategoryService.get_categories(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/categories/{category_id}", response_model=CategoryResponse)
+def get_category(category_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Category, category_id))
+    if cached:
+        return cached
+    category = CategoryService.get_category_by_id(db, category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
     return category
 
 
-@router.put("/categories/{category_id}", response_model="inorta_backend.schemas.category.CategoryResponse")
-def update_category(category_id: int, category: "inorta_backend.schemas.category.CategoryUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.update_category(db, category_id, category)
+@router.get("/categories/{category_id}/subtree", response_model=List[CategoryResponse])
+def get_category_subtree(category_id: int, max_depth: Optional[int] = None, db: Session = Depends(get_db)):
+    """The category followed by all its descendants, shallowest first"""
+    subtree = CategoryService.get_subtree(db, category_id, max_depth)
+    if not subtree:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    return subtree
+
+
+@router.get("/categories/{category_id}/ancestors", response_model=List[CategoryResponse])
+def get_category_ancestors(category_id: int, db: Session = Depends(get_db)):
+    """Breadcrumb from the root down to the category's parent"""
+    ancestors = CategoryService.get_ancestors(db, category_id)
+    if ancestors is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    return ancestors
+
+
+@router.get("/categories/{category_id}/contents", response_model=List[ContentResponse])
+def get_category_contents(
+    category_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Contents in the category or any of its descendants"""
+    items = CategoryService.get_subtree_contents(db, category_id, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.put("/categories/{category_id}", response_model=CategoryResponse)
+def update_category(category_id: int, category: CategoryUpdate, db: Session = Depends(get_db)):
+    try:
+        updated = CategoryService.update_category(db, category_id, category)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
     return updated
@@ -93,37 +219,63 @@ def update_category(category_id: int, category: "inorta_backend.schemas.category
 
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_category(category_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.category_service', fromlist=['CategoryService']).CategoryService.delete_category(db, category_id)
+    try:
+        deleted = CategoryService.delete_category(db, category_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
     return None
 
 
 # Tag endpoints
-@router.post("/tags", response_model="inorta_backend.schemas.tag.TagResponse", status_code=status.HTTP_201_CREATED)
-def create_tag(tag: "inorta_backend.schemas.tag.TagCreate", db: Session = Depends(get_db)):
-    existing = __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.get_tag_by_slug(db, tag.slug)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tag slug already exists")
-    return __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.create_tag(db, tag)
-
-
-@router.get("/tags", response_model=List["inorta_backend.schemas.tag.TagResponse"])
-def get_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.get_tags(db, skip=skip, limit=limit)
-
-
-@router.get("/tags/{tag_id}", response_model="inorta_backend.schemas.tag.TagResponse")
-def get_tag(tag_id: int, db: Session = Depends(get_db)):
-    tag = __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.get_tag_by_id(db, tag_id)
+@router.post("/tags", response_model=TagResponse, status_code=status.HTTP_201_CREATED)
+def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
+    try:
+        return TagService.create_tag(db, tag)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/tags/bulk", response_model=BulkResult)
+def bulk_create_tags(
+    tags: List[TagCreate] = Body(..., max_length=BULK_MAX_ITEMS),
+    upsert: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Create many tags at once; with `upsert=true` existing slugs are updated instead of rejected"""
+    try:
+        return BulkResult.from_items(TagService.bulk_create_tags(db, tags, upsert=upsert))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/tags", response_model=List[TagResponse])
+def get_tags(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = TagService.get_tags(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/tags/{tag_id}", response_model=TagResponse)
+def get_tag(tag_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Tag, tag_id))
+    if cached:
+        return cached
+    tag = TagService.get_tag_by_id(db, tag_id)
     if not tag:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
     return tag
 
 
-@router.put("/tags/{tag_id}", response_model="inorta_backend.schemas.tag.TagResponse")
-def update_tag(tag_id: int, tag: "inorta_backend.schemas.tag.TagUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.update_tag(db, tag_id, tag)
+@router.put("/tags/{tag_id}", response_model=TagResponse)
+def update_tag(tag_id: int, tag: TagUpdate, db: Session = Depends(get_db)):
+    updated = TagService.update_tag(db, tag_id, tag)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
     return updated
@@ -131,34 +283,311 @@ def update_tag(tag_id: int, tag: "inorta_backend.schemas.tag.TagUpdate", db: Ses
 
 @router.delete("/tags/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_tag(tag_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.tag_service', fromlist=['TagService']).TagService.delete_tag(db, tag_id)
+    deleted = TagService.delete_tag(db, tag_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
     return None
 
 
-# Media endpoints
-@router.post("/media", response_model="inorta_backend.schemas.media.MediaResponse", status_code=status.HTTP_201_CREATED)
-def create_media(media: "inorta_backend.schemas.media.MediaCreate", db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.media_service', fromlist=['MediaService']).MediaService.create_media(db, media)
+# Content endpoints
+@router.post("/contents", response_model=ContentResponse, status_code=status.HTTP_201_CREATED)
+def create_content(content: ContentCreate, db: Session = Depends(get_db)):
+    try:
+        return ContentService.create_content(db, content)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/contents", response_model=List[ContentResponse])
+def get_contents(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    content_status: Optional[ContentStatus] = Query(None, alias="status"),
+    content_type: Optional[ContentType] = Query(None, alias="type"),
+    author_id: Optional[int] = None,
+    order: ContentOrder = "id",
+    db: Session = Depends(get_db),
+):
+    """List contents, optionally filtered by status, type and author"""
+    attrs = ("published_at", "id") if order.lstrip("-") == "published_at" else ("id",)
+    try:
+        items = ContentService.get_contents(
+            db,
+            skip=skip,
+            limit=limit,
+            after=decode_after_cursor(after, size=len(attrs)),
+            status=content_status,
+            content_type=content_type,
+            author_id=author_id,
+            order=order,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return set_next_cursor(response, items, limit, attrs=attrs)
+
+
+@router.get("/contents/by-tags", response_model=List[ContentResponse])
+def get_contents_by_tags(
+    response: Response,
+    all_tags: List[int] = Query([], alias="all"),
+    any_tags: List[int] = Query([], alias="any"),
+    none_tags: List[int] = Query([], alias="none"),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Contents tagged with every `all`, at least one `any` and no `none` tag id, by id"""
+    if not all_tags and not any_tags:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give at least one all or any tag")
+    try:
+        items = TaxonomyService.query_contents_by_tags(
+            db, all_tags, any_tags, none_tags, limit=limit, after=decode_after_cursor(after)
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/contents/search", response_model=List[ContentSearchResult])
+def search_contents(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Full-text search over title, excerpt and body; every term must match, best match first"""
+    results = SearchService.search_contents(db, q, limit=limit, offset=offset)
+    return [
+        ContentSearchResult(**ContentResponse.model_validate(item).model_dump(), score=score)
+        for item, score in results
+    ]
+
+
+@router.get("/contents/{content_id}", response_model=ContentResponse)
+def get_content(content_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Content, content_id, Content.views_count))
+    if cached:
+        return cached
+    item = ContentService.get_content_by_id(db, content_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return item
+
+
+@router.post("/contents/{content_id}/views", status_code=status.HTTP_202_ACCEPTED)
+async def track_content_view(content_id: int):
+    """Count a page view; buffered in memory and flushed to views_count in batches"""
+    view_counter.record(content_id)
+    return None
+
+
+@router.put("/contents/{content_id}", response_model=ContentResponse)
+def update_content(content_id: int, content: ContentUpdate, db: Session = Depends(get_db)):
+    updated = ContentService.update_content(db, content_id, content)
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return updated
+
+
+@router.delete("/contents/{content_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_content(content_id: int, db: Session = Depends(get_db)):
+    deleted = ContentService.delete_content(db, content_id)
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return None
 
 
-@router.get("/media", response_model=List["inorta_backend.schemas.media.MediaResponse"])
-def get_media(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.media_service', fromlist=['MediaService']).MediaService.get_media(db, skip=skip, limit=limit)
+@router.get("/contents/{content_id}/tags", response_model=AssignmentResult)
+def get_content_tags(content_id: int, db: Session = Depends(get_db)):
+    if not ContentService.get_content_by_id(db, content_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return AssignmentResult(content_id=content_id, ids=TaxonomyService.get_content_tag_ids(db, content_id))
+
+
+@router.put("/contents/{content_id}/tags", response_model=AssignmentResult)
+def set_content_tags(content_id: int, update: AssignmentUpdate, db: Session = Depends(get_db)):
+    """Replace the content's tags with `ids`, or apply an `add`/`remove` diff"""
+    try:
+        results = TaxonomyService.assign_tags(db, [content_id], update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return results[0]
+
+
+@router.post("/contents/tags/batch", response_model=List[AssignmentResult])
+def batch_set_content_tags(update: BatchAssignmentUpdate, db: Session = Depends(get_db)):
+    """Replace or diff the tags of many contents in one transaction"""
+    try:
+        results = TaxonomyService.assign_tags(db, update.content_ids, update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return results
+
+
+@router.get("/contents/{content_id}/categories", response_model=AssignmentResult)
+def get_content_categories(content_id: int, db: Session = Depends(get_db)):
+    if not ContentService.get_content_by_id(db, content_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return AssignmentResult(content_id=content_id, ids=TaxonomyService.get_content_category_ids(db, content_id))
+
+
+@router.put("/contents/{content_id}/categories", response_model=AssignmentResult)
+def set_content_categories(content_id: int, update: AssignmentUpdate, db: Session = Depends(get_db)):
+    """Replace the content's categories with `ids`, or apply an `add`/`remove` diff"""
+    try:
+        results = TaxonomyService.assign_categories(db, [content_id], update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return results[0]
+
+
+@router.post("/contents/categories/batch", response_model=List[AssignmentResult])
+def batch_set_content_categories(update: BatchAssignmentUpdate, db: Session = Depends(get_db)):
+    """Replace or diff the categories of many contents in one transaction"""
+    try:
+        results = TaxonomyService.assign_categories(db, update.content_ids, update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return results
 
 
-@router.get("/media/{media_id}", response_model="inorta_backend.schemas.media.MediaResponse")
-def get_media_item(media_id: int, db: Session = Depends(get_db)):
-    item = __import__('inorta_backend.services.media_service', fromlist=['MediaService']).MediaService.get_media_by_id(db, media_id)
+# Media endpoints
+@router.post("/media", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
+def create_media(media: MediaCreate, db: Session = Depends(get_db)):
+    return MediaService.create_media(db, media)
+
+
+@router.post("/media/bulk", response_model=BulkResult)
+def bulk_create_media(
+    media: List[MediaCreate] = Body(..., max_length=BULK_MAX_ITEMS),
+    db: Session = Depends(get_db),
+):
+    """Create many media records at once"""
+    return BulkResult.from_items(MediaService.bulk_create_media(db, media))
+
+
+@router.post("/media/upload", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
+async def upload_media(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    filename: str = Query(..., min_length=1, max_length=255),
+    alt_text: Optional[str] = Query(None, max_length=255),
+    caption: Optional[str] = None,
+    uploaded_by: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Store the raw request body as a media file, streamed to disk chunk by chunk.
+
+    Answers 201 with the new record, or 200 with the existing one when the same bytes
+    were uploaded before. The eager derivatives of new images are rendered after the
+    response is sent.
+    """
+    declared_size = request.headers.get("content-length")
+    if declared_size and declared_size.isdigit() and int(declared_size) > media_storage.max_size:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Upload too large")
+    try:
+        stored = await media_storage.save_stream(request.stream(), filename, request.headers.get("content-type"))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    try:
+        media, created = await run_in_threadpool(
+            MediaService.create_uploaded_media, db, stored, filename, alt_text, caption, uploaded_by
+        )
+    except Exception:
+        if stored.created:
+            media_storage.delete(stored.file_path)
+        raise
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    elif media_derivatives.eager and media.mime_type.startswith("image/") and images_available():
+        background_tasks.add_task(media_derivatives.generate_eager, db.get_bind(), media.id)
+    return media
+
+
+@router.get("/media", response_model=List[MediaResponse])
+def get_media(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = MediaService.get_media(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/media/{media_id}", response_model=MediaResponse)
+def get_media_item(media_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Media, media_id))
+    if cached:
+        return cached
+    item = MediaService.get_media_by_id(db, media_id)
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
     return item
 
 
-@router.put("/media/{media_id}", response_model="inorta_backend.schemas.media.MediaResponse")
-def update_media(media_id: int, media: "inorta_backend.schemas.media.MediaUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.media_service', fromlist=['MediaService']).MediaService.update_media(db, media_id, media)
+@router.api_route("/media/{media_id}/file", methods=["GET", "HEAD"], response_class=Response)
+def get_media_file(media_id: int, db: Session = Depends(get_db)):
+    """The bytes of a media item, with Range and conditional request support"""
+    item = MediaService.get_media_by_id(db, media_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    # Ids can be reused after a delete, so this URL is revalidated rather than cached for good
+    return media_file_response(item.file_path, item.mime_type, item.original_filename or item.filename, immutable=False)
+
+
+async def ensure_derivatives(db: Session, media_id: int, presets: List[str]) -> list:
+    media = await run_in_threadpool(MediaService.get_media_by_id, db, media_id)
+    if not media:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    try:
+        return await media_derivatives.ensure_all(db, media, presets)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown derivative preset {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ImageProcessingUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/media/{media_id}/derivatives", response_model=List[MediaDerivativeResponse])
+def get_media_derivatives(media_id: int, db: Session = Depends(get_db)):
+    """The derivatives rendered so far"""
+    return MediaService.get_derivatives(db, media_id)
+
+
+@router.post("/media/{media_id}/derivatives", response_model=List[MediaDerivativeResponse])
+async def create_media_derivatives(
+    media_id: int,
+    preset: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Render the given presets (all by default) now, reusing current ones"""
+    return await ensure_derivatives(db, media_id, preset or list(media_derivatives.presets))
+
+
+@router.api_route("/media/{media_id}/derivatives/{preset}", methods=["GET", "HEAD"], response_class=Response)
+async def get_media_derivative_file(media_id: int, preset: str, db: Session = Depends(get_db)):
+    """The bytes of one derivative, rendered on first request"""
+    derivative = (await ensure_derivatives(db, media_id, [preset]))[0]
+    return await run_in_threadpool(media_file_response, derivative.file_path, derivative.mime_type, immutable=False)
+
+
+@router.put("/media/{media_id}", response_model=MediaResponse)
+def update_media(media_id: int, media: MediaUpdate, db: Session = Depends(get_db)):
+    updated = MediaService.update_media(db, media_id, media)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
     return updated
@@ -166,37 +595,53 @@ def update_media(media_id: int, media: "inorta_backend.schemas.media.MediaUpdate
 
 @router.delete("/media/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_media(media_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.media_service', fromlist=['MediaService']).MediaService.delete_media(db, media_id)
+    deleted = MediaService.delete_media(db, media_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
     return None
 
 
 # Settings endpoints
-@router.post("/settings", response_model="inorta_backend.schemas.setting.SettingResponse", status_code=status.HTTP_201_CREATED)
-def create_setting(setting: "inorta_backend.schemas.setting.SettingCreate", db: Session = Depends(get_db)):
-    existing = __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.get_setting_by_key(db, setting.key)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Setting key already exists")
-    return __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.create_setting(db, setting)
-
-
-@router.get("/settings", response_model=List["inorta_backend.schemas.setting.SettingResponse"])
-def get_settings(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.get_settings(db, skip=skip, limit=limit)
-
-
-@router.get("/settings/{setting_id}", response_model="inorta_backend.schemas.setting.SettingResponse")
-def get_setting(setting_id: int, db: Session = Depends(get_db)):
-    item = __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.get_setting_by_id(db, setting_id)
+@router.post("/settings", response_model=SettingResponse, status_code=status.HTTP_201_CREATED)
+def create_setting(setting: SettingCreate, db: Session = Depends(get_db)):
+    try:
+        return SettingService.create_setting(db, setting)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/settings", response_model=List[SettingResponse])
+def get_settings(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = SettingService.get_settings(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/settings/snapshot", response_model=SettingsSnapshotResponse)
+def get_settings_snapshot(db: Session = Depends(get_db)):
+    """All settings with typed values, grouped by category (served from memory)"""
+    return SettingService.get_snapshot(db)
+
+
+@router.get("/settings/{setting_id}", response_model=SettingResponse)
+def get_setting(setting_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Setting, setting_id))
+    if cached:
+        return cached
+    item = SettingService.get_setting_by_id(db, setting_id)
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Setting not found")
     return item
 
 
-@router.put("/settings/{setting_id}", response_model="inorta_backend.schemas.setting.SettingResponse")
-def update_setting(setting_id: int, setting: "inorta_backend.schemas.setting.SettingUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.update_setting(db, setting_id, setting)
+@router.put("/settings/{setting_id}", response_model=SettingResponse)
+def update_setting(setting_id: int, setting: SettingUpdate, db: Session = Depends(get_db)):
+    updated = SettingService.update_setting(db, setting_id, setting)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Setting not found")
     return updated
@@ -204,34 +649,60 @@ def update_setting(setting_id: int, setting: "inorta_backend.schemas.setting.Set
 
 @router.delete("/settings/{setting_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_setting(setting_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.setting_service', fromlist=['SettingService']).SettingService.delete_setting(db, setting_id)
+    deleted = SettingService.delete_setting(db, setting_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Setting not found")
     return None
 
 
 # Menu endpoints
-@router.post("/menus", response_model="inorta_backend.schemas.menu.MenuResponse", status_code=status.HTTP_201_CREATED)
-def create_menu(menu: "inorta_backend.schemas.menu.MenuCreate", db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.create_menu(db, menu)
+@router.post("/menus", response_model=MenuResponse, status_code=status.HTTP_201_CREATED)
+def create_menu(menu: MenuCreate, db: Session = Depends(get_db)):
+    return MenuService.create_menu(db, menu)
+
+
+@router.get("/menus", response_model=List[MenuResponse])
+def get_menus(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = MenuService.get_menus(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
+
+
+@router.get("/menus/{menu_id}", response_model=MenuResponse)
+def get_menu(menu_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, Menu, menu_id))
+    if cached:
+        return cached
+    item = MenuService.get_menu_by_id(db, menu_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
+    return item
 
 
-@router.get("/menus", response_model=List["inorta_backend.schemas.menu.MenuResponse"])
-def get_menus(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.get_menus(db, skip=skip, limit=limit)
+@router.get("/menus/by-location/{location}/tree", response_model=MenuTreeResponse)
+def get_menu_tree_by_location(location: str, db: Session = Depends(get_db)):
+    tree = MenuService.get_menu_tree_json_by_location(db, location)
+    if tree is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
+    return Response(content=tree, media_type="application/json")
 
 
-@router.get("/menus/{menu_id}", response_model="inorta_backend.schemas.menu.MenuResponse")
-def get_menu(menu_id: int, db: Session = Depends(get_db)):
-    item = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.get_menu_by_id(db, menu_id)
-    if not item:
+@router.get("/menus/{menu_id}/tree", response_model=MenuTreeResponse)
+def get_menu_tree(menu_id: int, db: Session = Depends(get_db)):
+    tree = MenuService.get_menu_tree_json(db, menu_id)
+    if tree is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
-    return item
+    return Response(content=tree, media_type="application/json")
 
 
-@router.put("/menus/{menu_id}", response_model="inorta_backend.schemas.menu.MenuResponse")
-def update_menu(menu_id: int, menu: "inorta_backend.schemas.menu.MenuUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.update_menu(db, menu_id, menu)
+@router.put("/menus/{menu_id}", response_model=MenuResponse)
+def update_menu(menu_id: int, menu: MenuUpdate, db: Session = Depends(get_db)):
+    updated = MenuService.update_menu(db, menu_id, menu)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
     return updated
@@ -239,34 +710,45 @@ def update_menu(menu_id: int, menu: "inorta_backend.schemas.menu.MenuUpdate", db
 
 @router.delete("/menus/{menu_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_menu(menu_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.delete_menu(db, menu_id)
+    deleted = MenuService.delete_menu(db, menu_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
     return None
 
 
 # Menu item endpoints
-@router.post("/menu-items", response_model="inorta_backend.schemas.menu.MenuItemResponse", status_code=status.HTTP_201_CREATED)
-def create_menu_item(item: "inorta_backend.schemas.menu.MenuItemCreate", db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.create_menu_item(db, item)
-
-
-@router.get("/menu-items", response_model=List["inorta_backend.schemas.menu.MenuItemResponse"])
-def get_menu_items(menu_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.get_menu_items(db, menu_id, skip, limit)
-
-
-@router.get("/menu-items/{item_id}", response_model="inorta_backend.schemas.menu.MenuItemResponse")
-def get_menu_item(item_id: int, db: Session = Depends(get_db)):
-    item = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.get_menu_item_by_id(db, item_id)
+@router.post("/menu-items", response_model=MenuItemResponse, status_code=status.HTTP_201_CREATED)
+def create_menu_item(item: MenuItemCreate, db: Session = Depends(get_db)):
+    return MenuService.create_menu_item(db, item)
+
+
+@router.get("/menu-items", response_model=List[MenuItemResponse])
+def get_menu_items(
+    response: Response,
+    menu_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items = MenuService.get_menu_items(db, menu_id, skip, limit, after=decode_after_cursor(after, size=2))
+    return set_next_cursor(response, items, limit, attrs=("order", "id"))
+
+
+@router.get("/menu-items/{item_id}", response_model=MenuItemResponse)
+def get_menu_item(item_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = not_modified(request, response, probe_item(db, MenuItem, item_id))
+    if cached:
+        return cached
+    item = MenuService.get_menu_item_by_id(db, item_id)
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
     return item
 
 
-@router.put("/menu-items/{item_id}", response_model="inorta_backend.schemas.menu.MenuItemResponse")
-def update_menu_item(item_id: int, item: "inorta_backend.schemas.menu.MenuItemUpdate", db: Session = Depends(get_db)):
-    updated = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.update_menu_item(db, item_id, item)
+@router.put("/menu-items/{item_id}", response_model=MenuItemResponse)
+def update_menu_item(item_id: int, item: MenuItemUpdate, db: Session = Depends(get_db)):
+    updated = MenuService.update_menu_item(db, item_id, item)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
     return updated
@@ -274,7 +756,7 @@ def update_menu_item(item_id: int, item: "inorta_backend.schemas.menu.MenuItemUp
 
 @router.delete("/menu-items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
-    deleted = __import__('inorta_backend.services.menu_service', fromlist=['MenuService']).MenuService.delete_menu_item(db, item_id)
+    deleted = MenuService.delete_menu_item(db, item_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
     return None
@@ -284,25 +766,48 @@ def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """Create a new user"""
-    # Check if user already exists
-    existing_user = UserService.get_user_by_email(db, user.email)
-    if existing_user:
+    # Duplicate emails are rejected by the unique index, not looked up first
+    try:
+        return UserService.create_user(db, user)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=str(e)
         )
-    return UserService.create_user(db, user)
+
+
+@router.post("/users/bulk", response_model=BulkResult)
+def bulk_create_users(
+    users: List[UserCreate] = Body(..., max_length=BULK_MAX_ITEMS),
+    upsert: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Create many users at once; with `upsert=true` existing emails are updated instead of rejected"""
+    try:
+        return BulkResult.from_items(UserService.bulk_create_users(db, users, upsert=upsert))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/users", response_model=List[UserResponse])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Get all users with pagination"""
-    return UserService.get_users(db, skip=skip, limit=limit)
+    items = UserService.get_users(db, skip=skip, limit=limit, after=decode_after_cursor(after))
+    return set_next_cursor(response, items, limit)
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get user by ID"""
+    cached = not_modified(request, response, probe_item(db, User, user_id))
+    if cached:
+        return cached
     user = UserService.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
@@ -334,3 +839,35 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
             detail="User not found"
         )
     return None
+
+
+# Internal endpoints
+
+@router.get("/internal/response-cache")
+def get_response_cache_stats():
+    """Entry count and hit/miss/store/invalidation/eviction counters of the GET response cache"""
+    return response_cache.stats()
+
+
+@router.get("/internal/pool")
+def get_db_pool_stats():
+    """Per engine: checkout latency histogram (ms), checkouts, waits, timeouts, idle pings and live pool gauges"""
+    return get_pool_stats()
+
+
+@router.get("/internal/replicas")
+def get_replica_stats():
+    """Per read replica: sessions reading from it now and sessions routed to it so far"""
+    return replica_set.stats() if replica_set is not None else []
+
+
+@router.get("/internal/derivatives")
+def get_derivative_stats():
+    """Image derivative renders started, joined by a concurrent request and still in flight"""
+    return media_derivatives.stats()
+
+
+@router.get("/internal/open-files")
+def get_open_file_stats():
+    """Open media file descriptors cached by this worker, with hit and miss counts"""
+    return open_files.stats()
@@ -0,0 +1,45 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from inorta_backend.core.config import settings
+from inorta_backend.db.instrumentation import track_queries
+
+
+class ServerTimingMiddleware:
+    """Count the SQL each request runs and report it in a `Server-Timing` header.
+
+    The header carries `db` (statements and their total time) and `app` (time to the
+    response start). SELECT shapes repeated `repeat_threshold` times within one
+    request, the signature of a relationship lazy-loaded in a loop, are reported as
+    likely N+1 queries and counted in an `n1` metric.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int = settings.sql_repeat_threshold):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        with track_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    app_ms = (time.perf_counter() - start) * 1000
+                    metrics = [
+                        f'db;dur={stats.duration_ms:.2f};desc="{stats.count} queries"',
+                        f"app;dur={app_ms:.2f}",
+                    ]
+                    repeated = stats.repeated(self.repeat_threshold)
+                    if repeated:
+                        metrics.append(f'n1;desc="{len(repeated)} repeated queries"')
+                        for shape, count in repeated:
+                            print(f"! Likely N+1 on {scope['method']} {scope['path']}: {count} x {shape}")
+                    header = ", ".join(metrics).encode("latin-1")
+                    message = {**message, "headers": [*message["headers"], (b"server-timing", header)]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
@@ -0,0 +1 @@
+"""Load tests and benchmarks; run `python -m inorta_backend.bench --help`"""
@@ -0,0 +1,187 @@
+"""Benchmark commands: `python -m inorta_backend.bench <command>`"""
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+
+from inorta_backend.bench import baseline
+from inorta_backend.bench.dataset import SCALES, DatasetSize, seed, seeded_dataset
+from inorta_backend.bench.load import in_process, run_load, serve
+from inorta_backend.bench.services import CASES, run_cases
+
+DEFAULT_DATABASE_URL = "sqlite:///./bench.db"
+LOAD_COLUMNS = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+SERVICE_COLUMNS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "queries_per_call", "db_ms_per_call")
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help="Benchmark database; its tables are dropped and recreated")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the dataset and the traffic")
+    parser.add_argument("--no-seed", action="store_true",
+                        help="Reuse the dataset already in the database, with the size it was seeded with")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Preset dataset size; single counts still override it")
+    for field in fields(DatasetSize):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=int)
+
+
+def dataset_size(args: argparse.Namespace) -> DatasetSize:
+    size = SCALES[args.scale] if args.scale else DatasetSize()
+    overrides = {field.name: getattr(args, field.name) for field in fields(DatasetSize)}
+    return DatasetSize(**{**size.as_dict(), **{name: value for name, value in overrides.items() if value is not None}})
+
+
+def seed_database(args: argparse.Namespace) -> None:
+    engine = create_engine(args.database_url)
+    start = time.perf_counter()
+
+    def progress(table: str, count: int) -> None:
+        print(f"  {table}: {count} rows ({time.perf_counter() - start:.1f}s)")
+
+    counts = seed(engine, dataset_size(args), seed=args.seed, progress=progress)
+    engine.dispose()
+    print(f"✓ Seeded {sum(counts.values())} rows in {time.perf_counter() - start:.1f}s")
+
+
+def prepare_dataset(args: argparse.Namespace) -> DatasetSize:
+    """Seed the database, or read back the size it was seeded with under --no-seed"""
+    if not args.no_seed:
+        seed_database(args)
+        return dataset_size(args)
+    engine = create_engine(args.database_url)
+    try:
+        recorded = seeded_dataset(engine)
+    finally:
+        engine.dispose()
+    if recorded is None:
+        raise RuntimeError(f"{args.database_url} was not seeded by this tool; run without --no-seed")
+    args.seed = recorded["seed"]
+    return recorded["size"]
+
+
+@contextmanager
+def target(args: argparse.Namespace):
+    if args.url:
+        yield args.url
+    elif args.in_process:
+        with in_process(args.database_url) as transport:
+            yield transport
+    else:
+        with serve(args.database_url, args.workers) as url:
+            yield url
+
+
+def load_test(args: argparse.Namespace) -> None:
+    size = prepare_dataset(args)
+    with target(args) as transport_or_url:
+        result = run_load(
+            transport_or_url, size, concurrency=args.concurrency, duration=args.duration,
+            requests=args.requests, warmup=args.warmup, seed=args.seed,
+        )
+    report = result.report()
+    print(baseline.format_table({**report["endpoints"], "total": report["total"]}, LOAD_COLUMNS))
+    if args.output:
+        config = {
+            "database": args.database_url.split(":", 1)[0],
+            "target": args.url or ("in-process" if args.in_process else f"uvicorn x{args.workers}"),
+            "concurrency": args.concurrency, "duration": args.duration, "requests": args.requests,
+            "warmup": args.warmup, "seed": args.seed, "dataset": size.as_dict(),
+        }
+        baseline.save(args.output, "load", config, report)
+        print(f"✓ Results written to {args.output}")
+
+
+def service_benchmarks(args: argparse.Namespace) -> None:
+    size = prepare_dataset(args)
+    cases = [case for case in CASES if not args.case or any(pattern in case.name for pattern in args.case)]
+    engine = create_engine(args.database_url)
+    try:
+        results = run_cases(
+            engine, size, cases, iterations=args.iterations, warmup=args.warmup, seed=args.seed,
+            explain=not args.no_explain,
+        )
+    finally:
+        engine.dispose()
+    print(baseline.format_table(results, SERVICE_COLUMNS))
+    for name, result in results.items():
+        for scan in result.get("full_scans", []):
+            print(f"! {name}: full scan: {scan}")
+        if args.plans:
+            for plan in result.get("plans", []):
+                print(f"\n{name}\n  {plan['statement']}\n" + "".join(f"    {step}\n" for step in plan["plan"]))
+    if args.output:
+        config = {
+            "database": args.database_url.split(":", 1)[0], "iterations": args.iterations, "warmup": args.warmup,
+            "seed": args.seed, "dataset": size.as_dict(),
+        }
+        baseline.save(args.output, "services", config, {"cases": results})
+        print(f"✓ Results written to {args.output}")
+
+
+def compare_results(args: argparse.Namespace) -> None:
+    before, after = baseline.load(args.baseline), baseline.load(args.current)
+    if before.get("kind") != after.get("kind"):
+        raise RuntimeError("Can't compare a load test with service benchmarks")
+    if before.get("config") != after.get("config"):
+        print("! The runs used different settings; compare like with like")
+    section = "cases" if before.get("kind") == "services" else "endpoints"
+    rows, regressions = baseline.compare(before, after, threshold=args.threshold, section=section)
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['name']:<48} {row['metric']:>16} {row['baseline']:>10} -> {row['current']:>10} "
+              f"{row['change']:+8.1%}{flag}")
+    if regressions:
+        raise RuntimeError(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m inorta_backend.bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Fill a database with the synthetic dataset")
+    add_dataset_arguments(seed_parser)
+    seed_parser.set_defaults(func=seed_database)
+
+    load_parser = commands.add_parser("load", help="Drive the API with concurrent clients")
+    add_dataset_arguments(load_parser)
+    load_parser.add_argument("--url", help="Base URL of a running server instead of starting one")
+    load_parser.add_argument("--in-process", action="store_true", help="Call the app in this process, without HTTP")
+    load_parser.add_argument("--workers", type=int, default=1, help="Uvicorn worker processes")
+    load_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    load_parser.add_argument("--duration", type=float, default=30.0, help="Seconds to measure")
+    load_parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    load_parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of unmeasured traffic first")
+    load_parser.add_argument("--output", help="Write the results as JSON, e.g. benchmarks/load-<commit>.json")
+    load_parser.set_defaults(func=load_test)
+
+    services_parser = commands.add_parser("services", help="Time service calls, with their queries and plans")
+    add_dataset_arguments(services_parser)
+    services_parser.add_argument("--iterations", type=int, default=200, help="Measured calls per case")
+    services_parser.add_argument("--warmup", type=int, default=20, help="Unmeasured calls per case first")
+    services_parser.add_argument("--case", action="append", help="Only cases whose name contains this; repeatable")
+    services_parser.add_argument("--plans", action="store_true", help="Print the query plan of every statement")
+    services_parser.add_argument("--no-explain", action="store_true", help="Skip query plans")
+    services_parser.add_argument("--output", help="Write the results as JSON, e.g. benchmarks/services-<commit>.json")
+    services_parser.set_defaults(func=service_benchmarks)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files; fails on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Tolerated relative change")
+    compare_parser.set_defaults(func=compare_results)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"✗ {args.command} failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Benchmark results as JSON baselines, and comparison of two of them"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """What a result was measured on; results are only comparable on the same machine"""
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, kind: str, config: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    document = {
+        "format": FORMAT_VERSION,
+        "kind": kind,
+        "environment": environment(),
+        "config": config,
+        **results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    return document
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+# (metric, True when higher is better)
+COMPARED_METRICS = (
+    ("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("queries_per_call", False),
+)
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10, section: str = "endpoints"
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Relative change of each metric per entry in both documents, and the regressions.
+
+    A regression is a change for the worse by more than `threshold` (0.10 = 10%).
+    Entries present in only one document are skipped.
+    """
+    rows: List[Dict[str, Any]] = []
+    regressions: List[str] = []
+    before, after = baseline.get(section, {}), current.get(section, {})
+    for name in sorted(set(before) & set(after)):
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = before[name].get(metric), after[name].get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            regressed = worse > threshold
+            rows.append({"name": name, "metric": metric, "baseline": old, "current": new,
+                         "change": round(change, 4), "regressed": regressed})
+            if regressed:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+    return rows, regressions
+
+
+def format_table(report: Dict[str, Dict[str, Any]], columns: Tuple[str, ...]) -> str:
+    """Fixed-width text table of a {name: {column: value}} report"""
+    names = list(report)
+    width = max([len(name) for name in names] + [8])
+    lines = [f"{'':<{width}}  " + "  ".join(f"{column:>10}" for column in columns)]
+    for name in names:
+        values = report[name]
+        lines.append(f"{name:<{width}}  " + "  ".join(f"{values.get(column, ''):>10}" for column in columns))
+    return "\n".join(lines)
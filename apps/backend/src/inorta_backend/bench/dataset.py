@@ -0,0 +1,343 @@
+"""Synthetic CMS dataset for benchmarks, written with batched driver-level inserts"""
+import itertools
+import json
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from inorta_backend.db.session import Base
+# Import all models so every table is created
+from inorta_backend.models import (  # noqa: F401
+    category, category_closure, content, content_category, content_tag, media, menu, menu_item, role,
+    settings, tag, user,
+)
+from inorta_backend.models.category import Category
+from inorta_backend.models.content import Content
+from inorta_backend.models.content_category import ContentCategory
+from inorta_backend.models.content_tag import ContentTag
+from inorta_backend.models.media import Media
+from inorta_backend.models.menu import Menu
+from inorta_backend.models.menu_item import MenuItem
+from inorta_backend.models.role import Role
+from inorta_backend.models.settings import Setting
+from inorta_backend.models.tag import Tag
+from inorta_backend.models.user import User
+from inorta_backend.services.category_service import CategoryService
+from inorta_backend.services.search_service import SearchService
+
+# Rows per executemany call; large enough to amortize round trips, small enough to stream
+SEED_BATCH_SIZE = 10000
+
+# Setting that records the size and seed a database was filled with
+DATASET_SETTING_KEY = "bench.dataset"
+
+# Body text vocabulary; the search benchmark queries these words
+WORDS = (
+    "python", "cache", "index", "query", "latency", "throughput", "database", "release", "garden", "travel",
+    "recipe", "design", "market", "climate", "energy", "music", "review", "guide", "launch", "update",
+    "security", "network", "storage", "profile", "search", "mobile", "cloud", "budget", "health", "sport",
+    "history", "science", "editor", "layout", "theme", "plugin", "backup", "server", "client", "stream",
+    "weekly", "notes", "story", "event", "policy", "report", "summary", "feature", "tutorial", "question",
+)
+
+ROLES = ("admin", "editor", "author")
+STATUS_WEIGHTS = {"published": 8, "draft": 1, "archived": 1}
+CONTENT_TYPES = ("post", "page", "article")
+MENU_LOCATIONS = ("header", "footer", "sidebar")
+MIME_TYPES = (("jpg", "image/jpeg"), ("png", "image/png"), ("pdf", "application/pdf"), ("mp4", "video/mp4"))
+
+# Same virtual table as migration 0006, for databases created with create_all
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contents_fts "
+    "USING fts5(title, excerpt, content, tokenize='unicode61')"
+)
+
+
+@dataclass
+class DatasetSize:
+    """Row counts of each seeded table"""
+
+    users: int = 200
+    contents: int = 5000
+    tags: int = 300
+    tags_per_content: int = 3
+    categories: int = 100
+    menus: int = 6
+    items_per_menu: int = 30
+    media: int = 2000
+    settings: int = 50
+    body_words: int = 120
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+# Named scales by number of contents; the other tables grow with them, bodies get shorter
+SCALES: Dict[str, DatasetSize] = {
+    "10k": DatasetSize(users=500, contents=10_000, tags=1_000, categories=200, menus=10, items_per_menu=40,
+                       media=5_000, settings=100, body_words=120),
+    "1m": DatasetSize(users=20_000, contents=1_000_000, tags=20_000, categories=2_000, menus=50, items_per_menu=60,
+                      media=200_000, settings=200, body_words=60),
+    "10m": DatasetSize(users=100_000, contents=10_000_000, tags=100_000, categories=10_000, menus=100,
+                       items_per_menu=80, media=1_000_000, settings=200, body_words=30),
+}
+
+# Driver placeholders usable with positional executemany
+_POSITIONAL = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+
+
+def _insert(conn: Connection, model: Any, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    """Insert rows from a generator in batches, so memory stays flat at any size.
+
+    Rows go to the driver's executemany as tuples, run through each column's bind
+    processor; this skips the per-row work of ORM and Core inserts, which dominates
+    at millions of rows. Drivers with named placeholders use a Core insert instead.
+    """
+    table = model.__table__
+    dialect = conn.dialect
+    placeholder = _POSITIONAL.get(dialect.paramstyle)
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return count
+        if placeholder is None:
+            conn.execute(insert(table), batch)
+        else:
+            # Columns the generator fills; the rest (autoincrement ids) are left to the database
+            columns = [table.c[name] for name in batch[0]]
+            processors = [column.type.dialect_impl(dialect).bind_processor(dialect) for column in columns]
+            statement = "INSERT INTO {} ({}) VALUES ({})".format(
+                dialect.identifier_preparer.format_table(table),
+                ", ".join(dialect.identifier_preparer.quote(column.name) for column in columns),
+                ", ".join([placeholder] * len(columns)),
+            )
+            conn.exec_driver_sql(statement, [
+                tuple(
+                    value if process is None or value is None else process(value)
+                    for value, process in zip(row.values(), processors)
+                )
+                for row in batch
+            ])
+        count += len(batch)
+
+
+class DatasetGenerator:
+    """Deterministic rows for every table; ids are assigned here, starting at 1.
+
+    The same `size` and `seed` always produce the same dataset, so benchmark runs
+    on different commits read identical data.
+    """
+
+    def __init__(self, size: DatasetSize, seed: int = 0):
+        self.size = size
+        self.seed = seed
+        self.now = datetime(2026, 1, 1)
+
+    def _rng(self, table: str) -> random.Random:
+        # One stream per table, so resizing one table leaves the others unchanged
+        return random.Random(f"{self.seed}:{table}")
+
+    def roles(self) -> Iterator[Dict[str, Any]]:
+        for index, name in enumerate(ROLES, start=1):
+            yield {"id": index, "name": name, "description": f"{name.title()} role",
+                   "created_at": self.now, "updated_at": self.now}
+
+    def users(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("users")
+        for user_id in range(1, self.size.users + 1):
+            yield {
+                "id": user_id, "email": f"user{user_id}@example.com", "name": f"User {user_id}",
+                "username": f"user{user_id}", "is_active": True, "is_superuser": user_id == 1,
+                "role_id": rng.randint(1, len(ROLES)), "created_at": self.now, "updated_at": self.now,
+            }
+
+    def tags(self) -> Iterator[Dict[str, Any]]:
+        for tag_id in range(1, self.size.tags + 1):
+            word = WORDS[(tag_id - 1) % len(WORDS)]
+            yield {"id": tag_id, "name": f"{word} {tag_id}", "slug": f"{word}-{tag_id}",
+                   "created_at": self.now, "updated_at": self.now}
+
+    def categories(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("categories")
+        roots = max(1, self.size.categories // 10)
+        for category_id in range(1, self.size.categories + 1):
+            # A forest of a few roots, each new category under a random earlier one
+            parent_id = None if category_id <= roots else rng.randint(1, category_id - 1)
+            yield {
+                "id": category_id, "name": f"Category {category_id}", "slug": f"category-{category_id}",
+                "description": None, "parent_id": parent_id, "order": category_id, "is_active": True,
+                "created_at": self.now, "updated_at": self.now,
+            }
+
+    def contents(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("contents")
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        cum_weights = list(itertools.accumulate(weights))
+        # Texts are windows of one random word stream: drawing every word of every
+        # body would be most of the seeding time at millions of rows
+        corpus = rng.choices(WORDS, k=1 << 16)
+        last_start = len(corpus) - self.size.body_words - 4
+        for content_id in range(1, self.size.contents + 1):
+            status = rng.choices(statuses, cum_weights=cum_weights)[0]
+            start = rng.randint(0, last_start)
+            body = " ".join(corpus[start:start + self.size.body_words])
+            start = rng.randint(0, last_start)
+            title = " ".join(corpus[start:start + 4]).capitalize()
+            created = self.now - timedelta(minutes=self.size.contents - content_id)
+            yield {
+                "id": content_id, "title": title, "slug": f"post-{content_id}", "content": body,
+                "excerpt": body[:160], "author_id": rng.randint(1, self.size.users), "status": status,
+                "content_type": rng.choice(CONTENT_TYPES),
+                "published_at": created if status == "published" else None,
+                "created_at": created, "updated_at": created, "views_count": rng.randint(0, 10000),
+                "featured_image_id": rng.randint(1, self.size.media) if self.size.media else None,
+            }
+
+    def content_tags(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("content_tags")
+        # Skewed popularity: a few tags are on many contents, most on few
+        tag_ids = range(1, self.size.tags + 1)
+        cum_weights = list(itertools.accumulate(1 / tag_id for tag_id in tag_ids))
+        per_content = min(self.size.tags_per_content, self.size.tags)
+        for content_id in range(1, self.size.contents + 1):
+            chosen = set()
+            while len(chosen) < per_content:
+                chosen.update(rng.choices(tag_ids, cum_weights=cum_weights, k=per_content - len(chosen)))
+            for tag_id in sorted(chosen):
+                yield {"content_id": content_id, "tag_id": tag_id, "created_at": self.now}
+
+    def content_categories(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("content_categories")
+        for content_id in range(1, self.size.contents + 1):
+            yield {"content_id": content_id, "category_id": rng.randint(1, self.size.categories),
+                   "created_at": self.now}
+
+    def menus(self) -> Iterator[Dict[str, Any]]:
+        for menu_id in range(1, self.size.menus + 1):
+            location = MENU_LOCATIONS[menu_id - 1] if menu_id <= len(MENU_LOCATIONS) else None
+            yield {"id": menu_id, "name": f"Menu {menu_id}", "location": location,
+                   "created_at": self.now, "updated_at": self.now}
+
+    def menu_items(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("menu_items")
+        item_id = 0
+        for menu_id in range(1, self.size.menus + 1):
+            first = item_id + 1
+            for position in range(self.size.items_per_menu):
+                item_id += 1
+                # A third of the items nest under an earlier item of the same menu
+                parent_id = rng.randint(first, item_id - 1) if item_id > first and rng.random() < 0.33 else None
+                yield {
+                    "id": item_id, "menu_id": menu_id, "parent_id": parent_id, "label": f"Item {item_id}",
+                    "url": f"/page-{item_id}", "target": "_self", "icon": None, "order": position,
+                    "is_active": True, "created_at": self.now, "updated_at": self.now,
+                }
+
+    def media(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("media")
+        for media_id in range(1, self.size.media + 1):
+            extension, mime_type = rng.choice(MIME_TYPES)
+            filename = f"file-{media_id}.{extension}"
+            yield {
+                "id": media_id, "filename": filename, "original_filename": filename,
+                "file_path": f"uploads/{filename}", "file_url": f"/media/{filename}",
+                "file_type": mime_type.split("/")[0], "mime_type": mime_type,
+                "size": rng.randint(10_000, 5_000_000), "alt_text": None, "caption": None,
+                "uploaded_by": rng.randint(1, self.size.users), "created_at": self.now, "updated_at": self.now,
+            }
+
+    def settings(self) -> Iterator[Dict[str, Any]]:
+        for setting_id in range(1, self.size.settings + 1):
+            yield {
+                "id": setting_id, "key": f"site.option_{setting_id}", "value": str(setting_id),
+                "data_type": "int", "category": "site", "description": None, "updated_at": self.now,
+            }
+
+
+def _analyze(conn: Connection) -> None:
+    """Refresh planner statistics, so query plans match the new data"""
+    if conn.dialect.name in ("sqlite", "postgresql"):
+        conn.execute(text("ANALYZE"))
+    elif conn.dialect.name in ("mysql", "mariadb"):
+        conn.execute(text("ANALYZE TABLE " + ", ".join(table.name for table in Base.metadata.sorted_tables)))
+
+
+def seed(
+    engine: Engine,
+    size: DatasetSize,
+    seed: int = 0,
+    batch_size: int = SEED_BATCH_SIZE,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, int]:
+    """Recreate every table on `engine` and fill it; returns the rows written per table.
+
+    Existing tables are dropped first, so point this at a database kept for benchmarks.
+    Secondary indexes are built after the rows are loaded, which is much faster than
+    maintaining them row by row; then the category closure index and the SQLite
+    full-text index are rebuilt and planner statistics refreshed. `progress` is
+    called with each table and its row count as it completes.
+    """
+    generator = DatasetGenerator(size, seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    counts: Dict[str, int] = {}
+    # Parents before children, in one transaction
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # A throwaway database: skip fsyncs and keep the rollback journal in memory
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            conn.exec_driver_sql("PRAGMA journal_mode = MEMORY")
+        for index in indexes:
+            index.drop(bind=conn)
+        for model, rows in (
+            (Role, generator.roles()),
+            (User, generator.users()),
+            (Tag, generator.tags()),
+            (Category, generator.categories()),
+            (Media, generator.media()),
+            (Content, generator.contents()),
+            (ContentTag, generator.content_tags()),
+            (ContentCategory, generator.content_categories()),
+            (Menu, generator.menus()),
+            (MenuItem, generator.menu_items()),
+            (Setting, generator.settings()),
+        ):
+            counts[model.__tablename__] = _insert(conn, model, rows, batch_size)
+            if progress:
+                progress(model.__tablename__, counts[model.__tablename__])
+        conn.execute(insert(Setting.__table__).values(
+            key=DATASET_SETTING_KEY, value=json.dumps({"size": size.as_dict(), "seed": seed}), data_type="json",
+            category="bench", updated_at=generator.now,
+        ))
+        for index in indexes:
+            index.create(bind=conn)
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("DROP TABLE IF EXISTS contents_fts"))
+            conn.execute(text(SQLITE_FTS_DDL))
+    with Session(engine) as db:
+        counts["category_closure"] = CategoryService.rebuild_closure(db)
+        SearchService.reindex(db)
+    with engine.begin() as conn:
+        _analyze(conn)
+    return counts
+
+
+def seeded_dataset(engine: Engine) -> Optional[Dict[str, Any]]:
+    """Size and seed recorded by `seed`, or None if the database wasn't seeded by it"""
+    try:
+        with engine.connect() as conn:
+            value = conn.scalar(select(Setting.value).where(Setting.key == DATASET_SETTING_KEY))
+    except Exception:
+        return None
+    if value is None:
+        return None
+    recorded = json.loads(value)
+    return {"size": DatasetSize(**recorded["size"]), "seed": recorded["seed"]}
@@ -0,0 +1,248 @@
+"""Concurrent HTTP load against the API, with per-endpoint throughput and latency"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.bench.dataset import WORDS, DatasetSize
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """One request of the traffic mix; `name` is the route template results are grouped by"""
+
+    name: str
+    weight: int
+    path: Callable[[random.Random, DatasetSize], str]
+
+
+# Read-heavy mix of a public site: item pages, feeds, navigation and search
+ENDPOINTS: Tuple[Endpoint, ...] = (
+    Endpoint("GET /api/contents/{content_id}", 25, lambda rng, size: f"/api/contents/{rng.randint(1, size.contents)}"),
+    Endpoint(
+        "GET /api/contents", 10,
+        lambda rng, size: f"/api/contents?status=published&order=-published_at&limit=20&skip={rng.randint(0, 5) * 20}",
+    ),
+    Endpoint(
+        "GET /api/categories/{category_id}/contents", 10,
+        lambda rng, size: f"/api/categories/{rng.randint(1, size.categories)}/contents?limit=20",
+    ),
+    Endpoint("GET /api/contents/by-tags", 5, lambda rng, size: f"/api/contents/by-tags?any={rng.randint(1, size.tags)}&limit=20"),
+    Endpoint("GET /api/contents/search", 5, lambda rng, size: f"/api/contents/search?q={rng.choice(WORDS)}"),
+    Endpoint("GET /api/menus/{menu_id}/tree", 15, lambda rng, size: f"/api/menus/{rng.randint(1, size.menus)}/tree"),
+    Endpoint("GET /api/categories", 5, lambda rng, size: "/api/categories"),
+    Endpoint("GET /api/tags", 5, lambda rng, size: "/api/tags?limit=50"),
+    Endpoint("GET /api/media/{media_id}", 5, lambda rng, size: f"/api/media/{rng.randint(1, size.media)}"),
+    Endpoint("GET /api/users/{user_id}", 5, lambda rng, size: f"/api/users/{rng.randint(1, size.users)}"),
+    Endpoint("GET /api/settings/snapshot", 10, lambda rng, size: "/api/settings/snapshot"),
+)
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies_ms)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if count else 0.0,
+    }
+
+
+class LoadResult:
+    """Latencies and error counts per endpoint of one run"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.elapsed = 0.0
+
+    def record(self, name: str, status_code: int, latency_ms: float) -> None:
+        self.latencies.setdefault(name, []).append(latency_ms)
+        counts = self.statuses.setdefault(name, {})
+        counts[status_code] = counts.get(status_code, 0) + 1
+        if status_code >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Summary of every endpoint, plus `total` over all requests"""
+        endpoints = {
+            name: summarize(latencies, self.errors.get(name, 0), self.elapsed)
+            for name, latencies in sorted(self.latencies.items())
+        }
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {"total": summarize(everything, sum(self.errors.values()), self.elapsed), "endpoints": endpoints}
+
+
+async def _client_loop(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    size: DatasetSize,
+    endpoints: Sequence[Endpoint],
+    result: Optional[LoadResult],
+    deadline: float,
+    budget: List[int],
+) -> None:
+    weights = [endpoint.weight for endpoint in endpoints]
+    while time.perf_counter() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        endpoint = rng.choices(endpoints, weights)[0]
+        path = endpoint.path(rng, size)
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            status_code = 599
+        if result is not None:
+            result.record(endpoint.name, status_code, (time.perf_counter() - start) * 1000)
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    size: DatasetSize,
+    concurrency: int,
+    duration: float,
+    requests: Optional[int],
+    warmup: float,
+    seed: int,
+    endpoints: Sequence[Endpoint],
+) -> LoadResult:
+    if warmup:
+        # Fill pools, caches and the page cache before measuring
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(
+            _client_loop(client, random.Random(f"warmup:{seed}:{worker}"), size, endpoints, None, deadline, [-1])
+            for worker in range(concurrency)
+        ))
+    result = LoadResult()
+    # Shared request budget; -1 runs until the deadline
+    budget = [requests if requests is not None else -1]
+    start = time.perf_counter()
+    deadline = start + duration if requests is None else float("inf")
+    await asyncio.gather(*(
+        _client_loop(client, random.Random(f"{seed}:{worker}"), size, endpoints, result, deadline, budget)
+        for worker in range(concurrency)
+    ))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_load(
+    transport_or_url,
+    size: DatasetSize,
+    concurrency: int = 16,
+    duration: float = 30.0,
+    requests: Optional[int] = None,
+    warmup: float = 0.0,
+    seed: int = 0,
+    endpoints: Sequence[Endpoint] = ENDPOINTS,
+) -> LoadResult:
+    """Send the weighted traffic mix from `concurrency` clients.
+
+    Runs for `duration` seconds, or until `requests` requests when given.
+    `transport_or_url` is a base URL of a running server, or an httpx transport
+    (e.g. `httpx.ASGITransport(app)`) to call the app in this process.
+    """
+    if isinstance(transport_or_url, str):
+        client_options = {"base_url": transport_or_url}
+    else:
+        client_options = {"base_url": "http://bench", "transport": transport_or_url}
+
+    async def main() -> LoadResult:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=30.0, **client_options) as client:
+            return await _drive(client, size, concurrency, duration, requests, warmup, seed, endpoints)
+
+    return asyncio.run(main())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(database_url: str, workers: int, startup_timeout: float = 60.0) -> Iterator[str]:
+    """Run `inorta_backend.main:app` under uvicorn on a free port; yields its base URL"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    # SQL echo (DEBUG) would dominate every timing
+    env = {**os.environ, "DATABASE_URL": database_url, "DEBUG": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "inorta_backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            try:
+                if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server not ready after {startup_timeout:.0f}s")
+            time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+@contextmanager
+def in_process(database_url: str) -> Iterator[httpx.ASGITransport]:
+    """The app called in this process, its sessions bound to `database_url`"""
+    from inorta_backend.db.session import get_db
+    from inorta_backend.main import app
+
+    engine = create_engine(database_url)
+    BenchSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    def override_get_db():
+        db = BenchSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield httpx.ASGITransport(app=app)
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
+        engine.dispose()
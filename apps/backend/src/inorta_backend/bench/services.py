@@ -0,0 +1,227 @@
+"""Service-layer microbenchmarks: per-call time, SQL statements and query plans"""
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from inorta_backend.bench.dataset import WORDS, DatasetSize
+from inorta_backend.bench.load import percentile
+from inorta_backend.db.instrumentation import capture_queries, statement_shape
+from inorta_backend.schemas.content import ContentStatus
+from inorta_backend.services.category_service import CategoryService
+from inorta_backend.services.content_service import ContentService
+from inorta_backend.services.menu_service import MenuService, menu_tree_cache
+from inorta_backend.services.search_service import SearchService
+from inorta_backend.services.setting_service import SettingService, settings_snapshot
+from inorta_backend.services.tag_index import tag_index
+from inorta_backend.services.taxonomy_service import TaxonomyService
+from inorta_backend.services.user_service import UserService
+
+
+@dataclass(frozen=True)
+class ServiceCase:
+    """One service call with arguments drawn from the dataset.
+
+    `before` runs ahead of every call, outside the timing, e.g. to empty a cache so
+    the cold path is measured.
+    """
+
+    name: str
+    call: Callable[[Session, random.Random, DatasetSize], Any]
+    before: Optional[Callable[[Session], None]] = None
+
+
+def _rebuild_tag_index(db: Session) -> None:
+    if not tag_index.is_warm:
+        tag_index.rebuild(db)
+
+
+CASES: Tuple[ServiceCase, ...] = (
+    ServiceCase(
+        "ContentService.get_content_by_slug",
+        lambda db, rng, size: ContentService.get_content_by_slug(db, f"post-{rng.randint(1, size.contents)}"),
+    ),
+    ServiceCase(
+        "ContentService.get_content_by_id",
+        lambda db, rng, size: ContentService.get_content_by_id(db, rng.randint(1, size.contents)),
+    ),
+    ServiceCase(
+        "ContentService.get_contents[published feed]",
+        lambda db, rng, size: ContentService.get_contents(
+            db, limit=20, status=ContentStatus.published, order="-published_at"
+        ),
+    ),
+    ServiceCase(
+        "ContentService.get_contents[author]",
+        lambda db, rng, size: ContentService.get_contents(
+            db, limit=20, author_id=rng.randint(1, size.users), order="-published_at"
+        ),
+    ),
+    ServiceCase(
+        "ContentService.get_contents[deep skip]",
+        lambda db, rng, size: ContentService.get_contents(db, skip=max(0, size.contents - 100), limit=20),
+    ),
+    ServiceCase(
+        "MenuService.get_menu_items",
+        lambda db, rng, size: MenuService.get_menu_items(db, rng.randint(1, size.menus)),
+    ),
+    ServiceCase(
+        "MenuService.get_menu_tree_json[cold]",
+        lambda db, rng, size: MenuService.get_menu_tree_json(db, rng.randint(1, size.menus)),
+        before=lambda db: menu_tree_cache.invalidate(),
+    ),
+    ServiceCase(
+        "MenuService.get_menu_tree_json[cached]",
+        lambda db, rng, size: MenuService.get_menu_tree_json(db, rng.randint(1, size.menus)),
+    ),
+    ServiceCase("CategoryService.get_categories", lambda db, rng, size: CategoryService.get_categories(db)),
+    ServiceCase(
+        "CategoryService.get_subtree",
+        lambda db, rng, size: CategoryService.get_subtree(db, rng.randint(1, size.categories)),
+    ),
+    ServiceCase(
+        "CategoryService.get_ancestors",
+        lambda db, rng, size: CategoryService.get_ancestors(db, rng.randint(1, size.categories)),
+    ),
+    ServiceCase(
+        "CategoryService.get_subtree_contents",
+        lambda db, rng, size: CategoryService.get_subtree_contents(db, rng.randint(1, size.categories), limit=20),
+    ),
+    ServiceCase(
+        "TaxonomyService.query_contents_by_tags[sql]",
+        lambda db, rng, size: TaxonomyService._query_contents_by_tags_sql(
+            db, [rng.randint(1, size.tags)], [], [], 20, None
+        ),
+    ),
+    ServiceCase(
+        "TaxonomyService.query_contents_by_tags[index]",
+        lambda db, rng, size: TaxonomyService.query_contents_by_tags(db, [rng.randint(1, size.tags)], limit=20),
+        before=_rebuild_tag_index,
+    ),
+    ServiceCase(
+        "SearchService.search_contents",
+        lambda db, rng, size: SearchService.search_contents(db, " ".join(rng.sample(WORDS, 2))),
+    ),
+    ServiceCase(
+        "SettingService.get_snapshot[cold]",
+        lambda db, rng, size: SettingService.get_snapshot(db),
+        before=lambda db: settings_snapshot.invalidate(),
+    ),
+    ServiceCase(
+        "UserService.get_user_by_email",
+        lambda db, rng, size: UserService.get_user_by_email(db, f"user{rng.randint(1, size.users)}@example.com"),
+    ),
+)
+
+
+def _explain(db: Session, statement: str, parameters: Any) -> List[str]:
+    """The database's plan of one statement, one line per step"""
+    dialect = db.get_bind().dialect.name
+    connection = db.connection()
+    if dialect == "sqlite":
+        return [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    if dialect in ("mysql", "mariadb"):
+        result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [
+            f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}".strip()
+            for row in result.mappings()
+        ]
+    if dialect == "postgresql":
+        return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+    return []
+
+
+def _full_scans(plan: Sequence[str]) -> List[str]:
+    """Plan steps that read a whole table (SQLite `SCAN t`, MySQL type=ALL, PostgreSQL Seq Scan)"""
+    return [
+        step for step in plan
+        if (step.startswith("SCAN ") and " USING " not in step and "VIRTUAL TABLE" not in step)
+        or "type=ALL" in step or "Seq Scan" in step
+    ]
+
+
+def query_plans(session_factory: sessionmaker, engine: Engine, case: ServiceCase, size: DatasetSize, seed: int) -> List[Dict[str, Any]]:
+    """Run the case once, recording its SELECTs, and explain each distinct one"""
+    statements: Dict[str, Tuple[str, Any]] = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            statements.setdefault(statement_shape(statement), (statement, parameters))
+
+    with session_factory() as db:
+        if case.before:
+            case.before(db)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            case.call(db, random.Random(seed), size)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return [
+            {"statement": shape, "plan": _explain(db, statement, parameters)}
+            for shape, (statement, parameters) in statements.items()
+        ]
+
+
+def run_case(
+    session_factory: sessionmaker,
+    case: ServiceCase,
+    size: DatasetSize,
+    iterations: int = 200,
+    warmup: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Time `iterations` calls, each on a fresh session as a request would get"""
+    rng = random.Random(f"{seed}:{case.name}")
+    timings: List[float] = []
+    statements: List[int] = []
+    db_ms: List[float] = []
+    for iteration in range(warmup + iterations):
+        with session_factory() as db:
+            if case.before:
+                case.before(db)
+            with capture_queries() as stats:
+                start = time.perf_counter()
+                case.call(db, rng, size)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+        if iteration >= warmup:
+            timings.append(elapsed_ms)
+            statements.append(stats.count)
+            db_ms.append(stats.duration_ms)
+    ordered = sorted(timings)
+    return {
+        "calls": iterations,
+        "mean_ms": round(sum(ordered) / len(ordered), 4),
+        "p50_ms": round(percentile(ordered, 50), 4),
+        "p95_ms": round(percentile(ordered, 95), 4),
+        "p99_ms": round(percentile(ordered, 99), 4),
+        "max_ms": round(ordered[-1], 4),
+        "queries_per_call": round(sum(statements) / len(statements), 2),
+        "max_queries": max(statements),
+        "db_ms_per_call": round(sum(db_ms) / len(db_ms), 4),
+    }
+
+
+def run_cases(
+    engine: Engine,
+    size: DatasetSize,
+    cases: Sequence[ServiceCase] = CASES,
+    iterations: int = 200,
+    warmup: int = 20,
+    seed: int = 0,
+    explain: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """Benchmark each case; with `explain`, add the plans of its statements and any full scans"""
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        result = run_case(session_factory, case, size, iterations=iterations, warmup=warmup, seed=seed)
+        if explain:
+            plans = query_plans(session_factory, engine, case, size, seed)
+            result["plans"] = plans
+            result["full_scans"] = [step for plan in plans for step in _full_scans(plan["plan"])]
+        results[case.name] = result
+    return results
@@ -0,0 +1,61 @@
+"""Maintenance commands: `python -m inorta_backend.cli <command>`"""
+import argparse
+import sys
+from typing import List, Optional
+
+from inorta_backend.db.session import SessionLocal
+# Import all models so relationships between them resolve
+from inorta_backend.models import (  # noqa: F401
+    category, category_closure, content, content_category, content_tag, media, menu, menu_item, role,
+    settings, tag, user,
+)
+from inorta_backend.services.content_render import RENDER_VERSION, backfill
+from inorta_backend.services.search_service import SearchService, get_search_engine
+
+
+def reindex_search(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        engine = get_search_engine(db)
+        count = SearchService.reindex(db)
+        print(f"✓ Reindexed {count} contents ({engine.name})")
+    finally:
+        db.close()
+
+
+def render_contents(args: argparse.Namespace) -> None:
+    count = backfill(
+        SessionLocal,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        rerender_all=args.all,
+        progress=lambda done: print(f"  {done} rendered", end="\r", flush=True),
+    )
+    print(f"✓ Rendered {count} contents (render version {RENDER_VERSION})")
+    if count:
+        # Generated excerpts are indexed by search, which this process didn't update
+        print("  Run `reindex-search` if the search backend is fts5 or memory")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m inorta_backend.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reindex-search", help="Rebuild the content full-text index").set_defaults(func=reindex_search)
+    render = commands.add_parser(
+        "render-contents", help="Render the HTML, excerpt, word count and reading time of contents not yet rendered"
+    )
+    render.add_argument("--all", action="store_true", help="Re-render every content, not only outdated ones")
+    render.add_argument("--batch-size", type=int, default=500, help="Contents per batch (default 500)")
+    render.add_argument("--workers", type=int, default=None, help="Render processes (default: one per CPU)")
+    render.set_defaults(func=render_contents)
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"✗ {args.command} failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -18,6 +20,96 @@ class Settings(BaseSettings):
     
     # Alternative SQLite for development
     # database_url: str = "sqlite:///./dev.db"
+
+    # Connection pool (QueuePool; ignored for in-memory SQLite). Each worker holds up to
+    # db_pool_size + db_pool_max_overflow connections; a checkout beyond that waits up to
+    # db_pool_timeout seconds for one to be returned, then fails
+    db_pool_size: int = 5
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    # Seconds after which a connection is replaced at checkout (-1 never); keep it below
+    # the server's idle timeout (MySQL wait_timeout)
+    db_pool_recycle: int = 3600
+    # Hand out the most recently returned connection first so surplus ones sit idle and
+    # get recycled, instead of rotating through every connection
+    db_pool_use_lifo: bool = False
+    # Liveness check on checkout: "always" (a round trip per checkout), "idle" (only for
+    # connections unused for db_pool_ping_idle seconds) or "never"
+    db_pool_pre_ping: str = "idle"
+    db_pool_ping_idle: float = 30
+
+    # Read replicas: comma-separated URLs. Sessions of GET/HEAD requests read from one of
+    # them, picked "round_robin" or by "least_connections"; writes go to database_url.
+    # After a successful write a client reads from the primary for
+    # db_replica_sticky_seconds (tracked in a cookie), so it sees its own writes despite
+    # replication lag; keep it above the lag you expect
+    database_replica_urls: str = ""
+    db_replica_strategy: str = "round_robin"
+    db_replica_sticky_seconds: float = 5.0
+
+    # SQL instrumentation: per-request statement count and DB time in a Server-Timing
+    # header, and a warning when one SELECT shape repeats this often in a request (N+1)
+    sql_instrumentation: bool = True
+    sql_repeat_threshold: int = 10
+
+    # Metrics served in Prometheus format at /metrics. With several worker processes set
+    # metrics_dir to a directory they share (emptied before each start): every worker
+    # writes its series there each metrics_flush_interval seconds and a scrape sums them
+    metrics_enabled: bool = True
+    metrics_dir: Optional[str] = None
+    metrics_flush_interval: float = 5.0
+
+    # Serve CRUD routes as `async def` on an AsyncSession (aiomysql / aiosqlite)
+    use_async_db: bool = False
+    # Defaults to database_url with its driver swapped for the async one
+    async_database_url: Optional[str] = None
+
+    # Caching
+    # Seconds a worker may serve its settings snapshot before re-reading the table;
+    # bounds staleness across workers, writes in the same worker invalidate at once
+    settings_cache_ttl: int = 60
+    # Seconds a worker answers multi-tag queries from its in-memory posting lists before
+    # reloading them from content_tags; cold or stale queries fall back to SQL meanwhile
+    tag_index_ttl: int = 300
+    # Seconds a worker serves a menu tree it built; writes in other workers show up
+    # once it expires
+    menu_tree_cache_ttl: int = 60
+    # Seconds a serialized GET /api response may be served from the in-process response
+    # cache (0 disables it), and the most responses kept; writes evict dependent entries
+    response_cache_ttl: float = 30
+    response_cache_size: int = 1024
+
+    # View counting
+    # Seconds between batched views_count flushes (also the loss window on a crash
+    # when no spool is configured)
+    view_flush_interval: float = 5.0
+    # Optional append-only file that pending views are written to, replayed on startup;
+    # each worker writes <view_spool_path>.<pid> next to it
+    view_spool_path: Optional[str] = None
+    # Most contents with buffered views per worker; views of others are dropped until a flush
+    view_max_pending_ids: int = 10000
+    # Media uploads are stored once per content hash under media_root and linked as
+    # media_base_url + "/" + file_path; bodies larger than media_max_upload_size bytes
+    # are rejected with 413
+    media_root: str = "./media"
+    media_base_url: str = "/media"
+    media_max_upload_size: int = 4 * 1024 ** 3
+    # Open file descriptors each worker keeps for serving media (0 opens one per
+    # request), trusted for media_open_files_valid seconds before the path is re-checked
+    media_open_files: int = 512
+    media_open_files_valid: float = 5.0
+    # Image derivatives (needs Pillow): comma-separated name=WIDTHxHEIGHT:format presets
+    # (jpeg, png or webp), fitted inside the box without upscaling. Rendered on first
+    # request, or right after upload for the media_derivatives_eager ones, in a pool of
+    # media_derivative_workers processes per worker
+    media_derivative_presets: str = "thumb=320x320:webp,medium=1024x1024:webp,large=2048x2048:jpeg"
+    media_derivatives_eager: str = "thumb"
+    media_derivative_workers: int = 2
+    media_derivative_quality: int = 82
+
+    # Full-text search engine: "auto" (FTS5 on SQLite, FULLTEXT on MySQL, else memory),
+    # "fts5", "mysql" or "memory" (pure-Python inverted index, single process only)
+    search_backend: str = "auto"
     
     # Security
     secret_key: str = "replace-me-with-secure-key"
@@ -0,0 +1,121 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bound parameters in any DBAPI paramstyle: ?, %s, %(name)s, :name, $1
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+|\$\d+")
+# Runs of parameters (IN lists, multi-row VALUES) of any length
+_PARAM_RUNS = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUE_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with its parameters and IN/VALUES lists collapsed, for grouping repeats"""
+    shape = _PARAMS.sub("?", statement)
+    shape = _PARAM_RUNS.sub("?", shape)
+    shape = _VALUE_ROWS.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Statements run in one scope (a request, or a test block): count, time and shapes"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.duration_ms += elapsed_ms
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """SELECT shapes run at least `threshold` times, most frequent first; likely N+1 loads"""
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count >= threshold and shape[:6].upper() == "SELECT"
+        ]
+
+    def summary(self) -> str:
+        lines = [f"{self.count} statements in {self.duration_ms:.1f} ms"]
+        lines.extend(f"  {count} x {shape}" for shape, count in self.shapes.most_common())
+        return "\n".join(lines)
+
+
+# Stats of the request being served in this context (copied into threadpool workers)
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+# Process-wide captures opened by `capture_queries`, whatever thread runs the statements
+_captures: List[QueryStats] = []
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Attribute every statement run in this context to a fresh QueryStats"""
+    stats = QueryStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Record every statement run by any engine in the process while the block runs"""
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Fail if the block (e.g. one test client call) runs more than `limit` statements"""
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f"Expected at most {limit} statements, got {stats.summary()}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _captures or _request_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+    started: Optional[list] = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    for capture in list(_captures):
+        capture.record(statement, elapsed_ms)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
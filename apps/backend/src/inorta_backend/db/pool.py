@@ -0,0 +1,198 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from inorta_backend.core.config import settings
+
+# Upper bounds (ms) of the checkout latency histogram buckets; the last is +Inf
+CHECKOUT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram (Prometheus style) with sum and count"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile; None when empty or beyond the last bucket"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, seen = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            seen += count
+            cumulative.append([bound, seen])
+        return {
+            "buckets": cumulative,
+            "sum": round(self.sum, 3),
+            "count": self.count,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class PoolStats:
+    """Checkout counters of one engine's pool plus its live gauges.
+
+    `waits` counts checkouts that found the pool and its overflow exhausted and had
+    to block for a returned connection; `timeouts` those that gave up after
+    `pool_timeout`. Latency covers the whole checkout, including opening new
+    connections and any pre-ping.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.pings = 0
+        self.checkout_ms = LatencyHistogram(CHECKOUT_BUCKETS_MS)
+        self._pool: Optional[weakref.ReferenceType] = None
+        self._lock = threading.Lock()
+
+    def attach(self, pool: Pool) -> None:
+        self._pool = weakref.ref(pool)
+
+    def record(self, elapsed_ms: float, waited: bool, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.waits += waited
+            self.timeouts += timed_out
+            self.checkout_ms.observe(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self._pool() if self._pool is not None else None
+        with self._lock:
+            data: Dict[str, Any] = {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "pings": self.pings,
+                "checkout_ms": self.checkout_ms.snapshot(),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+            )
+        return data
+
+
+# Stats of every instrumented engine by name, for the internal pool endpoint
+pool_stats: Dict[str, PoolStats] = {}
+
+
+class _InstrumentedQueuePool:
+    """Times `_do_get`, the step where a checkout may open a connection or block"""
+
+    stats: PoolStats
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats.attach(self)
+
+    def _do_get(self):
+        waited = self._max_overflow > -1 and self._overflow >= self._max_overflow and self.checkedin() == 0
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record((time.perf_counter() - start) * 1000, waited, timed_out)
+
+
+def instrumented_pool_class(base: type, stats: PoolStats) -> type:
+    """Subclass of the QueuePool `base` that reports checkouts to `stats`.
+
+    The stats live on the class so a pool recreated by `Engine.dispose()` keeps them.
+    """
+    return type(f"Instrumented{base.__name__}", (_InstrumentedQueuePool, base), {"stats": stats})
+
+
+def pool_options(url: str, name: str, is_async: bool = False) -> Dict[str, Any]:
+    """`create_engine` keyword arguments for the configured pool, registering its stats as `name`"""
+    if settings.db_pool_pre_ping not in PRE_PING_STRATEGIES:
+        raise ValueError(f"db_pool_pre_ping must be one of {', '.join(PRE_PING_STRATEGIES)}")
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection; there is no queue to tune
+        return {}
+    stats = pool_stats[name] = PoolStats(name)
+    return {
+        "poolclass": instrumented_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_pool_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+        "pool_pre_ping": settings.db_pool_pre_ping == "always",
+    }
+
+
+def install_idle_ping(engine: Engine, name: str, idle_seconds: Optional[float] = None) -> None:
+    """Ping a connection on checkout only if it sat unused in the pool for `idle_seconds`.
+
+    A connection returned moments ago is almost certainly alive, so this skips the
+    round trip that `pool_pre_ping` spends on every checkout. A failed ping raises
+    DisconnectionError, which makes the pool discard the connection and retry.
+    """
+    idle_seconds = settings.db_pool_ping_idle if idle_seconds is None else idle_seconds
+    stats = pool_stats.get(name)
+
+    @event.listens_for(engine, "checkin")
+    def remember_checkin(dbapi_connection, connection_record) -> None:
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        if stats is not None:
+            stats.pings += 1
+        try:
+            alive = engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise exc.DisconnectionError() from e
+        if alive is False:
+            raise exc.DisconnectionError()
+
+
+def configure_pool(engine: Engine, name: str) -> None:
+    """Apply the per-engine parts of the pool settings that aren't `create_engine` arguments"""
+    if settings.db_pool_pre_ping == "idle" and name in pool_stats:
+        install_idle_ping(engine, name)
+
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    return [{"engine": name, **stats.snapshot()} for name, stats in pool_stats.items()]
@@ -0,0 +1,161 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import TextClause, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+
+# Whether sessions opened in this context may read from a replica; set per request
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def replica_reads_allowed() -> bool:
+    return _replica_reads.get()
+
+
+@contextmanager
+def allow_replica_reads(allowed: bool = True) -> Iterator[None]:
+    """Let sessions opened inside the block read from replicas"""
+    token = _replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class RequestWrites:
+    """Whether a request has written to the database, set by any engine it used"""
+
+    def __init__(self):
+        self.wrote = False
+
+
+# Writes of the request being served in this context (shared with threadpool workers)
+_request_writes: ContextVar[Optional[RequestWrites]] = ContextVar("request_writes", default=None)
+
+
+@contextmanager
+def track_writes() -> Iterator[RequestWrites]:
+    """Record whether any statement run in this context writes"""
+    writes = RequestWrites()
+    token = _request_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _request_writes.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_write(conn, cursor, statement, parameters, context, executemany) -> None:
+    writes = _request_writes.get()
+    if writes is not None and not writes.wrote and statement.lstrip()[:7].upper().startswith(WRITE_VERBS):
+        writes.wrote = True
+
+
+class ReplicaSet:
+    """Replica engines and the strategy picking one for each session.
+
+    `round_robin` cycles through them; `least_connections` picks the one with the
+    fewest sessions currently reading from it, so a slow replica gets less work.
+    """
+
+    def __init__(self, engines: List[Engine], strategy: str = "round_robin"):
+        if not engines:
+            raise ValueError("A replica set needs at least one engine")
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Replica strategy must be one of {', '.join(REPLICA_STRATEGIES)}")
+        self.engines = engines
+        self.strategy = strategy
+        self.in_use: Dict[Engine, int] = {engine: 0 for engine in engines}
+        self.picks: Dict[Engine, int] = {engine: 0 for engine in engines}
+        self._cycle = itertools.cycle(engines)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Engine:
+        with self._lock:
+            if self.strategy == "least_connections":
+                engine = min(self.engines, key=self.in_use.__getitem__)
+            else:
+                engine = next(self._cycle)
+            self.in_use[engine] += 1
+            self.picks[engine] += 1
+            return engine
+
+    def release(self, engine: Engine) -> None:
+        with self._lock:
+            self.in_use[engine] -= 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"url": engine.url.render_as_string(hide_password=True), "in_use": self.in_use[engine],
+                 "picks": self.picks[engine]}
+                for engine in self.engines
+            ]
+
+
+def _is_write(clause: Any) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:7].upper().startswith(WRITE_VERBS)
+    return False
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica and writes to its own bind, the primary.
+
+    A replica is taken from `replicas` when the session opens in a context that
+    allows replica reads (see `allow_replica_reads`); otherwise, or without
+    replicas, everything goes to the primary. The first flush or INSERT/UPDATE/
+    DELETE pins the session to the primary for the rest of its life, so a unit of
+    work reads back its own writes.
+    """
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.replica: Optional[Engine] = None
+        if replicas is not None and replica_reads_allowed():
+            self.replica = replicas.acquire()
+
+    def get_bind(self, mapper=None, clause=None, **kwargs: Any):
+        if self.replica is not None:
+            if not self._flushing and not _is_write(clause):
+                return self.replica
+            self.pin_to_primary()
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def pin_to_primary(self) -> None:
+        if self.replica is not None:
+            self.replicas.release(self.replica)
+            self.replica = None
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self.pin_to_primary()
+
+
+def read_from_primary(db: Session) -> None:
+    """Send the rest of a session's statements to the primary.
+
+    For reads that fill a long-lived in-process cache: a lagging replica would have
+    them keep an old state well after the write that invalidated it.
+    """
+    if isinstance(db, RoutingSession):
+        db.pin_to_primary()
+
+
+def primary_bind(db: Session):
+    """The engine a session writes to, whatever its reads are routed to"""
+    return Session.get_bind(db)
@@ -1,24 +1,124 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator, List, Optional
 
 from inorta_backend.core.config import settings
+from inorta_backend.db.pool import configure_pool, pool_options
+from inorta_backend.db.routing import ReplicaSet, RoutingSession
 
-# Create engine
+# Create engine; pool sizing and liveness checks come from the DB_POOL_* settings
 engine = create_engine(
     settings.database_url,
     echo=settings.debug,
-    pool_pre_ping=True,
-    pool_recycle=3600
+    **pool_options(settings.database_url, "primary")
 )
+configure_pool(engine, "primary")
 
-# Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_replica_urls() -> List[str]:
+    return [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+
+
+def create_replica_set() -> Optional[ReplicaSet]:
+    """Engines for the configured read replicas, each with its own pool and pool stats"""
+    engines = []
+    for index, url in enumerate(get_replica_urls(), start=1):
+        name = f"replica{index}"
+        replica = create_engine(url, echo=settings.debug, **pool_options(url, name))
+        configure_pool(replica, name)
+        engines.append(replica)
+    return ReplicaSet(engines, settings.db_replica_strategy) if engines else None
+
+
+replica_set = create_replica_set()
+
+# Session factory; services return rows as written (RETURNING or refresh), so
+# committing need not expire them and cost a reload on serialization. Sessions
+# opened for read-only requests read from a replica when replicas are configured
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    replicas=replica_set,
+)
 
 # Base for models
 Base = declarative_base()
 
+# Async driver used for each sync backend when async_database_url is not set
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_replica_set: Optional[ReplicaSet] = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def to_async_url(database_url: str) -> str:
+    """`database_url` with the async driver of its backend"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {url.drivername}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    """Async URL from settings, derived from database_url when not configured"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    return to_async_url(settings.database_url)
+
+
+def create_async_replica_set() -> Optional[ReplicaSet]:
+    """Async engines for the configured read replicas, tracked by their sync engines"""
+    engines = []
+    for index, url in enumerate(get_replica_urls(), start=1):
+        name = f"async-replica{index}"
+        url = to_async_url(url)
+        replica = create_async_engine(url, echo=settings.debug, **pool_options(url, name, is_async=True))
+        configure_pool(replica.sync_engine, name)
+        engines.append(replica.sync_engine)
+    return ReplicaSet(engines, settings.db_replica_strategy) if engines else None
+
+
+def async_session_factory(bind: AsyncEngine, replicas: Optional[ReplicaSet] = None) -> async_sessionmaker:
+    """Async sessions routed like `SessionLocal`: reads from `replicas`, writes to `bind`.
+
+    Services refresh what they return, so objects stay usable after commit.
+    """
+    return async_sessionmaker(
+        bind=bind,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+        replicas=replicas,
+    )
+
+
+def get_async_engine() -> AsyncEngine:
+    """Create the async engine on first use so sync-only deployments never import the async driver"""
+    global _async_engine, _async_replica_set, _AsyncSessionLocal
+    if _async_engine is None:
+        url = get_async_database_url()
+        _async_engine = create_async_engine(
+            url,
+            echo=settings.debug,
+            **pool_options(url, "async", is_async=True)
+        )
+        configure_pool(_async_engine.sync_engine, "async")
+        _async_replica_set = create_async_replica_set()
+        _AsyncSessionLocal = async_session_factory(_async_engine, _async_replica_set)
+    return _async_engine
+
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency for getting DB session"""
@@ -29,6 +129,26 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting an async DB session"""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+
+
+async def dispose_async_engine():
+    """Close pooled async connections on shutdown"""
+    global _async_engine, _async_replica_set, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        if _async_replica_set is not None:
+            for replica in _async_replica_set.engines:
+                await AsyncEngine(replica).dispose()
+        _async_engine = None
+        _async_replica_set = None
+        _AsyncSessionLocal = None
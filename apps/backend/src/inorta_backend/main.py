@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from inorta_backend.api.routes import router as api_router
+from inorta_backend.api.async_routes import router as async_api_router
+from inorta_backend.api.caching import ResponseCacheMiddleware
+from inorta_backend.api.conditional import ConditionalGetMiddleware
+from inorta_backend.api.media_files import router as media_files_router
+from inorta_backend.api.metrics import MetricsMiddleware
+from inorta_backend.api.replicas import ReplicaRoutingMiddleware
+from inorta_backend.api.routes import NEXT_CURSOR_HEADER, router as api_router
+from inorta_backend.api.server_timing import ServerTimingMiddleware
 from inorta_backend.core.config import settings
-from inorta_backend.db.session import init_db
+from inorta_backend.db.session import dispose_async_engine, init_db, replica_set
+from inorta_backend.services.media_derivatives import media_derivatives
+from inorta_backend.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from inorta_backend.services.view_counter import view_counter
 
 app = FastAPI(
     title=settings.app_name,
@@ -11,6 +21,24 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# Body-hash ETags and 304s for JSON reads that don't set their own validators
+app.add_middleware(ConditionalGetMiddleware)
+
+# Read-through cache of JSON GET responses, dropped by tag when services commit writes
+app.add_middleware(ResponseCacheMiddleware)
+
+# Reads of GET requests from replicas, except for clients that have just written
+if replica_set is not None:
+    app.add_middleware(ReplicaRoutingMiddleware)
+
+# Request count, latency, size and SQL time per route; inside the SQL timing, which it reads
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Per-request SQL count and time as Server-Timing; outside the cache so hits report no DB work
+if settings.sql_instrumentation:
+    app.add_middleware(ServerTimingMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -18,11 +46,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER, "ETag", "Last-Modified", "X-Cache", "Server-Timing", "Accept-Ranges", "Content-Range",
+    ],
 )
 
-# Include API routes
+# Include API routes; the async CRUD routes shadow their sync twins when enabled
+if settings.use_async_db:
+    app.include_router(async_api_router, prefix="/api")
 app.include_router(api_router, prefix="/api")
 
+# Stored media files at their file_url, unless MEDIA_BASE_URL points elsewhere (a CDN)
+if settings.media_base_url.startswith("/"):
+    app.include_router(media_files_router, prefix=settings.media_base_url.rstrip("/"))
+
 
 @app.get("/")
 def root():
@@ -38,9 +75,28 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus text format, summed across workers when METRICS_DIR is set"""
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     init_db()
     print(f"✓ Database initialized")
+    view_counter.start()
+    metrics.start()
     print(f"✓ {settings.app_name} is running on {settings.env} mode")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered view counts and metrics, and release worker processes and pooled async connections"""
+    try:
+        metrics.stop()
+        view_counter.stop()
+        media_derivatives.stop()
+    finally:
+        await dispose_async_engine()
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+
+from inorta_backend.db.session import Base
+
+
+class CategoryClosure(Base):
+    """Ancestry index of the category tree: one row per (ancestor, descendant) pair,
+    including each category paired with itself at depth 0. Maintained by
+    CategoryService so subtree, breadcrumb and subtree-content lookups are single
+    indexed queries instead of one query per level."""
+    __tablename__ = "category_closure"
+
+    ancestor_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_category_closure_descendant_depth', 'descendant_id', 'depth'),
+    )
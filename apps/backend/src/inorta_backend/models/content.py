@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,6 +27,16 @@ class Content(Base):
     content = Column(Text, nullable=True)
     excerpt = Column(String(512), nullable=True)
 
+    # Derived from `content` on every write (services/content_render.py): sanitized
+    # HTML, word count and reading time in minutes. `excerpt_auto` marks an excerpt
+    # generated from the body rather than written by the author. Rows with an older
+    # render_version are re-rendered by `python -m inorta_backend.cli render-contents`
+    content_html = Column(Text, nullable=True)
+    excerpt_auto = Column(Boolean, nullable=False, default=False, server_default=false())
+    word_count = Column(Integer, nullable=True)
+    reading_time = Column(Integer, nullable=True)
+    render_version = Column(Integer, nullable=True)
+
     author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     author = relationship('User', backref='contents')
 
@@ -39,3 +49,13 @@ class Content(Base):
 
     views_count = Column(Integer, default=0)
     featured_image_id = Column(Integer, nullable=True)
+
+    # Listing indexes: equality filters first, published_at last, so every
+    # status/type/author combination reads rows already in feed order
+    __table_args__ = (
+        Index('ix_contents_published_at', 'published_at'),
+        Index('ix_contents_status_published_at', 'status', 'published_at'),
+        Index('ix_contents_type_published_at', 'content_type', 'published_at'),
+        Index('ix_contents_status_type_published_at', 'status', 'content_type', 'published_at'),
+        Index('ix_contents_author_published_at', 'author_id', 'published_at'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from datetime import datetime
 
 from inorta_backend.db.session import Base
@@ -11,3 +11,7 @@ class ContentCategory(Base):
     content_id = Column(Integer, ForeignKey('contents.id'), nullable=False, index=True)
     category_id = Column(Integer, ForeignKey('categories.id'), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ux_content_categories_content_category', 'content_id', 'category_id', unique=True),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from datetime import datetime
 
 from inorta_backend.db.session import Base
@@ -11,3 +11,7 @@ class ContentTag(Base):
     content_id = Column(Integer, ForeignKey('contents.id'), nullable=False, index=True)
     tag_id = Column(Integer, ForeignKey('tags.id'), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ux_content_tags_content_tag', 'content_id', 'tag_id', unique=True),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey
 from datetime import datetime
 from sqlalchemy.orm import relationship
 
@@ -15,7 +15,9 @@ class Media(Base):
     file_url = Column(String(1024), nullable=True)
     file_type = Column(String(50), nullable=True)
     mime_type = Column(String(100), nullable=True)
-    size = Column(Integer, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    # SHA-256 of uploaded files; equal uploads share one row and one stored file
+    content_hash = Column(String(64), nullable=True, unique=True, index=True)
     alt_text = Column(String(255), nullable=True)
     caption = Column(Text, nullable=True)
     uploaded_by = Column(Integer, ForeignKey('users.id'), nullable=True)
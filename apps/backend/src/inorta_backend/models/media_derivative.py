@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from sqlalchemy.orm import relationship
+
+from inorta_backend.db.session import Base
+
+
+class MediaDerivative(Base):
+    """A resized rendition of an image `Media`, one per preset"""
+
+    __tablename__ = "media_derivatives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_id = Column(Integer, ForeignKey('media.id', ondelete='CASCADE'), nullable=False)
+    preset = Column(String(50), nullable=False)
+    file_path = Column(String(1024), nullable=False)
+    file_url = Column(String(1024), nullable=True)
+    format = Column(String(10), nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    media = relationship('Media', backref='derivatives')
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ux_media_derivatives_media_preset', 'media_id', 'preset', unique=True),
+    )
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+# Most contents a single batch assignment may touch
+ASSIGNMENT_MAX_CONTENTS = 1000
+
+
+class AssignmentUpdate(BaseModel):
+    """Either `ids` (replace the whole set) or `add`/`remove` (apply a diff)"""
+    ids: Optional[List[int]] = None
+    add: List[int] = []
+    remove: List[int] = []
+
+    @model_validator(mode="after")
+    def check_mode(self):
+        if self.ids is not None and (self.add or self.remove):
+            raise ValueError("Give either ids or add/remove, not both")
+        return self
+
+
+class BatchAssignmentUpdate(AssignmentUpdate):
+    content_ids: List[int] = Field(..., min_length=1, max_length=ASSIGNMENT_MAX_CONTENTS)
+
+
+class AssignmentResult(BaseModel):
+    content_id: int
+    ids: List[int]
+    added: List[int] = []
+    removed: List[int] = []
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+
+# Largest array accepted by the /bulk endpoints in one request
+BULK_MAX_ITEMS = 10000
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    items: List[BulkItemResult]
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, Any]]) -> "BulkResult":
+        counts = {"created": 0, "updated": 0, "error": 0}
+        for item in items:
+            counts[item["status"]] += 1
+        return cls(created=counts["created"], updated=counts["updated"], failed=counts["error"], items=items)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -16,6 +16,10 @@ class ContentType(str, Enum):
     article = "article"
 
 
+# Sort orders accepted by the content listing; a leading "-" means descending
+ContentOrder = Literal["id", "-id", "published_at", "-published_at"]
+
+
 class ContentBase(BaseModel):
     title: str
     slug: str
@@ -43,9 +47,20 @@ class ContentUpdate(BaseModel):
 class ContentResponse(ContentBase):
     id: int
     author_id: int
+    # Rendered when the content was written; excerpt is generated when none was given
+    content_html: Optional[str] = None
+    excerpt_auto: bool = False
+    word_count: Optional[int] = None
+    reading_time: Optional[int] = None
+    # Page views, written in batches by the view counter without touching updated_at
+    views_count: Optional[int] = None
     published_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ContentSearchResult(ContentResponse):
+    score: float
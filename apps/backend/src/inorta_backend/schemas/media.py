@@ -27,8 +27,27 @@ class MediaUpdate(BaseModel):
 
 class MediaResponse(MediaBase):
     id: int
+    content_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class MediaDerivativeResponse(BaseModel):
+    id: int
+    media_id: int
+    preset: str
+    file_path: str
+    file_url: Optional[str] = None
+    format: str
+    mime_type: str
+    width: int
+    height: int
+    size: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -57,4 +57,13 @@ class MenuItemResponse(MenuItemBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class MenuItemTreeNode(MenuItemResponse):
+    children: List["MenuItemTreeNode"] = []
+
+
+class MenuTreeResponse(BaseModel):
+    menu: MenuResponse
+    items: List[MenuItemTreeNode]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
@@ -27,4 +27,9 @@ class SettingResponse(SettingBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class SettingsSnapshotResponse(BaseModel):
+    version: int
+    settings: Dict[str, Dict[str, Any]]
@@ -0,0 +1,54 @@
+from typing import Any, Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from inorta_backend.services.category_service import CategoryService
+from inorta_backend.services.content_service import ContentService
+from inorta_backend.services.media_service import MediaService
+from inorta_backend.services.menu_service import MenuService
+from inorta_backend.services.role_service import RoleService
+from inorta_backend.services.setting_service import SettingService
+from inorta_backend.services.tag_service import TagService
+from inorta_backend.services.taxonomy_service import TaxonomyService
+from inorta_backend.services.user_service import UserService
+
+
+class AsyncService:
+    """Async variant of a service class.
+
+    Every static method of the wrapped service becomes a coroutine taking an
+    `AsyncSession` first. The sync implementation runs through
+    `AsyncSession.run_sync`, so its queries are awaited on the event loop through
+    the async driver instead of holding a threadpool slot, and both paths share
+    one implementation.
+    """
+
+    def __init__(self, service: type):
+        self._service = service
+        self._methods: Dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = self._methods.get(name)
+        if method is None:
+            sync_method = getattr(self._service, name)
+
+            async def method(db: AsyncSession, *args: Any, **kwargs: Any) -> Any:
+                return await db.run_sync(sync_method, *args, **kwargs)
+
+            method.__name__ = name
+            self._methods[name] = method
+        return method
+
+    def __repr__(self) -> str:
+        return f"AsyncService({self._service.__name__})"
+
+
+AsyncCategoryService = AsyncService(CategoryService)
+AsyncContentService = AsyncService(ContentService)
+AsyncMediaService = AsyncService(MediaService)
+AsyncMenuService = AsyncService(MenuService)
+AsyncRoleService = AsyncService(RoleService)
+AsyncSettingService = AsyncService(SettingService)
+AsyncTagService = AsyncService(TagService)
+AsyncTaxonomyService = AsyncService(TaxonomyService)
+AsyncUserService = AsyncService(UserService)
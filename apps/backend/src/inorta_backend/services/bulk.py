@@ -0,0 +1,194 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Table, insert, select, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from inorta_backend.services.response_cache import response_cache
+
+# Rows per INSERT statement; keeps every statement well under SQLite's bound-parameter limit
+BULK_CHUNK_SIZE = 500
+
+# Dialects with a native upsert (ON CONFLICT / ON DUPLICATE KEY UPDATE)
+UPSERT_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+
+# Called with (db, [(row, id, created), ...]) after a chunk is written, before it is committed
+AfterWrite = Callable[[Session, List[tuple]], None]
+
+
+def _chunks(items: Sequence[Any], size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@contextmanager
+def _invalidate_after(cache_tags: Sequence[str]) -> Iterator[None]:
+    # Chunks are committed as they go, so drop cached reads even after a failure
+    try:
+        yield
+    finally:
+        if cache_tags:
+            response_cache.invalidate(*cache_tags)
+
+
+def _lookup(db: Session, table: Table, column: str, values: Sequence[Any], *extra: str) -> Dict[Any, tuple]:
+    """Map each existing value of `column` among `values` to its row's (id, *extra)"""
+    found: Dict[Any, tuple] = {}
+    columns = [table.c[column], table.c.id, *(table.c[name] for name in extra)]
+    for chunk in _chunks(list(values)):
+        for row in db.execute(select(*columns).where(table.c[column].in_(chunk))):
+            found[row[0]] = tuple(row[1:])
+    return found
+
+
+def _write_statement(db: Session, table: Table, key: str, rows: List[dict], update_columns: Sequence[str]):
+    """Multi-row INSERT, or the dialect's upsert keyed on `key` when `update_columns` is given"""
+    if not update_columns:
+        return insert(table).values(rows)
+    dialect = db.get_bind().dialect.name
+    touched = {"updated_at": datetime.utcnow()} if "updated_at" in table.c else {}
+    if dialect in ("sqlite", "postgresql"):
+        statement = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={**{name: statement.excluded[name] for name in update_columns}, **touched},
+        )
+    statement = mysql.insert(table).values(rows)
+    return statement.on_duplicate_key_update(
+        {**{name: statement.inserted[name] for name in update_columns}, **touched}
+    )
+
+
+def bulk_write(
+    db: Session,
+    table: Table,
+    key: str,
+    rows: List[dict],
+    upsert: bool = False,
+    update_columns: Sequence[str] = (),
+    exists_detail: str = "Already exists",
+    unique_details: Optional[Dict[str, str]] = None,
+    errors: Optional[Dict[int, str]] = None,
+    after_write: Optional[AfterWrite] = None,
+    cache_tags: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    """Insert (or upsert on `key`) many rows with one statement per chunk.
+
+    Rows are checked up front with one lookup per unique column, so conflicts come back
+    as per-item errors instead of failing the batch; `errors` carries caller-side
+    validation failures by index. Each chunk is committed on its own. If a chunk still
+    hits an IntegrityError (a concurrent writer), its rows are retried one by one.
+    `cache_tags` are invalidated in the response cache once the chunks are written.
+    Returns one result dict per input row, in input order. Raises ValueError before
+    writing anything if `upsert` is asked of a dialect without a native upsert.
+    """
+    dialect = db.get_bind().dialect.name
+    if upsert and dialect not in UPSERT_DIALECTS:
+        raise ValueError(f"Bulk upsert is not supported on {dialect}")
+    errors = dict(errors or {})
+    existing = _lookup(db, table, key, {row[key] for row in rows})
+    for column, detail in {key: None, **(unique_details or {})}.items():
+        # Other unique columns must not collide with a row that has a different key
+        taken = _lookup(db, table, column, {row[column] for row in rows}, key) if column != key else {}
+        seen = set()
+        for index, row in enumerate(rows):
+            if index in errors:
+                continue
+            value = row[column]
+            if value in seen:
+                errors[index] = f"Duplicate {column} in request"
+            elif value in taken and taken[value][1] != row[key]:
+                errors[index] = detail
+            seen.add(value)
+    if not upsert:
+        for index, row in enumerate(rows):
+            if index not in errors and row[key] in existing:
+                errors[index] = exists_detail
+
+    results: List[Dict[str, Any]] = [
+        {"index": index, "status": "error", "id": None, "detail": errors.get(index)} for index in range(len(rows))
+    ]
+    pending = [index for index in range(len(rows)) if index not in errors]
+    columns = update_columns if upsert else ()
+
+    def write(indexes: List[int]) -> None:
+        chunk = [rows[index] for index in indexes]
+        db.execute(_write_statement(db, table, key, chunk, columns))
+        ids = _lookup(db, table, key, [row[key] for row in chunk])
+        written = []
+        for index, row in zip(indexes, chunk):
+            created = row[key] not in existing
+            results[index].update(id=ids[row[key]][0], status="created" if created else "updated", detail=None)
+            written.append((row, ids[row[key]][0], created))
+        if after_write is not None:
+            after_write(db, written)
+        db.commit()
+
+    with _invalidate_after(cache_tags):
+        _write_chunks(db, pending, write, results)
+    return results
+
+
+def _write_chunks(db: Session, pending: List[int], write: Callable[[List[int]], None], results: List[dict]) -> None:
+    """Write the rows at `pending` a chunk at a time, retrying the rows of a failed chunk alone"""
+    for indexes in _chunks(pending):
+        try:
+            write(indexes)
+        except IntegrityError:
+            db.rollback()
+            for index in indexes:
+                try:
+                    write([index])
+                except IntegrityError:
+                    db.rollback()
+                    results[index].update(id=None, status="error", detail="Conflicts with an existing row")
+
+
+def _insert_returning_ids(db: Session, table: Table, rows: List[dict]) -> List[int]:
+    """Insert `rows` with one statement; returns their ids in order"""
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        return [row[0] for row in result]
+    if dialect.name in ("mysql", "mariadb"):
+        # No RETURNING: one multi-row INSERT, whose rows InnoDB numbers consecutively
+        # (a "simple insert", in every autoinc lock mode) from the reported first id
+        result = db.execute(insert(table).values(rows))
+        step = db.execute(text("SELECT @@auto_increment_increment")).scalar() or 1
+        return [result.lastrowid + offset * step for offset in range(len(rows))]
+    return [db.execute(insert(table), row).inserted_primary_key[0] for row in rows]
+
+
+def bulk_insert(
+    db: Session,
+    table: Table,
+    rows: List[dict],
+    errors: Optional[Dict[int, str]] = None,
+    cache_tags: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    """Insert rows that have no natural key with one statement per chunk.
+
+    `errors` carries caller-side validation failures by index. Each chunk is
+    committed on its own; one that hits an IntegrityError (say a reference deleted
+    meanwhile) is retried row by row, so only the bad rows fail. `cache_tags` are
+    invalidated in the response cache once the chunks are written. Returns one
+    result dict per input row, in input order.
+    """
+    errors = dict(errors or {})
+    results: List[Dict[str, Any]] = [
+        {"index": index, "status": "error", "id": None, "detail": errors.get(index)} for index in range(len(rows))
+    ]
+    pending = [index for index in range(len(rows)) if index not in errors]
+
+    def write(indexes: List[int]) -> None:
+        ids = _insert_returning_ids(db, table, [rows[index] for index in indexes])
+        db.commit()
+        for index, row_id in zip(indexes, ids):
+            results[index].update(id=row_id, status="created", detail=None)
+
+    with _invalidate_after(cache_tags):
+        _write_chunks(db, pending, write, results)
+    return results
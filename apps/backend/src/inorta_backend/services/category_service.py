@@ -1,14 +1,25 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import delete, insert, literal, select, true, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from typing import Any, Dict, List, Optional, Sequence
 
 from inorta_backend.models.category import Category
+from inorta_backend.models.category_closure import CategoryClosure
+from inorta_backend.models.content import Content
+from inorta_backend.models.content_category import ContentCategory
 from inorta_backend.schemas.category import CategoryCreate, CategoryUpdate
+from inorta_backend.services.bulk import bulk_write
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import conflict_detail, delete_by_id, update_by_id
 
 
 class CategoryService:
     @staticmethod
-    def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[Category]:
-        return db.query(Category).offset(skip).limit(limit).all()
+    def get_categories(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Category]:
+        return paginate(db.query(Category), (Category.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_category_by_id(db: Session, category_id: int) -> Optional[Category]:
@@ -18,8 +29,89 @@ class CategoryService:
     def get_category_by_slug(db: Session, slug: str) -> Optional[Category]:
         return db.query(Category).filter(Category.slug == slug).first()
 
+    # Hierarchy queries (served from the category_closure index)
+    @staticmethod
+    def get_subtree(db: Session, category_id: int, max_depth: Optional[int] = None) -> List[Category]:
+        """The category and all its descendants, shallowest first"""
+        query = (
+            db.query(Category)
+            .join(CategoryClosure, CategoryClosure.descendant_id == Category.id)
+            .filter(CategoryClosure.ancestor_id == category_id)
+        )
+        if max_depth is not None:
+            query = query.filter(CategoryClosure.depth <= max_depth)
+        return query.order_by(CategoryClosure.depth, Category.order, Category.id).all()
+
+    @staticmethod
+    def get_ancestors(db: Session, category_id: int) -> Optional[List[Category]]:
+        """Breadcrumb of a category, root first and excluding itself; None if it doesn't exist"""
+        rows = (
+            db.query(Category)
+            .join(CategoryClosure, CategoryClosure.ancestor_id == Category.id)
+            .filter(CategoryClosure.descendant_id == category_id)
+            .order_by(CategoryClosure.depth.desc())
+            .all()
+        )
+        if not rows:
+            return None
+        return rows[:-1]
+
+    @staticmethod
+    def get_subtree_contents(
+        db: Session, category_id: int, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Content]:
+        """Contents assigned to the category or any of its descendants"""
+        in_subtree = (
+            select(ContentCategory.content_id)
+            .join(CategoryClosure, CategoryClosure.descendant_id == ContentCategory.category_id)
+            .where(CategoryClosure.ancestor_id == category_id)
+        )
+        query = db.query(Content).filter(Content.id.in_(in_subtree))
+        return paginate(query, (Content.id,), skip=skip, limit=limit, after=after)
+
+    @staticmethod
+    def _subtree_ids(db: Session, category_id: int) -> List[int]:
+        return [
+            row[0] for row in db.query(CategoryClosure.descendant_id)
+            .filter(CategoryClosure.ancestor_id == category_id)
+        ]
+
+    @staticmethod
+    def _link_to_parent(db: Session, category_id: int, parent_id: int) -> None:
+        """Connect a detached subtree rooted at `category_id` under `parent_id`"""
+        above = aliased(CategoryClosure)
+        below = aliased(CategoryClosure)
+        db.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                # Every ancestor of the parent paired with every node of the subtree
+                select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+                .select_from(above)
+                .join(below, true())
+                .where(above.descendant_id == parent_id, below.ancestor_id == category_id),
+            )
+        )
+
+    @staticmethod
+    def _move_subtree(db: Session, category_id: int, subtree: List[int], parent_id: Optional[int]) -> None:
+        """Detach the subtree from its old ancestors, then hang it under the new parent"""
+        db.execute(
+            delete(CategoryClosure).where(
+                CategoryClosure.descendant_id.in_(subtree),
+                CategoryClosure.ancestor_id.notin_(subtree),
+            )
+        )
+        if parent_id is not None:
+            CategoryService._link_to_parent(db, category_id, parent_id)
+
+    @staticmethod
+    def _check_parent(db: Session, parent_id: Optional[int]) -> None:
+        if parent_id is not None and not CategoryService.get_category_by_id(db, parent_id):
+            raise ValueError("Parent category not found")
+
     @staticmethod
     def create_category(db: Session, data: CategoryCreate) -> Category:
+        CategoryService._check_parent(db, data.parent_id)
         db_obj = Category(
             name=data.name,
             slug=data.slug,
@@ -29,27 +121,145 @@ class CategoryService:
             is_active=data.is_active,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        try:
+            db.flush()
+            # Self row plus one row per ancestor of the parent, in a single INSERT ... SELECT
+            rows = [select(literal(db_obj.id), literal(db_obj.id), literal(0))]
+            if db_obj.parent_id is not None:
+                rows.append(
+                    select(CategoryClosure.ancestor_id, literal(db_obj.id), CategoryClosure.depth + 1)
+                    .where(CategoryClosure.descendant_id == db_obj.parent_id)
+                )
+            db.execute(
+                insert(CategoryClosure).from_select(
+                    ["ancestor_id", "descendant_id", "depth"], union_all(*rows) if len(rows) > 1 else rows[0]
+                )
+            )
+            db.commit()
+        except IntegrityError:
+            # Duplicates are caught by the unique constraints rather than looked up first
+            db.rollback()
+            detail = conflict_detail(
+                db, db_obj, {"slug": "Category slug already exists", "name": "Category name already exists"}
+            )
+            if detail is None:
+                raise
+            raise ValueError(detail)
+        response_cache.invalidate("categories")
         return db_obj
 
+    @staticmethod
+    def bulk_create_categories(
+        db: Session, items: List[CategoryCreate], upsert: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Insert many categories, or with `upsert` update those whose slug exists.
+
+        Parents must exist before the batch. The closure index is extended for new
+        categories and re-linked for moved ones in the same transaction as each chunk.
+        """
+        rows = [item.model_dump() for item in items]
+        parent_ids = {row["parent_id"] for row in rows if row["parent_id"] is not None}
+        known = {row[0] for row in db.query(Category.id).filter(Category.id.in_(parent_ids))} if parent_ids else set()
+        current = {
+            slug: (category_id, parent_id) for slug, category_id, parent_id in
+            db.query(Category.slug, Category.id, Category.parent_id).filter(Category.slug.in_([row["slug"] for row in rows]))
+        } if upsert else {}
+        errors: Dict[int, str] = {}
+        moves: Dict[str, List[int]] = {}
+        for index, row in enumerate(rows):
+            if row["parent_id"] is not None and row["parent_id"] not in known:
+                errors[index] = "Parent category not found"
+            elif row["slug"] in current and current[row["slug"]][1] != row["parent_id"]:
+                subtree = CategoryService._subtree_ids(db, current[row["slug"]][0])
+                if row["parent_id"] in subtree:
+                    errors[index] = "Category cannot be moved under itself or its descendants"
+                else:
+                    moves[row["slug"]] = subtree
+
+        def link(db: Session, written: List[tuple]) -> None:
+            for row, category_id, created in written:
+                if row["slug"] in moves:
+                    CategoryService._move_subtree(db, category_id, moves[row["slug"]], row["parent_id"])
+            created_ids = [category_id for _, category_id, created in written if created]
+            if not created_ids:
+                return
+            db.execute(insert(CategoryClosure), [
+                {"ancestor_id": category_id, "descendant_id": category_id, "depth": 0} for category_id in created_ids
+            ])
+            db.execute(
+                insert(CategoryClosure).from_select(
+                    ["ancestor_id", "descendant_id", "depth"],
+                    select(CategoryClosure.ancestor_id, Category.id, CategoryClosure.depth + 1)
+                    .join(Category, Category.parent_id == CategoryClosure.descendant_id)
+                    .where(Category.id.in_(created_ids)),
+                )
+            )
+
+        return bulk_write(
+            db,
+            Category.__table__,
+            "slug",
+            rows,
+            upsert=upsert,
+            update_columns=("name", "description", "parent_id", "order", "is_active"),
+            exists_detail="Category slug already exists",
+            unique_details={"name": "Category name already exists"},
+            errors=errors,
+            after_write=link,
+            cache_tags=("categories",),
+        )
+
     @staticmethod
     def update_category(db: Session, category_id: int, data: CategoryUpdate) -> Optional[Category]:
-        db_obj = db.query(Category).filter(Category.id == category_id).first()
+        update_data = data.model_dump(exclude_unset=True)
+        moved = False
+        if "parent_id" in update_data:
+            # Only a re-parent needs the current row before writing
+            current = db.query(Category.parent_id).filter(Category.id == category_id).first()
+            if current is None:
+                return None
+            new_parent_id = update_data["parent_id"]
+            moved = new_parent_id != current[0]
+            if moved:
+                CategoryService._check_parent(db, new_parent_id)
+                subtree = CategoryService._subtree_ids(db, category_id)
+                if new_parent_id in subtree:
+                    raise ValueError("Category cannot be moved under itself or its descendants")
+        db_obj = update_by_id(db, Category, category_id, update_data)
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
+        if moved:
+            CategoryService._move_subtree(db, category_id, subtree, new_parent_id)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("categories")
         return db_obj
 
     @staticmethod
     def delete_category(db: Session, category_id: int) -> bool:
-        db_obj = db.query(Category).filter(Category.id == category_id).first()
-        if not db_obj:
+        if db.query(Category.id).filter(Category.parent_id == category_id).first():
+            raise ValueError("Category has child categories")
+        db.execute(delete(CategoryClosure).where(CategoryClosure.descendant_id == category_id))
+        if not delete_by_id(db, Category, category_id):
+            db.rollback()
             return False
-        db.delete(db_obj)
         db.commit()
-        return True
\ No newline at end of file
+        response_cache.invalidate("categories")
+        return True
+
+    @staticmethod
+    def rebuild_closure(db: Session) -> int:
+        """Recompute the whole closure index from `parent_id`; returns the rows written"""
+        parents: Dict[int, Optional[int]] = dict(db.query(Category.id, Category.parent_id).all())
+        rows = []
+        for category_id in parents:
+            ancestor, depth, seen = category_id, 0, set()
+            while ancestor is not None and ancestor in parents and ancestor not in seen:
+                seen.add(ancestor)
+                rows.append({"ancestor_id": ancestor, "descendant_id": category_id, "depth": depth})
+                ancestor, depth = parents[ancestor], depth + 1
+        db.execute(delete(CategoryClosure))
+        if rows:
+            db.execute(insert(CategoryClosure), rows)
+        db.commit()
+        response_cache.invalidate("categories")
+        return len(rows)
@@ -0,0 +1,265 @@
+"""Write-time rendering of content bodies: sanitized HTML, excerpt, word count and reading time"""
+import math
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from html import escape
+from html.parser import HTMLParser
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from inorta_backend.models.content import Content
+
+# Bump when the output of render_body changes, so `render-contents` re-renders old rows
+RENDER_VERSION = 2
+WORDS_PER_MINUTE = 220
+# Characters of a generated excerpt, ellipsis included (the column holds 512)
+EXCERPT_LENGTH = 280
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "code", "del", "div", "em", "figcaption", "figure", "h1", "h2",
+    "h3", "h4", "h5", "h6", "hr", "i", "img", "ins", "li", "mark", "ol", "p", "pre", "s", "span", "strike",
+    "strong", "sub", "sup", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "code": {"class"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "ol": {"start"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+URL_SCHEMES = {"http", "https", "mailto", "tel"}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped along with everything inside them
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template", "svg", "math", "textarea"}
+# Tags that separate words in the extracted text
+BLOCK_TAGS = {
+    "blockquote", "br", "div", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "ol",
+    "p", "pre", "table", "td", "th", "tr", "ul",
+}
+# Open siblings a start tag closes, as browsers do for <li>one<li>two
+IMPLIED_END = {"li": {"li"}, "p": {"p"}, "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"}}
+# Markup the editor writes: a closing tag, a void tag or a comment of known HTML.
+# A bare "<b" is no evidence ("if a<b and c>d" is plain text)
+HTML_MARKUP = re.compile(
+    r"</(?:%s)\s*>|<(?:br|hr)\s*/?>|<img\s[^<>]*>|<!--"
+    % "|".join(sorted(ALLOWED_TAGS | DROPPED_TAGS | {"body", "head", "html", "section", "article", "header", "footer"})),
+    re.IGNORECASE,
+)
+WORD = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+def safe_url(value: str) -> bool:
+    """Relative URLs and the schemes in URL_SCHEMES; browsers ignore controls and spaces in a scheme"""
+    compact = re.sub(r"[\x00-\x20\x7f]+", "", value).lower()
+    scheme = re.match(r"^([a-z][a-z0-9+.-]*):", compact)
+    return scheme is None or scheme.group(1) in URL_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    """Allowlist HTML filter that also collects the text, with words separated at blocks"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html: List[str] = []
+        self.text: List[str] = []
+        self.open: List[str] = []
+        self.dropping: Optional[str] = None
+        self.depth = 0
+
+    def _attributes(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> str:
+        allowed = ALLOWED_ATTRIBUTES.get(tag, ())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not safe_url(value):
+                continue
+            if name == "class" and not all(word.startswith("language-") for word in value.split()):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        return "".join(kept)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self.dropping:
+            self.depth += tag == self.dropping
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping, self.depth = tag, 1
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag in ALLOWED_TAGS:
+            while self.open and self.open[-1] in IMPLIED_END.get(tag, ()):
+                self.html.append(f"</{self.open.pop()}>")
+            self.html.append(f"<{tag}{self._attributes(tag, attrs)}>")
+            if tag not in VOID_TAGS:
+                self.open.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.dropping:
+            if tag == self.dropping:
+                self.depth -= 1
+                if not self.depth:
+                    self.dropping = None
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in self.open:
+            return
+        # Close whatever was left open inside it
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f"</{current}>")
+            if current == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self.dropping:
+            self.html.append(escape(data, quote=False))
+            self.text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        while self.open:
+            self.html.append(f"</{self.open.pop()}>")
+
+
+@dataclass(frozen=True)
+class RenderedBody:
+    html: str
+    text: str
+    excerpt: Optional[str]
+    word_count: int
+    reading_time: int
+
+    def columns(self) -> Dict[str, Any]:
+        """The derived `Content` columns, excerpt aside"""
+        return {
+            "content_html": self.html,
+            "word_count": self.word_count,
+            "reading_time": self.reading_time,
+            "render_version": RENDER_VERSION,
+        }
+
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> Optional[str]:
+    """The start of `text`, cut at a word boundary with an ellipsis when longer than `length`"""
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text or None
+    cut = text[:length - 1]
+    if " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+def render_body(content: Optional[str]) -> RenderedBody:
+    """Sanitized HTML of a body and the values derived from its text.
+
+    Bodies with markup (the rich text editor's HTML, told apart by closing or void
+    tags of known elements) keep only allowlisted tags and attributes, with URLs
+    limited to safe schemes; plain text, "<" included, becomes escaped paragraphs,
+    a blank line starting a new one.
+    """
+    content = content or ""
+    if HTML_MARKUP.search(content):
+        sanitizer = _Sanitizer()
+        sanitizer.feed(content)
+        sanitizer.close()
+        html, text = "".join(sanitizer.html), "".join(sanitizer.text)
+    else:
+        paragraphs = [part.strip() for part in re.split(r"\n\s*\n", content.replace("\r\n", "\n")) if part.strip()]
+        html = "".join(f"<p>{escape(part, quote=False).replace(chr(10), '<br>')}</p>" for part in paragraphs)
+        text = "\n".join(paragraphs)
+    words = len(WORD.findall(text))
+    return RenderedBody(html, text, make_excerpt(text), words, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def excerpt_values(
+    rendered: RenderedBody, given: Optional[str], current: Optional[str] = None, current_auto: bool = False
+) -> Dict[str, Any]:
+    """`excerpt` and `excerpt_auto` for an excerpt sent by a client.
+
+    An empty one is generated from the body. So is one equal to the generated excerpt
+    the row already has, as editors send back what they read; it then follows later
+    body changes instead of being frozen as a custom excerpt.
+    """
+    if not given or (current_auto and given == current):
+        return {"excerpt": rendered.excerpt, "excerpt_auto": True}
+    return {"excerpt": given, "excerpt_auto": False}
+
+
+def render_rows(rows: Sequence[Tuple[int, Optional[str], Optional[str], bool]]) -> List[Dict[str, Any]]:
+    """Derived columns of (id, content, excerpt, excerpt_auto) rows; runs in a worker process"""
+    values = []
+    for content_id, content, excerpt, excerpt_auto in rows:
+        rendered = render_body(content)
+        values.append({
+            "content_id": content_id,
+            **rendered.columns(),
+            **excerpt_values(rendered, None if excerpt_auto else excerpt),
+        })
+    return values
+
+
+def backfill(
+    session_factory: Callable[[], Session],
+    batch_size: int = 500,
+    workers: Optional[int] = None,
+    rerender_all: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Render the contents not rendered by this RENDER_VERSION (all with `rerender_all`).
+
+    Batches are read in id order and rendered in a pool of `workers` processes, a
+    few batches ahead of the writes; each batch is written with one executemany
+    UPDATE and committed. Rows keep their updated_at. Returns the rows rendered.
+    """
+    contents = Content.__table__
+    query = select(contents.c.id, contents.c.content, contents.c.excerpt, contents.c.excerpt_auto).order_by(contents.c.id)
+    if not rerender_all:
+        query = query.where(or_(contents.c.render_version.is_(None), contents.c.render_version < RENDER_VERSION))
+    statement = (
+        update(contents)
+        .where(contents.c.id == bindparam("content_id"))
+        .values(
+            content_html=bindparam("content_html"),
+            word_count=bindparam("word_count"),
+            reading_time=bindparam("reading_time"),
+            render_version=bindparam("render_version"),
+            excerpt=bindparam("excerpt"),
+            excerpt_auto=bindparam("excerpt_auto"),
+            updated_at=contents.c.updated_at,
+        )
+    )
+    workers = workers or os.cpu_count() or 1
+    rendered = 0
+    last_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor, session_factory() as db:
+        pending: Deque[Future] = deque()
+        while True:
+            rows = [
+                tuple(row) for row in
+                db.execute(query.where(contents.c.id > last_id).limit(batch_size)).all()
+            ]
+            if rows:
+                last_id = rows[-1][0]
+                pending.append(executor.submit(render_rows, rows))
+            # Keep every process busy while the finished batches are written
+            while pending and (not rows or len(pending) > workers * 2 or pending[0].done()):
+                values = pending.popleft().result()
+                db.execute(statement, values)
+                db.commit()
+                rendered += len(values)
+                if progress:
+                    progress(rendered)
+            if not rows:
+                return rendered
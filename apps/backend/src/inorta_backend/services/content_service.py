@@ -1,15 +1,57 @@
+from sqlalchemy import delete, func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence
 from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 
-from inorta_backend.models.content import Content
+from inorta_backend.models.content import Content, ContentStatus, ContentType
+from inorta_backend.models.content_category import ContentCategory
+from inorta_backend.models.content_tag import ContentTag
 from inorta_backend.schemas.content import ContentCreate, ContentUpdate
+from inorta_backend.services.content_render import excerpt_values, render_body
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.search_service import get_search_engine
+from inorta_backend.services.tag_index import tag_index
+from inorta_backend.services.writes import conflict_detail, delete_by_id, update_by_id
+
+# Listing orders and the keys they paginate on. Every published_at order is backed by
+# one of the composite indexes on contents for each status/type/author combination.
+CONTENT_ORDERS = {
+    "id": ((Content.id,), False),
+    "-id": ((Content.id,), True),
+    "published_at": ((Content.published_at, Content.id), False),
+    "-published_at": ((Content.published_at, Content.id), True),
+}
 
 
 class ContentService:
     @staticmethod
-    def get_contents(db: Session, skip: int = 0, limit: int = 100) -> List[Content]:
-        return db.query(Content).offset(skip).limit(limit).all()
+    def get_contents(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Sequence[Any]] = None,
+        status: Optional[ContentStatus] = None,
+        content_type: Optional[ContentType] = None,
+        author_id: Optional[int] = None,
+        order: str = "id",
+    ) -> List[Content]:
+        """List contents filtered by status/type/author, ordered by `order`.
+
+        Ordering by published_at only lists contents that have been published.
+        """
+        keys, descending = CONTENT_ORDERS[order]
+        query = db.query(Content)
+        if status is not None:
+            query = query.filter(Content.status == status)
+        if content_type is not None:
+            query = query.filter(Content.content_type == content_type)
+        if author_id is not None:
+            query = query.filter(Content.author_id == author_id)
+        if order.lstrip("-") == "published_at":
+            query = query.filter(Content.published_at.isnot(None))
+        return paginate(query, keys, skip=skip, limit=limit, after=after, descending=descending)
 
     @staticmethod
     def get_content_by_id(db: Session, content_id: int) -> Optional[Content]:
@@ -21,42 +63,73 @@ class ContentService:
 
     @staticmethod
     def create_content(db: Session, data: ContentCreate) -> Content:
+        rendered = render_body(data.content)
         db_content = Content(
             title=data.title,
             slug=data.slug,
             content=data.content,
-            excerpt=data.excerpt,
             author_id=data.author_id,
             status=data.status,
             content_type=data.content_type,
             featured_image_id=data.featured_image_id,
+            **rendered.columns(),
+            **excerpt_values(rendered, data.excerpt),
         )
+        if data.status == ContentStatus.published:
+            db_content.published_at = datetime.utcnow()
         db.add(db_content)
         try:
+            db.flush()
+            get_search_engine(db).index(db, db_content)
             db.commit()
         except IntegrityError:
+            # Duplicate slugs are caught by the unique constraint rather than looked up first
             db.rollback()
-            raise
+            detail = conflict_detail(db, db_content, {"slug": "Content slug already exists"})
+            if detail is None:
+                raise
+            raise ValueError(detail)
+        response_cache.invalidate("contents")
         db.refresh(db_content)
         return db_content
 
     @staticmethod
     def update_content(db: Session, content_id: int, data: ContentUpdate) -> Optional[Content]:
-        db_content = db.query(Content).filter(Content.id == content_id).first()
+        update_data = data.model_dump(exclude_unset=True)
+        values = dict(update_data)
+        if update_data.get("status") == ContentStatus.published:
+            # Only the first publication sets the date
+            values["published_at"] = func.coalesce(Content.published_at, datetime.utcnow())
+        if {"content", "excerpt"} & update_data.keys():
+            current = (
+                db.query(Content.content, Content.excerpt, Content.excerpt_auto).filter(Content.id == content_id).first()
+            )
+            if current is None:
+                return None
+            rendered = render_body(update_data.get("content", current.content))
+            if "content" in update_data:
+                values.update(rendered.columns())
+            values.update(excerpt_values(
+                rendered, update_data.get("excerpt", current.excerpt), current.excerpt, current.excerpt_auto
+            ))
+        db_content = update_by_id(db, Content, content_id, values)
         if not db_content:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_content, field, value)
+        if {"title", "excerpt", "content"} & update_data.keys():
+            get_search_engine(db).index(db, db_content)
         db.commit()
-        db.refresh(db_content)
+        response_cache.invalidate("contents")
         return db_content
 
     @staticmethod
     def delete_content(db: Session, content_id: int) -> bool:
-        db_content = db.query(Content).filter(Content.id == content_id).first()
-        if not db_content:
+        get_search_engine(db).remove(db, content_id)
+        db.execute(delete(ContentTag).where(ContentTag.content_id == content_id))
+        db.execute(delete(ContentCategory).where(ContentCategory.content_id == content_id))
+        if not delete_by_id(db, Content, content_id):
+            db.rollback()
             return False
-        db.delete(db_content)
         db.commit()
+        response_cache.invalidate("contents")
+        tag_index.remove_content(content_id)
         return True
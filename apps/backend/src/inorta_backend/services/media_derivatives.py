@@ -0,0 +1,255 @@
+import asyncio
+import importlib.util
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from inorta_backend.core.config import settings
+from inorta_backend.models.media import Media
+from inorta_backend.models.media_derivative import MediaDerivative
+from inorta_backend.services.media_service import MediaService
+from inorta_backend.services.media_storage import media_storage
+
+# Output formats: (mime type, file extension)
+IMAGE_FORMATS = {"jpeg": ("image/jpeg", ".jpg"), "png": ("image/png", ".png"), "webp": ("image/webp", ".webp")}
+
+
+class ImageProcessingUnavailable(RuntimeError):
+    """Pillow is not installed (pip install 'inorta-backend[images]'), or the render pool died"""
+
+
+@dataclass(frozen=True)
+class Preset:
+    """A derivative: the image fitted inside width x height, never upscaled"""
+
+    name: str
+    width: int
+    height: int
+    format: str
+
+    @property
+    def mime_type(self) -> str:
+        return IMAGE_FORMATS[self.format][0]
+
+
+def parse_presets(spec: str) -> Dict[str, Preset]:
+    """Presets from `name=WIDTHxHEIGHT:format,...`, e.g. `thumb=320x320:webp`"""
+    presets: Dict[str, Preset] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rest = item.partition("=")
+        box, _, image_format = rest.partition(":")
+        width, _, height = box.lower().partition("x")
+        image_format = (image_format or "webp").strip().lower()
+        if not name.strip() or not width.isdigit() or not height.isdigit() or image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Invalid derivative preset {item!r}, expected name=WIDTHxHEIGHT:{'|'.join(IMAGE_FORMATS)}")
+        if int(width) <= 0 or int(height) <= 0:
+            raise ValueError(f"Invalid derivative preset {item!r}, the box must not be empty")
+        presets[name.strip()] = Preset(name.strip(), int(width), int(height), image_format)
+    return presets
+
+
+def images_available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def derivative_path(source_path: str, preset: Preset) -> str:
+    """Where a preset of a stored file goes: next to it, named after it and the box.
+
+    The box is part of the name, so changing a preset's size yields a new file rather
+    than changing one that clients may cache as immutable.
+    """
+    stem = os.path.splitext(source_path)[0]
+    return f"{stem}-{preset.name}-{preset.width}x{preset.height}{IMAGE_FORMATS[preset.format][1]}"
+
+
+def render_derivative(
+    source: str, target: str, width: int, height: int, image_format: str, quality: int
+) -> Tuple[int, int, int]:
+    """Write `source` fitted inside width x height to `target`; (width, height, size) of the result.
+
+    Runs in a worker process. The file is written beside `target` and renamed, so
+    readers never see a partial image. Images over Pillow's pixel limit raise
+    ValueError rather than being decoded.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        original = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ValueError(str(e))
+    with original:
+        # JPEG can be decoded straight at a fraction of its size, far cheaper than a full decode
+        original.draft("RGB", (max(width, height), max(width, height)))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if image_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp = f"{target}.{os.getpid()}.tmp"
+        try:
+            image.save(temp, format=image_format.upper(), quality=quality)
+            os.replace(temp, target)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        return image.width, image.height, os.path.getsize(target)
+
+
+class DerivativeGenerator:
+    """Renders image derivatives in a process pool, off the event loop.
+
+    Resizing is CPU-bound, so it runs in `workers` processes rather than threads.
+    Requests for a derivative that is already being rendered in this worker wait for
+    that job instead of starting another. Across workers the derivative's path and
+    the unique (media_id, preset) row make a duplicate render harmless: both write
+    the same file and one row is kept. A pool whose process died (killed, out of
+    memory) is broken for good, so it is dropped and the next render starts a new one.
+    """
+
+    def __init__(self, presets: Dict[str, Preset], eager: Sequence[str], workers: int, quality: int):
+        unknown = [name for name in eager if name not in presets]
+        if unknown:
+            raise ValueError(f"Unknown eager derivative presets: {', '.join(unknown)}")
+        self.presets = presets
+        self.eager = list(eager)
+        self.workers = workers
+        self.quality = quality
+        self.render = render_derivative
+        self.rendered = 0
+        self.joined = 0
+        self._executor: Optional[Executor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, source: str, target: str, preset: Preset) -> Future:
+        """The render job of `target`, joining the one in flight if there is one"""
+        with self._lock:
+            job = self._jobs.get(target)
+            if job is not None:
+                self.joined += 1
+                return job
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+            try:
+                job = executor.submit(
+                    self.render, source, target, preset.width, preset.height, preset.format, self.quality
+                )
+            except BrokenProcessPool:
+                self._drop_executor(executor)
+                raise
+            self._jobs[target] = job
+            self.rendered += 1
+        # Outside the lock: a job that already finished runs the callback right here
+        job.add_done_callback(lambda done: self._forget(target, done, executor))
+        return job
+
+    def _forget(self, target: str, job: Future, executor: Executor) -> None:
+        broken = not job.cancelled() and isinstance(job.exception(), BrokenProcessPool)
+        with self._lock:
+            if self._jobs.get(target) is job:
+                del self._jobs[target]
+            if broken:
+                self._drop_executor(executor)
+
+    def _drop_executor(self, executor: Executor) -> None:
+        # Called with the lock held
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _current(db: Session, media: Media, preset: Preset, file_path: str) -> Optional[MediaDerivative]:
+        derivative = MediaService.get_derivative(db, media.id, preset.name)
+        if derivative is not None and derivative.file_path == file_path and os.path.exists(media_storage.path(file_path)):
+            return derivative
+        return None
+
+    def _start(self, media: Media, preset: Preset, file_path: str) -> Future:
+        if not images_available():
+            raise ImageProcessingUnavailable("Image derivatives need Pillow")
+        try:
+            return self.submit(media_storage.path(media.file_path), media_storage.path(file_path), preset)
+        except BrokenProcessPool:
+            raise ImageProcessingUnavailable("Image workers stopped unexpectedly, try again")
+
+    async def _finish(self, db: Session, media: Media, preset: Preset, file_path: str, job: Future) -> MediaDerivative:
+        try:
+            width, height, size = await asyncio.wrap_future(job)
+        except (OSError, ValueError) as e:
+            # Includes a missing source file, PIL.UnidentifiedImageError and images
+            # over the pixel limit
+            raise ValueError(f"Cannot render media: {e}")
+        except BrokenProcessPool:
+            raise ImageProcessingUnavailable("Image workers stopped unexpectedly, try again")
+        values = {
+            "file_path": file_path,
+            "file_url": f"{settings.media_base_url.rstrip('/')}/{file_path}",
+            "format": preset.format,
+            "mime_type": preset.mime_type,
+            "width": width,
+            "height": height,
+            "size": size,
+        }
+        return await run_in_threadpool(MediaService.save_derivative, db, media.id, preset.name, values)
+
+    async def ensure_all(self, db: Session, media: Media, preset_names: Sequence[str]) -> List[MediaDerivative]:
+        """The derivatives of `media` for some presets, rendering the missing ones first.
+
+        The renders run in parallel; the session is only used by one thread at a time.
+        Raises KeyError for an unknown preset, ValueError when the media is not an
+        image that can be rendered and ImageProcessingUnavailable without Pillow or
+        when a render process died.
+        """
+        presets = [self.presets[name] for name in preset_names]
+        if not (media.mime_type or "").startswith("image/"):
+            raise ValueError("Media is not an image")
+        planned = []
+        for preset in presets:
+            file_path = derivative_path(media.file_path, preset)
+            current = await run_in_threadpool(self._current, db, media, preset, file_path)
+            planned.append((preset, file_path, current, None if current else self._start(media, preset, file_path)))
+        return [
+            current if job is None else await self._finish(db, media, preset, file_path, job)
+            for preset, file_path, current, job in planned
+        ]
+
+    async def ensure(self, db: Session, media: Media, preset_name: str) -> MediaDerivative:
+        return (await self.ensure_all(db, media, [preset_name]))[0]
+
+    async def generate_eager(self, engine: Engine, media_id: int) -> None:
+        """Render the eager presets of a new upload; run after the response is sent"""
+        try:
+            with Session(bind=engine, autoflush=False, expire_on_commit=False) as db:
+                media = await run_in_threadpool(MediaService.get_media_by_id, db, media_id)
+                if media is not None:
+                    await self.ensure_all(db, media, self.eager)
+        except Exception as e:
+            print(f"✗ Derivatives of media {media_id} failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self.workers, "in_flight": len(self._jobs), "rendered": self.rendered, "joined": self.joined}
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+media_derivatives = DerivativeGenerator(
+    parse_presets(settings.media_derivative_presets),
+    [name.strip() for name in settings.media_derivatives_eager.split(",") if name.strip()],
+    settings.media_derivative_workers,
+    settings.media_derivative_quality,
+)
@@ -1,14 +1,26 @@
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from inorta_backend.core.config import settings
 from inorta_backend.models.media import Media
+from inorta_backend.models.media_derivative import MediaDerivative
+from inorta_backend.models.user import User
 from inorta_backend.schemas.media import MediaCreate, MediaUpdate
+from inorta_backend.services.bulk import bulk_insert
+from inorta_backend.services.media_storage import StoredFile, media_storage
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
 
 
 class MediaService:
     @staticmethod
-    def get_media(db: Session, skip: int = 0, limit: int = 100) -> List[Media]:
-        return db.query(Media).offset(skip).limit(limit).all()
+    def get_media(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Media]:
+        return paginate(db.query(Media), (Media.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_media_by_id(db: Session, media_id: int) -> Optional[Media]:
@@ -30,26 +42,124 @@ class MediaService:
         )
         db.add(db_obj)
         db.commit()
+        response_cache.invalidate("media")
         db.refresh(db_obj)
         return db_obj
 
+    @staticmethod
+    def get_media_by_hash(db: Session, content_hash: str) -> Optional[Media]:
+        return db.query(Media).filter(Media.content_hash == content_hash).first()
+
+    @staticmethod
+    def create_uploaded_media(
+        db: Session,
+        stored: StoredFile,
+        filename: str,
+        alt_text: Optional[str] = None,
+        caption: Optional[str] = None,
+        uploaded_by: Optional[int] = None,
+    ) -> Tuple[Media, bool]:
+        """The media row of a stored upload and whether it was created.
+
+        An upload whose bytes are already stored returns the existing row unchanged,
+        including when a concurrent upload of the same file inserted it first.
+        """
+        existing = MediaService.get_media_by_hash(db, stored.content_hash)
+        if existing:
+            return existing, False
+        db_obj = Media(
+            filename=stored.file_path.rsplit("/", 1)[-1],
+            original_filename=filename,
+            file_path=stored.file_path,
+            file_url=f"{settings.media_base_url.rstrip('/')}/{stored.file_path}",
+            file_type=stored.mime_type.split("/")[0],
+            mime_type=stored.mime_type,
+            size=stored.size,
+            content_hash=stored.content_hash,
+            alt_text=alt_text,
+            caption=caption,
+            uploaded_by=uploaded_by,
+        )
+        try:
+            insert_row(db, db_obj, {"content_hash": "Media already exists"})
+        except ValueError:
+            return MediaService.get_media_by_hash(db, stored.content_hash), False
+        response_cache.invalidate("media")
+        return db_obj, True
+
+    @staticmethod
+    def bulk_create_media(db: Session, items: List[MediaCreate]) -> List[Dict[str, Any]]:
+        """Insert many media rows; an unknown uploader fails only its own item"""
+        rows = [item.model_dump() for item in items]
+        uploader_ids = {row["uploaded_by"] for row in rows if row["uploaded_by"] is not None}
+        known = {row[0] for row in db.query(User.id).filter(User.id.in_(uploader_ids))} if uploader_ids else set()
+        errors = {
+            index: "Uploader not found" for index, row in enumerate(rows)
+            if row["uploaded_by"] is not None and row["uploaded_by"] not in known
+        }
+        return bulk_insert(db, Media.__table__, rows, errors=errors, cache_tags=("media",))
+
     @staticmethod
     def update_media(db: Session, media_id: int, data: MediaUpdate) -> Optional[Media]:
-        db_obj = db.query(Media).filter(Media.id == media_id).first()
+        db_obj = update_by_id(db, Media, media_id, data.model_dump(exclude_unset=True))
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("media")
+        return db_obj
+
+    @staticmethod
+    def get_derivatives(db: Session, media_id: int) -> List[MediaDerivative]:
+        return db.query(MediaDerivative).filter(MediaDerivative.media_id == media_id).order_by(MediaDerivative.preset).all()
+
+    @staticmethod
+    def get_derivative(db: Session, media_id: int, preset: str) -> Optional[MediaDerivative]:
+        return (
+            db.query(MediaDerivative)
+            .filter(MediaDerivative.media_id == media_id, MediaDerivative.preset == preset)
+            .first()
+        )
+
+    @staticmethod
+    def save_derivative(db: Session, media_id: int, preset: str, values: Dict[str, Any]) -> MediaDerivative:
+        """Record a rendered derivative, replacing the row (and file) of an outdated one"""
+        existing = MediaService.get_derivative(db, media_id, preset)
+        if existing is not None:
+            stale_path = existing.file_path
+            db_obj = update_by_id(db, MediaDerivative, existing.id, values)
+            db.commit()
+            if stale_path != db_obj.file_path:
+                media_storage.delete(stale_path)
+        else:
+            db_obj = MediaDerivative(media_id=media_id, preset=preset, **values)
+            db.add(db_obj)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker recorded it first, or the media is gone
+                db.rollback()
+                db_obj = MediaService.get_derivative(db, media_id, preset)
+                if db_obj is None:
+                    raise ValueError("Media not found")
+                return db_obj
+        response_cache.invalidate("media")
         return db_obj
 
     @staticmethod
     def delete_media(db: Session, media_id: int) -> bool:
-        db_obj = db.query(Media).filter(Media.id == media_id).first()
-        if not db_obj:
+        stored = db.query(Media.file_path, Media.content_hash).filter(Media.id == media_id).first()
+        derivative_paths = [
+            row.file_path for row in db.query(MediaDerivative.file_path).filter(MediaDerivative.media_id == media_id)
+        ]
+        db.execute(delete(MediaDerivative).where(MediaDerivative.media_id == media_id))
+        if not delete_by_id(db, Media, media_id):
+            db.rollback()
             return False
-        db.delete(db_obj)
         db.commit()
+        response_cache.invalidate("media")
+        # Uploaded files belong to exactly one row (content_hash is unique)
+        if stored and stored.content_hash:
+            media_storage.delete(stored.file_path)
+        for file_path in derivative_paths:
+            media_storage.delete(file_path)
         return True
\ No newline at end of file
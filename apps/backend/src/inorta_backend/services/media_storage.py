@@ -0,0 +1,177 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, BinaryIO, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from inorta_backend.core.config import settings
+from inorta_backend.services.open_files import open_files
+
+# Bytes gathered from the request before a write; bounds the memory of one upload
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Leading bytes that identify a format regardless of the name or Content-Type sent
+SIGNATURES = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (4, b"ftypqt", "video/quicktime"),
+    (4, b"ftyp", "video/mp4"),
+)
+RIFF_FORMATS = {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}
+SNIFF_SIZE = 16
+
+
+class UploadTooLarge(Exception):
+    """The body exceeded the upload limit; nothing was stored"""
+
+
+def sniff_mime_type(head: bytes) -> Optional[str]:
+    """Mime type from the first bytes of a file, if they carry a known signature"""
+    if head[:4] == b"RIFF" and head[8:12] in RIFF_FORMATS:
+        return RIFF_FORMATS[head[8:12]]
+    for offset, signature, mime_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return mime_type
+    return None
+
+
+def guess_mime_type(head: bytes, filename: Optional[str] = None, declared: Optional[str] = None) -> str:
+    """The sniffed type, else the one of the file name's extension, else what the client sent"""
+    declared = (declared or "").split(";")[0].strip().lower()
+    return (
+        sniff_mime_type(head)
+        or (filename and mimetypes.guess_type(filename)[0])
+        or (declared if "/" in declared and declared != "application/octet-stream" else None)
+        or "application/octet-stream"
+    )
+
+
+def file_extension(mime_type: str, filename: Optional[str] = None) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension and mimetypes.guess_type(f"x{extension}")[0] == mime_type:
+        return extension
+    return mimetypes.guess_extension(mime_type) or extension[:16]
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    """An upload written to storage; `created` is False when the same bytes were already there"""
+
+    content_hash: str
+    size: int
+    mime_type: str
+    file_path: str
+    created: bool
+
+
+class MediaStorage:
+    """Content-addressed files under `root`.
+
+    A file is stored once per SHA-256 of its bytes, at `ab/cd/abcd....ext`, so equal
+    uploads share one file. Bodies are streamed to a temporary file in `root` while
+    being hashed and counted, then renamed into place, so an upload holds at most
+    WRITE_BUFFER_SIZE bytes in memory whatever its size, and a partial upload is
+    never visible under a final path.
+    """
+
+    def __init__(self, root: str, max_size: int):
+        self.root = root
+        self.max_size = max_size
+
+    def path(self, file_path: str) -> str:
+        """Absolute path of a stored file, refusing anything outside `root`"""
+        root = os.path.abspath(self.root)
+        full = os.path.abspath(os.path.join(root, file_path))
+        if os.path.commonpath([root, full]) != root:
+            raise ValueError("Invalid media path")
+        return full
+
+    def _open_temp(self) -> BinaryIO:
+        directory = os.path.join(self.root, "tmp")
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, prefix="upload-", delete=False)
+
+    @staticmethod
+    def _write(handle: BinaryIO, digest: Any, data: bytes) -> None:
+        # hashlib and file writes release the GIL, so this runs off the event loop
+        digest.update(data)
+        handle.write(data)
+
+    def _commit(self, temp_path: str, content_hash: str, extension: str) -> Tuple[str, bool]:
+        file_path = f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+        target = self.path(file_path)
+        if os.path.exists(target):
+            os.remove(temp_path)
+            return file_path, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)
+        return file_path, True
+
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: Optional[str] = None,
+        declared_type: Optional[str] = None,
+    ) -> StoredFile:
+        """Write `chunks` to storage, hashing and counting them on the way.
+
+        Raises UploadTooLarge, with the partial file removed, once more than
+        `max_size` bytes have arrived.
+        """
+        handle = await run_in_threadpool(self._open_temp)
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        pending = bytearray()
+        try:
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_size} bytes")
+                    if len(head) < SNIFF_SIZE:
+                        head += chunk[:SNIFF_SIZE - len(head)]
+                    pending += chunk
+                    if len(pending) >= WRITE_BUFFER_SIZE:
+                        data, pending = bytes(pending), bytearray()
+                        await run_in_threadpool(self._write, handle, digest, data)
+                if pending:
+                    await run_in_threadpool(self._write, handle, digest, bytes(pending))
+            finally:
+                await run_in_threadpool(handle.close)
+            mime_type = guess_mime_type(head, filename, declared_type)
+            content_hash = digest.hexdigest()
+            file_path, created = await run_in_threadpool(
+                self._commit, handle.name, content_hash, file_extension(mime_type, filename)
+            )
+        except BaseException:
+            if os.path.exists(handle.name):
+                os.remove(handle.name)
+            raise
+        return StoredFile(content_hash, size, mime_type, file_path, created)
+
+    def delete(self, file_path: str) -> bool:
+        try:
+            path = self.path(file_path)
+            os.remove(path)
+        except (FileNotFoundError, ValueError):
+            return False
+        open_files.discard(path)
+        return True
+
+
+media_storage = MediaStorage(settings.media_root, settings.media_max_upload_size)
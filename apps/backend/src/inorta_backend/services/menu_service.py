@@ -1,15 +1,88 @@
+import threading
+import time
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
 
+from inorta_backend.core.config import settings
+from inorta_backend.db.routing import read_from_primary
 from inorta_backend.models.menu import Menu
 from inorta_backend.models.menu_item import MenuItem
-from inorta_backend.schemas.menu import MenuCreate, MenuUpdate, MenuItemCreate, MenuItemUpdate
+from inorta_backend.schemas.menu import (
+    MenuCreate,
+    MenuUpdate,
+    MenuItemCreate,
+    MenuItemUpdate,
+    MenuItemTreeNode,
+    MenuResponse,
+    MenuTreeResponse,
+)
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
+
+
+def build_menu_tree(items: Sequence[MenuItem]) -> List[MenuItemTreeNode]:
+    """Nest a menu's flat item list by `parent_id` in a single pass.
+
+    `items` must already be in display order; children keep that order. Items whose
+    parent is not in `items` (inactive, deleted or in another menu) are dropped
+    together with their subtree, as are parent cycles.
+    """
+    nodes: Dict[int, MenuItemTreeNode] = {
+        item.id: MenuItemTreeNode.model_validate(item) for item in items
+    }
+    roots: List[MenuItemTreeNode] = []
+    for item in items:
+        node = nodes[item.id]
+        if item.parent_id is None:
+            roots.append(node)
+        elif item.parent_id in nodes:
+            nodes[item.parent_id].children.append(node)
+    return roots
+
+
+class MenuTreeCache:
+    """Serialized menu trees keyed by menu id or location.
+
+    Any menu or menu item write clears the whole cache; menus change rarely and are
+    small, so finer-grained invalidation isn't worth tracking. A tree built while a
+    write was in flight is discarded instead of cached. Writes only clear the cache
+    of the worker that made them, so `ttl` bounds how long other workers serve an
+    old tree.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.generation = 0
+        self._trees: Dict[Hashable, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._trees.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, tree: bytes, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation:
+                self._trees[key] = (time.monotonic(), tree)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._trees = {}
+
+
+menu_tree_cache = MenuTreeCache(settings.menu_tree_cache_ttl)
 
 
 class MenuService:
     @staticmethod
-    def get_menus(db: Session, skip: int = 0, limit: int = 100) -> List[Menu]:
-        return db.query(Menu).offset(skip).limit(limit).all()
+    def get_menus(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Menu]:
+        return paginate(db.query(Menu), (Menu.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_menu_by_id(db: Session, menu_id: int) -> Optional[Menu]:
@@ -17,37 +90,74 @@ class MenuService:
 
     @staticmethod
     def create_menu(db: Session, data: MenuCreate) -> Menu:
-        db_obj = Menu(name=data.name, location=data.location)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        # Menus have no unique columns, so any IntegrityError is left to surface
+        db_obj = insert_row(db, Menu(name=data.name, location=data.location), {})
+        response_cache.invalidate("menus")
+        menu_tree_cache.invalidate()
         return db_obj
 
     @staticmethod
     def update_menu(db: Session, menu_id: int, data: MenuUpdate) -> Optional[Menu]:
-        db_obj = db.query(Menu).filter(Menu.id == menu_id).first()
+        db_obj = update_by_id(db, Menu, menu_id, data.model_dump(exclude_unset=True))
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("menus")
+        menu_tree_cache.invalidate()
         return db_obj
 
     @staticmethod
     def delete_menu(db: Session, menu_id: int) -> bool:
-        db_obj = db.query(Menu).filter(Menu.id == menu_id).first()
-        if not db_obj:
+        if not delete_by_id(db, Menu, menu_id):
             return False
-        db.delete(db_obj)
         db.commit()
+        response_cache.invalidate("menus")
+        menu_tree_cache.invalidate()
         return True
 
+    @staticmethod
+    def get_menu_by_location(db: Session, location: str) -> Optional[Menu]:
+        return db.query(Menu).filter(Menu.location == location).order_by(Menu.id).first()
+
+    @staticmethod
+    def get_menu_tree_json(db: Session, menu_id: int) -> Optional[bytes]:
+        """Active items of a menu nested into a tree, as cached JSON bytes"""
+        return MenuService._cached_tree(db, ("id", menu_id), lambda: MenuService.get_menu_by_id(db, menu_id))
+
+    @staticmethod
+    def get_menu_tree_json_by_location(db: Session, location: str) -> Optional[bytes]:
+        """Tree of the first menu assigned to `location`, as cached JSON bytes"""
+        return MenuService._cached_tree(db, ("location", location), lambda: MenuService.get_menu_by_location(db, location))
+
+    @staticmethod
+    def _cached_tree(db: Session, key: Hashable, load_menu) -> Optional[bytes]:
+        tree = menu_tree_cache.get(key)
+        if tree is not None:
+            return tree
+        generation = menu_tree_cache.generation
+        read_from_primary(db)
+        menu = load_menu()
+        if not menu:
+            return None
+        items = (
+            db.query(MenuItem)
+            .filter(MenuItem.menu_id == menu.id, MenuItem.is_active.isnot(False))
+            .order_by(MenuItem.order, MenuItem.id)
+            .all()
+        )
+        tree = MenuTreeResponse(
+            menu=MenuResponse.model_validate(menu), items=build_menu_tree(items)
+        ).model_dump_json().encode("utf-8")
+        menu_tree_cache.put(key, tree, generation)
+        return tree
+
     # MenuItem operations
     @staticmethod
-    def get_menu_items(db: Session, menu_id: int, skip: int = 0, limit: int = 100) -> List[MenuItem]:
-        return db.query(MenuItem).filter(MenuItem.menu_id == menu_id).order_by(MenuItem.order).offset(skip).limit(limit).all()
+    def get_menu_items(
+        db: Session, menu_id: int, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[MenuItem]:
+        query = db.query(MenuItem).filter(MenuItem.menu_id == menu_id)
+        return paginate(query, (MenuItem.order, MenuItem.id), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def create_menu_item(db: Session, data: MenuItemCreate) -> MenuItem:
@@ -61,28 +171,26 @@ class MenuService:
             order=data.order,
             is_active=data.is_active,
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        insert_row(db, db_obj, {})
+        response_cache.invalidate("menu-items")
+        menu_tree_cache.invalidate()
         return db_obj
 
     @staticmethod
     def update_menu_item(db: Session, item_id: int, data: MenuItemUpdate) -> Optional[MenuItem]:
-        db_obj = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+        db_obj = update_by_id(db, MenuItem, item_id, data.model_dump(exclude_unset=True))
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("menu-items")
+        menu_tree_cache.invalidate()
         return db_obj
 
     @staticmethod
     def delete_menu_item(db: Session, item_id: int) -> bool:
-        db_obj = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-        if not db_obj:
+        if not delete_by_id(db, MenuItem, item_id):
             return False
-        db.delete(db_obj)
         db.commit()
+        response_cache.invalidate("menu-items")
+        menu_tree_cache.invalidate()
         return True
\ No newline at end of file
@@ -0,0 +1,256 @@
+import glob
+import json
+import os
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from inorta_backend.core.config import settings
+from inorta_backend.db.pool import CHECKOUT_BUCKETS_MS, pool_stats
+
+# Label pairs of one series, in a fixed order
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+CHECKOUT_BUCKETS = tuple(bound / 1000 for bound in CHECKOUT_BUCKETS_MS)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    kind: str  # counter, gauge or histogram
+    help: str
+    buckets: Tuple[float, ...] = ()
+
+
+METRICS: Dict[str, Metric] = {metric.name: metric for metric in (
+    Metric("http_requests_total", "counter", "HTTP requests by route template and status"),
+    Metric("http_request_duration_seconds", "histogram", "Time to serve a request", LATENCY_BUCKETS),
+    Metric("http_response_size_bytes", "histogram", "Response body size", SIZE_BUCKETS),
+    Metric("http_requests_in_progress", "gauge", "Requests being served"),
+    Metric("db_statements_total", "counter", "SQL statements run while serving requests"),
+    Metric("db_request_duration_seconds", "histogram", "Total SQL time of a request", DB_BUCKETS),
+    Metric("db_pool_checkout_duration_seconds", "histogram", "Time to check a connection out of the pool", CHECKOUT_BUCKETS),
+    Metric("db_pool_checkouts_total", "counter", "Pool checkouts"),
+    Metric("db_pool_waits_total", "counter", "Checkouts that waited for a connection to be returned"),
+    Metric("db_pool_timeouts_total", "counter", "Checkouts that timed out"),
+    Metric("db_pool_checked_out", "gauge", "Connections in use"),
+    Metric("db_pool_overflow", "gauge", "Connections open beyond the pool size"),
+)}
+
+
+class MetricsRegistry:
+    """In-process metric values; each update is one dict operation under one lock.
+
+    Counters and gauges hold a number, histograms a list of per-bucket counts (the
+    last one for +Inf) followed by sum and count.
+    """
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, Labels], Any] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Labels, amount: float = 1) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            self._values[(name, labels)] = value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = METRICS[name].buckets
+        key = (name, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(buckets) + 3)
+            series[bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def record_request(
+        self, method: str, route: str, status: str, seconds: float, size: int, statements: int, db_seconds: float
+    ) -> None:
+        """All per-request series in one go"""
+        labels = (("method", method), ("route", route), ("status", status))
+        route_labels = labels[:2]
+        self.inc("http_requests_total", labels)
+        self.observe("http_request_duration_seconds", labels, seconds)
+        self.observe("http_response_size_bytes", labels, size)
+        self.inc("db_statements_total", route_labels, statements)
+        self.observe("db_request_duration_seconds", route_labels, db_seconds)
+
+    def snapshot(self) -> List[list]:
+        """[name, labels, value] rows, with pool statistics read at this moment"""
+        self._collect_pool()
+        with self._lock:
+            return [
+                [name, [list(pair) for pair in labels], list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def _collect_pool(self) -> None:
+        for name, stats in list(pool_stats.items()):
+            labels = (("engine", name),)
+            snapshot = stats.snapshot()
+            histogram = snapshot["checkout_ms"]
+            counts, seen = [], 0
+            for _, cumulative in histogram["buckets"]:
+                counts.append(cumulative - seen)
+                seen = cumulative
+            self.set("db_pool_checkout_duration_seconds", labels, [*counts, histogram["sum"] / 1000, histogram["count"]])
+            self.set("db_pool_checkouts_total", labels, snapshot["checkouts"])
+            self.set("db_pool_waits_total", labels, snapshot["waits"])
+            self.set("db_pool_timeouts_total", labels, snapshot["timeouts"])
+            if "checked_out" in snapshot:
+                self.set("db_pool_checked_out", labels, snapshot["checked_out"])
+                self.set("db_pool_overflow", labels, snapshot["overflow"])
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(snapshots: Iterable[Tuple[bool, List[list]]]) -> Dict[Tuple[str, Labels], Any]:
+    """Sum series across processes; gauges only from processes still running"""
+    merged: Dict[Tuple[str, Labels], Any] = {}
+    for alive, rows in snapshots:
+        for name, labels, value in rows:
+            metric = METRICS.get(name)
+            if metric is None or (metric.kind == "gauge" and not alive):
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            current = merged.get(key)
+            if current is None:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = current + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(merged: Dict[Tuple[str, Labels], Any]) -> str:
+    """Prometheus text exposition format (0.0.4) of merged series"""
+    by_name: Dict[str, List[Tuple[Labels, Any]]] = {}
+    for (name, labels), value in merged.items():
+        by_name.setdefault(name, []).append((labels, value))
+    lines: List[str] = []
+    for name, metric in METRICS.items():
+        series = by_name.get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in sorted(series):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, "+Inf"), value[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_number(bound)
+                lines.append(f"{name}_bucket{_format_labels((*labels, ('le', str(le))))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_number(value[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """Process metrics, optionally shared between worker processes through `directory`.
+
+    Each worker keeps its series in memory and rewrites `metrics-<pid>.json` in
+    `directory` every `flush_interval` seconds (atomically, via rename). A scrape of
+    any worker flushes its own file, then sums every file: counters and histograms
+    of exited workers keep counting, their gauges are dropped. Without a directory
+    only the serving process is reported.
+    """
+
+    def __init__(self, directory: Optional[str], flush_interval: float):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.registry = MetricsRegistry()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        pid = os.getpid()
+        path = self._path(pid)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as handle:
+            json.dump({"pid": pid, "series": self.registry.snapshot()}, handle, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def _worker_snapshots(self) -> Iterable[Tuple[bool, List[list]]]:
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            yield _pid_alive(data["pid"]), data["series"]
+
+    def render(self) -> str:
+        if not self.directory:
+            return render(merge([(True, self.registry.snapshot())]))
+        self.flush()
+        return render(merge(self._worker_snapshots()))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"✗ Metrics flush failed, will retry: {e}")
+
+    def start(self) -> None:
+        """Start the periodic writer of this worker's metrics file"""
+        if not self.directory:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer and leave a final copy of this worker's counters"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+metrics = Metrics(settings.metrics_dir, settings.metrics_flush_interval)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Dict
+
+from inorta_backend.core.config import settings
+
+
+class OpenFile:
+    """An open, read-only file shared by the responses serving it.
+
+    Reads use `os.pread` (and zero-copy sends an explicit offset), so concurrent
+    responses never move a shared file position.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: BinaryIO = open(path, "rb", buffering=0)
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.identity = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self.checked_at = time.monotonic()
+        self.users = 0
+        self.evicted = False
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def read(self, offset: int, size: int) -> bytes:
+        return os.pread(self.file.fileno(), size, offset)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class OpenFileCache:
+    """LRU of open file descriptors, so hot files are not re-opened per request.
+
+    A cached descriptor is trusted for `valid` seconds; after that the path is
+    stat'ed again and the file reopened if it was replaced or removed. Evicted
+    descriptors stay open until the last response using them is done. `max_open`
+    of 0 opens a fresh descriptor for every request.
+    """
+
+    def __init__(self, max_open: int, valid: float = 5.0):
+        self.max_open = max_open
+        self.valid = valid
+        self.files: "OrderedDict[str, OpenFile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, path: str) -> OpenFile:
+        """The open file at `path`; raises FileNotFoundError. Pair with `release`"""
+        with self._lock:
+            entry = self.files.get(path)
+            if entry is not None and time.monotonic() - entry.checked_at > self.valid:
+                if self._unchanged(entry):
+                    entry.checked_at = time.monotonic()
+                else:
+                    self._evict(path)
+                    entry = None
+            if entry is not None:
+                self.files.move_to_end(path)
+                self.hits += 1
+                entry.users += 1
+                return entry
+            self.misses += 1
+        entry = OpenFile(path)
+        with self._lock:
+            entry.users += 1
+            if self.max_open <= 0:
+                entry.evicted = True
+                return entry
+            if path in self.files:
+                self._evict(path)
+            self.files[path] = entry
+            while len(self.files) > self.max_open:
+                self._evict(next(iter(self.files)))
+        return entry
+
+    def release(self, entry: OpenFile) -> None:
+        with self._lock:
+            entry.users -= 1
+            if entry.evicted and entry.users <= 0:
+                entry.close()
+
+    def discard(self, path: str) -> None:
+        """Drop the descriptor of a removed or replaced file"""
+        with self._lock:
+            if path in self.files:
+                self._evict(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in list(self.files):
+                self._evict(path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"open": len(self.files), "max_open": self.max_open, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _unchanged(entry: OpenFile) -> bool:
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns) == entry.identity
+
+    def _evict(self, path: str) -> None:
+        entry = self.files.pop(path)
+        entry.evicted = True
+        if entry.users <= 0:
+            entry.close()
+
+
+open_files = OpenFileCache(settings.media_open_files, settings.media_open_files_valid)
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import DateTime, and_, or_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row of a page into an opaque cursor"""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 1) -> List[Any]:
+    """Decode a cursor produced by `encode_cursor`, raising ValueError if it is malformed"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _coerce(key: Any, value: Any) -> Any:
+    # Cursors carry datetimes as ISO strings; bind them back as datetimes
+    if isinstance(value, str) and isinstance(getattr(key, "type", None), DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def keyset_after(keys: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """Build `(k1, k2, ...) > (v1, v2, ...)` (or `<`) expanded into an index-friendly OR chain"""
+    values = [_coerce(key, value) for key, value in zip(keys, values)]
+    clauses = []
+    for i, key in enumerate(keys):
+        equal = [keys[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, key < values[i] if descending else key > values[i]))
+    return or_(*clauses)
+
+
+def paginate(
+    query: Query,
+    keys: Sequence[Any],
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Sequence[Any]] = None,
+    descending: bool = False,
+) -> list:
+    """Order a query by `keys` and return one page.
+
+    With `after` the page starts right after that key (keyset pagination, constant cost
+    at any depth); without it the legacy `skip` offset is applied. Keys must be
+    non-null for keyset pages to be complete.
+    """
+    query = query.order_by(*(key.desc() for key in keys) if descending else keys)
+    if after is not None:
+        try:
+            query = query.filter(keyset_after(keys, after, descending))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def next_cursor(items: Sequence[Any], limit: int, attrs: Sequence[str] = ("id",)) -> Optional[str]:
+    """Return the cursor for the page following `items`, or None when it was the last page"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, attr) for attr in attrs])
@@ -0,0 +1,202 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from inorta_backend.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized GET response: status, raw ASGI headers, body bytes and the route template that built it"""
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    route: Optional[str] = None
+
+
+class CacheBackend(ABC):
+    """Storage for cached responses, tagged so writes can drop every dependent entry.
+
+    `generation` returns a token that changes whenever one of the tags is
+    invalidated; `set` must discard the entry if the token moved since it was taken,
+    so a response rendered while a write was committing is never cached.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse, tags: Iterable[str], ttl: float, generation: int) -> bool:
+        ...
+
+    @abstractmethod
+    def generation(self, tags: Iterable[str]) -> int:
+        ...
+
+    @abstractmethod
+    def invalidate(self, tags: Iterable[str]) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU with a TTL per entry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse, Tuple[str, ...]]]" = OrderedDict()
+        self._tagged: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: CachedResponse, tags: Iterable[str], ttl: float, generation: int) -> bool:
+        tags = tuple(tags)
+        with self._lock:
+            if self._generation(tags) != generation:
+                return False
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _generation(self, tags: Iterable[str]) -> int:
+        return sum(self._generations.get(tag, 0) for tag in tags)
+
+    def generation(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            return self._generation(tags)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                keys = self._tagged.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tagged.pop(tag, set()):
+                    if key in self._entries:
+                        self._drop(key)
+                        dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self.evictions = 0
+            for tag in self._generations:
+                self._generations[tag] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Read-through cache of serialized GET responses in front of a `CacheBackend`.
+
+    Entries are tagged with the resources they were built from and dropped when a
+    service commits a write to one of them. Other workers only see that write once
+    their copy's `ttl` runs out, unless the backend is shared. For `settle` seconds
+    after a tag is invalidated nothing tagged with it is stored, so a read served by
+    a replica that hasn't applied the write yet can't be cached as current.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, settle: float = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.settle = settle
+        self._invalidated_at: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self, tags: Iterable[str]) -> int:
+        return self.backend.generation(tags)
+
+    def set(self, key: str, value: CachedResponse, tags: Iterable[str], generation: int) -> None:
+        if self.settle:
+            tags = tuple(tags)
+            settled = time.monotonic() - self.settle
+            if any(self._invalidated_at.get(tag, 0) > settled for tag in tags):
+                return
+        if self.backend.set(key, value, tags, self.ttl, generation):
+            self.stores += 1
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry built from any of `tags`; call after the write commits"""
+        if self.settle:
+            now = time.monotonic()
+            for tag in tags:
+                self._invalidated_at[tag] = now
+        self.invalidations += self.backend.invalidate(tags)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        self.backend.clear()
+        self._invalidated_at.clear()
+        self.hits = self.misses = self.stores = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
+
+
+# With read replicas, reads right after a write may still see the old state for as
+# long as a writing client is kept on the primary
+response_cache = ResponseCache(
+    MemoryCacheBackend(settings.response_cache_size),
+    settings.response_cache_ttl,
+    settle=settings.db_replica_sticky_seconds if settings.database_replica_urls else 0,
+)
@@ -1,14 +1,21 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence
 
 from inorta_backend.models.role import Role
+from inorta_backend.models.user import User
 from inorta_backend.schemas.role import RoleCreate, RoleUpdate
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
 
 
 class RoleService:
     @staticmethod
-    def get_roles(db: Session, skip: int = 0, limit: int = 100) -> List[Role]:
-        return db.query(Role).offset(skip).limit(limit).all()
+    def get_roles(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Role]:
+        return paginate(db.query(Role), (Role.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_role_by_id(db: Session, role_id: int) -> Optional[Role]:
@@ -20,29 +27,28 @@ class RoleService:
 
     @staticmethod
     def create_role(db: Session, role: RoleCreate) -> Role:
-        db_role = Role(name=role.name, description=role.description)
-        db.add(db_role)
-        db.commit()
-        db.refresh(db_role)
+        db_role = insert_row(
+            db, Role(name=role.name, description=role.description), {"name": "Role already exists"}
+        )
+        response_cache.invalidate("roles")
         return db_role
 
     @staticmethod
     def update_role(db: Session, role_id: int, role: RoleUpdate) -> Optional[Role]:
-        db_role = db.query(Role).filter(Role.id == role_id).first()
+        db_role = update_by_id(db, Role, role_id, role.model_dump(exclude_unset=True))
         if not db_role:
             return None
-        update_data = role.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_role, field, value)
         db.commit()
-        db.refresh(db_role)
+        response_cache.invalidate("roles")
         return db_role
 
     @staticmethod
     def delete_role(db: Session, role_id: int) -> bool:
-        db_role = db.query(Role).filter(Role.id == role_id).first()
-        if not db_role:
+        # Users of the role keep their account, just without a role
+        db.execute(update(User).where(User.role_id == role_id).values(role_id=None))
+        if not delete_by_id(db, Role, role_id):
+            db.rollback()
             return False
-        db.delete(db_role)
         db.commit()
+        response_cache.invalidate("roles", "users")
         return True
@@ -0,0 +1,286 @@
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+
+from inorta_backend.core.config import settings
+from inorta_backend.models.content import Content
+
+# Relative weight of each searchable field when ranking
+FIELD_WEIGHTS = {"title": 10.0, "excerpt": 5.0, "content": 1.0}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(value.lower()) if value else []
+
+
+# Full-text structures live next to the contents table so create_all/drop_all and
+# init_db manage them too; migration 0006 creates them on existing databases.
+event.listen(
+    Content.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS contents_fts "
+        "USING fts5(title, excerpt, content, tokenize='unicode61')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    Content.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS contents_fts").execute_if(dialect="sqlite"),
+)
+event.listen(
+    Content.__table__,
+    "after_create",
+    DDL(
+        "CREATE FULLTEXT INDEX ft_contents_search ON contents (title, excerpt, content)"
+    ).execute_if(dialect="mysql"),
+)
+
+
+class SearchEngine(ABC):
+    """Full-text index over content title, excerpt and body.
+
+    `index`/`remove` are called by ContentService inside the write's transaction,
+    before commit; engines whose index the database maintains keep the no-op
+    defaults. `search` returns `(content_id, score)` pairs, best first.
+    """
+
+    name = "base"
+
+    def index(self, db: Session, content: Content) -> None:
+        pass
+
+    def remove(self, db: Session, content_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        ...
+
+    def reindex(self, db: Session) -> int:
+        """Rebuild the index from the contents table; returns the number of rows indexed"""
+        return db.query(Content.id).count()
+
+
+class SqliteFtsSearchEngine(SearchEngine):
+    """SQLite FTS5 shadow table keyed by content id, ranked by weighted bm25"""
+
+    name = "fts5"
+
+    def index(self, db: Session, content: Content) -> None:
+        self.remove(db, content.id)
+        db.execute(
+            text("INSERT INTO contents_fts (rowid, title, excerpt, content) VALUES (:id, :title, :excerpt, :content)"),
+            {"id": content.id, "title": content.title, "excerpt": content.excerpt, "content": content.content},
+        )
+
+    def remove(self, db: Session, content_id: int) -> None:
+        db.execute(text("DELETE FROM contents_fts WHERE rowid = :id"), {"id": content_id})
+
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quote every term so user input can't inject FTS5 query syntax
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS.values())
+        rows = db.execute(
+            text(
+                f"SELECT rowid, -bm25(contents_fts, {weights}) AS score FROM contents_fts "
+                "WHERE contents_fts MATCH :match ORDER BY score DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match, "limit": limit, "offset": offset},
+        )
+        return [(row[0], row[1]) for row in rows]
+
+    def reindex(self, db: Session) -> int:
+        db.execute(text("DELETE FROM contents_fts"))
+        result = db.execute(text(
+            "INSERT INTO contents_fts (rowid, title, excerpt, content) "
+            "SELECT id, title, excerpt, content FROM contents"
+        ))
+        db.commit()
+        return result.rowcount
+
+
+class MysqlFulltextSearchEngine(SearchEngine):
+    """MySQL FULLTEXT index; InnoDB keeps it current, so writes need no hook"""
+
+    name = "mysql"
+
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Boolean mode with every term required and quoted: natural language mode
+        # matches any term and drops terms found in half the rows
+        match = " ".join(f'+"{term}"' for term in dict.fromkeys(terms))
+        rows = db.execute(
+            text(
+                "SELECT id, MATCH (title, excerpt, content) AGAINST (:q IN BOOLEAN MODE) AS score "
+                "FROM contents WHERE MATCH (title, excerpt, content) AGAINST (:q IN BOOLEAN MODE) "
+                "ORDER BY score DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"q": match, "limit": limit, "offset": offset},
+        )
+        return [(row[0], float(row[1])) for row in rows]
+
+    def reindex(self, db: Session) -> int:
+        db.execute(text("OPTIMIZE TABLE contents"))
+        return super().reindex(db)
+
+
+class MemorySearchEngine(SearchEngine):
+    """Pure-Python inverted index ranked with BM25 over field-weighted term counts.
+
+    Built from the contents table on first search and kept current by the write
+    hooks, which take effect when the session commits; a rolled-back write leaves
+    the index as it was. Lives in one process, so it suits single-worker and test
+    deployments.
+    """
+
+    name = "memory"
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._lengths: Dict[int, float] = {}
+        self._terms: Dict[int, List[str]] = {}
+        self._built = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _weighted_terms(content: Content) -> Counter:
+        counts: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(content, field)):
+                counts[term] += weight
+        return counts
+
+    def _remove(self, content_id: int) -> None:
+        for term in self._terms.pop(content_id, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(content_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._lengths.pop(content_id, None)
+
+    def _add(self, content_id: int, counts: Counter) -> None:
+        for term, weight in counts.items():
+            self._postings[term][content_id] = weight
+        self._terms[content_id] = list(counts)
+        self._lengths[content_id] = sum(counts.values())
+
+    @staticmethod
+    def _on_commit(db: Session, change: Callable[[], None]) -> None:
+        # Changes queue in the session until its transaction ends; listeners are
+        # registered once per session
+        if "memory_search" not in db.info:
+            event.listen(db, "after_commit", MemorySearchEngine._apply_pending)
+            event.listen(db, "after_soft_rollback", lambda session, previous: session.info.update(memory_search=[]))
+        db.info.setdefault("memory_search", []).append(change)
+
+    @staticmethod
+    def _apply_pending(db: Session) -> None:
+        changes, db.info["memory_search"] = db.info["memory_search"], []
+        for change in changes:
+            change()
+
+    def _index_now(self, content_id: int, counts: Counter) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(content_id)
+                self._add(content_id, counts)
+
+    def _remove_now(self, content_id: int) -> None:
+        with self._lock:
+            self._remove(content_id)
+
+    def index(self, db: Session, content: Content) -> None:
+        content_id, counts = content.id, self._weighted_terms(content)
+        self._on_commit(db, lambda: self._index_now(content_id, counts))
+
+    def remove(self, db: Session, content_id: int) -> None:
+        self._on_commit(db, lambda: self._remove_now(content_id))
+
+    def reindex(self, db: Session) -> int:
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._lengths = {}
+            self._terms = {}
+            for content in db.query(Content).yield_per(1000):
+                self._add(content.id, self._weighted_terms(content))
+            self._built = True
+            return len(self._lengths)
+
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        if not self._built:
+            self.reindex(db)
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            # Every term must match; intersect starting from the rarest
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                candidates.intersection_update(other)
+            total = len(self._lengths)
+            avg_length = sum(self._lengths.values()) / total if total else 0.0
+            scores = []
+            for content_id in candidates:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[content_id] / avg_length)
+                score = 0.0
+                for term_postings in postings:
+                    idf = math.log(1 + (total - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+                    tf = term_postings[content_id]
+                    score += idf * tf * (self.k1 + 1) / (tf + norm)
+                scores.append((content_id, score))
+        scores.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scores[offset:offset + limit]
+
+
+_engines: Dict[str, SearchEngine] = {}
+_ENGINE_CLASSES = {
+    engine.name: engine for engine in (SqliteFtsSearchEngine, MysqlFulltextSearchEngine, MemorySearchEngine)
+}
+
+
+def get_search_engine(db: Session) -> SearchEngine:
+    """Engine from settings.search_backend; "auto" picks the native index of the session's database"""
+    name = settings.search_backend
+    if name == "auto":
+        dialect = db.get_bind().dialect.name
+        name = {"sqlite": "fts5", "mysql": "mysql"}.get(dialect, "memory")
+    engine = _engines.get(name)
+    if engine is None:
+        engine = _engines.setdefault(name, _ENGINE_CLASSES[name]())
+    return engine
+
+
+class SearchService:
+    @staticmethod
+    def search_contents(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[Content, float]]:
+        """Contents matching every term of `query`, best match first, with their scores"""
+        ranked = get_search_engine(db).search(db, query, limit=limit, offset=offset)
+        if not ranked:
+            return []
+        rows = {c.id: c for c in db.query(Content).filter(Content.id.in_([cid for cid, _ in ranked]))}
+        return [(rows[cid], score) for cid, score in ranked if cid in rows]
+
+    @staticmethod
+    def reindex(db: Session) -> int:
+        return get_search_engine(db).reindex(db)
@@ -1,14 +1,98 @@
+import json
+import threading
+import time
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
+from inorta_backend.core.config import settings as app_settings
+from inorta_backend.db.routing import read_from_primary
 from inorta_backend.models.settings import Setting
 from inorta_backend.schemas.setting import SettingCreate, SettingUpdate
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
+
+# Category used in the snapshot for settings stored without one
+DEFAULT_CATEGORY = "general"
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def decode_setting_value(value: Optional[str], data_type: Optional[str]) -> Any:
+    """Decode the text stored in `Setting.value` according to its `data_type`"""
+    if value is None:
+        return None
+    kind = (data_type or "string").lower()
+    try:
+        if kind in ("int", "integer"):
+            return int(value)
+        if kind in ("float", "number", "decimal"):
+            return float(value)
+        if kind in ("bool", "boolean"):
+            return value.strip().lower() in _TRUE_VALUES
+        if kind in ("json", "array", "object"):
+            return json.loads(value)
+    except ValueError:
+        # Leave malformed values readable rather than failing the whole snapshot
+        return value
+    return value
+
+
+class SettingsSnapshot:
+    """Process-wide, typed copy of the settings table.
+
+    Readers get an immutable dict without locking. Writes through `SettingService`
+    bump `version`, which makes the next read rebuild the snapshot; `ttl` bounds how
+    long a worker can miss writes made by another process.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.version = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+
+    def _is_fresh(self, snapshot: Optional[Dict[str, Any]]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot["version"] == self.version
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def get(self, db: Session) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            version = self.version
+            read_from_primary(db)
+            grouped: Dict[str, Dict[str, Any]] = {}
+            for key, value, data_type, category in db.query(
+                Setting.key, Setting.value, Setting.data_type, Setting.category
+            ):
+                grouped.setdefault(category or DEFAULT_CATEGORY, {})[key] = decode_setting_value(value, data_type)
+            snapshot = {"version": version, "settings": grouped}
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            return snapshot
+
+
+settings_snapshot = SettingsSnapshot(ttl=app_settings.settings_cache_ttl)
 
 
 class SettingService:
     @staticmethod
-    def get_settings(db: Session, skip: int = 0, limit: int = 100) -> List[Setting]:
-        return db.query(Setting).offset(skip).limit(limit).all()
+    def get_settings(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Setting]:
+        return paginate(db.query(Setting), (Setting.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_setting_by_id(db: Session, setting_id: int) -> Optional[Setting]:
@@ -18,6 +102,19 @@ class SettingService:
     def get_setting_by_key(db: Session, key: str) -> Optional[Setting]:
         return db.query(Setting).filter(Setting.key == key).first()
 
+    @staticmethod
+    def get_snapshot(db: Session) -> Dict[str, Any]:
+        """All settings decoded and grouped by category, served from memory"""
+        return settings_snapshot.get(db)
+
+    @staticmethod
+    def get_value(db: Session, key: str, default: Any = None) -> Any:
+        """Typed value of a single setting, served from the snapshot"""
+        for values in settings_snapshot.get(db)["settings"].values():
+            if key in values:
+                return values[key]
+        return default
+
     @staticmethod
     def create_setting(db: Session, data: SettingCreate) -> Setting:
         db_obj = Setting(
@@ -27,28 +124,26 @@ class SettingService:
             category=data.category,
             description=data.description,
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        insert_row(db, db_obj, {"key": "Setting key already exists"})
+        response_cache.invalidate("settings")
+        settings_snapshot.invalidate()
         return db_obj
 
     @staticmethod
     def update_setting(db: Session, setting_id: int, data: SettingUpdate) -> Optional[Setting]:
-        db_obj = db.query(Setting).filter(Setting.id == setting_id).first()
+        db_obj = update_by_id(db, Setting, setting_id, data.model_dump(exclude_unset=True))
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("settings")
+        settings_snapshot.invalidate()
         return db_obj
 
     @staticmethod
     def delete_setting(db: Session, setting_id: int) -> bool:
-        db_obj = db.query(Setting).filter(Setting.id == setting_id).first()
-        if not db_obj:
+        if not delete_by_id(db, Setting, setting_id):
             return False
-        db.delete(db_obj)
         db.commit()
-        return True
\ No newline at end of file
+        response_cache.invalidate("settings")
+        settings_snapshot.invalidate()
+        return True
@@ -0,0 +1,194 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from inorta_backend.core.config import settings
+from inorta_backend.models.content_tag import ContentTag
+
+# Posting lists are sorted, duplicate-free content ids in `array("q")`
+Postings = array
+
+
+def _gallop(values: Postings, target: int, lo: int) -> int:
+    """Index of the first value >= target at or after `lo`, probing 1, 2, 4, ... ahead"""
+    hi, step, size = lo, 1, len(values)
+    while hi < size and values[hi] < target:
+        lo = hi + 1
+        hi += step
+        step <<= 1
+    return bisect_left(values, target, lo, min(hi, size))
+
+
+def intersect(a: Postings, b: Postings) -> Postings:
+    if len(a) > len(b):
+        a, b = b, a
+    out, pos = array("q"), 0
+    for value in a:
+        pos = _gallop(b, value, pos)
+        if pos == len(b):
+            break
+        if b[pos] == value:
+            out.append(value)
+            pos += 1
+    return out
+
+
+def difference(a: Postings, b: Postings) -> Postings:
+    out, pos = array("q"), 0
+    for value in a:
+        pos = _gallop(b, value, pos)
+        if pos == len(b) or b[pos] != value:
+            out.append(value)
+    return out
+
+
+def union(lists: Sequence[Postings]) -> Postings:
+    out = array("q")
+    for value in heapq.merge(*lists):
+        if not out or out[-1] != value:
+            out.append(value)
+    return out
+
+
+class TagPostingIndex:
+    """In-memory inverted index from tag id to the sorted ids of its contents.
+
+    Answers AND/OR/NOT tag queries with galloping merges over compact integer arrays
+    instead of one self-join of content_tags per tag. Assignment changes made through
+    TaxonomyService are applied in place; `ttl` bounds how long a worker can miss
+    changes made by another process before the index goes cold and is rebuilt.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._postings: Optional[Dict[int, Postings]] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._building: Optional[threading.Thread] = None
+        self._log: Optional[List[Tuple[bool, int, Optional[int]]]] = None
+
+    @property
+    def is_warm(self) -> bool:
+        return self._postings is not None and time.monotonic() - self._built_at < self.ttl
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._postings = None
+
+    def rebuild(self, db: Session) -> int:
+        """Load every assignment from content_tags; returns the number of tags indexed"""
+        with self._lock:
+            self._log = []
+        postings: Dict[int, Postings] = {}
+        rows = db.execute(
+            select(ContentTag.tag_id, ContentTag.content_id).order_by(ContentTag.tag_id, ContentTag.content_id)
+        )
+        for tag_id, content_id in rows:
+            values = postings.get(tag_id)
+            if values is None:
+                values = postings[tag_id] = array("q")
+            values.append(content_id)
+        with self._lock:
+            # Replay changes committed while the table was being read
+            for added, content_id, tag_id in self._log:
+                self._apply(postings, added, content_id, tag_id)
+            self._log = None
+            self._postings = postings
+            self._built_at = time.monotonic()
+        return len(postings)
+
+    def warm(self, engine: Engine) -> threading.Thread:
+        """Rebuild in a background thread unless a rebuild is already running"""
+        with self._lock:
+            if self._building is not None and self._building.is_alive():
+                return self._building
+            self._building = threading.Thread(target=self._build, args=(engine,), name="tag-index", daemon=True)
+            self._building.start()
+            return self._building
+
+    def _build(self, engine: Engine) -> None:
+        try:
+            with Session(bind=engine) as db:
+                self.rebuild(db)
+        except Exception as e:
+            with self._lock:
+                self._log = None
+            print(f"✗ Tag index build failed: {e}")
+
+    @staticmethod
+    def _apply(postings: Dict[int, Postings], added: bool, content_id: int, tag_id: Optional[int]) -> None:
+        if tag_id is None:
+            # The content was deleted: drop it from every list
+            for values in postings.values():
+                pos = bisect_left(values, content_id)
+                if pos < len(values) and values[pos] == content_id:
+                    del values[pos]
+            return
+        values = postings.get(tag_id)
+        if added:
+            if values is None:
+                values = postings[tag_id] = array("q")
+            pos = bisect_left(values, content_id)
+            if pos == len(values) or values[pos] != content_id:
+                insort(values, content_id)
+        elif values is not None:
+            pos = bisect_left(values, content_id)
+            if pos < len(values) and values[pos] == content_id:
+                del values[pos]
+
+    def apply(
+        self, added: Iterable[Tuple[int, int]] = (), removed: Iterable[Tuple[int, Optional[int]]] = ()
+    ) -> None:
+        """Record committed (content_id, tag_id) assignment changes; a None tag id removes the content"""
+        changes = [(True, c, t) for c, t in added] + [(False, c, t) for c, t in removed]
+        with self._lock:
+            if self._log is not None:
+                self._log.extend(changes)
+            if self._postings is not None:
+                for change in changes:
+                    self._apply(self._postings, *change)
+
+    def remove_tag(self, tag_id: int) -> None:
+        with self._lock:
+            if self._postings is not None:
+                self._postings.pop(tag_id, None)
+
+    def remove_content(self, content_id: int) -> None:
+        self.apply(removed=[(content_id, None)])
+
+    def query(
+        self, all_tags: Sequence[int] = (), any_tags: Sequence[int] = (), none_tags: Sequence[int] = ()
+    ) -> Optional[Postings]:
+        """Content ids tagged with every `all_tags`, at least one `any_tags` and no `none_tags`.
+
+        Returns None when the index is cold. At least one of `all_tags`/`any_tags` is required.
+        """
+        if not self.is_warm:
+            return None
+        with self._lock:
+            postings = self._postings
+            if postings is None:
+                return None
+            empty = array("q")
+            lists = sorted((postings.get(tag_id, empty) for tag_id in set(all_tags)), key=len)
+            result = None
+            for values in lists:
+                result = values if result is None else intersect(result, values)
+                if not result:
+                    return array("q")
+            if any_tags:
+                either = union([postings.get(tag_id, empty) for tag_id in set(any_tags)])
+                result = either if result is None else intersect(result, either)
+            if none_tags and result:
+                result = difference(result, union([postings.get(tag_id, empty) for tag_id in set(none_tags)]))
+            return array("q", result) if result is not None else array("q")
+
+
+tag_index = TagPostingIndex(settings.tag_index_ttl)
@@ -1,14 +1,23 @@
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
+from inorta_backend.models.content_tag import ContentTag
 from inorta_backend.models.tag import Tag
 from inorta_backend.schemas.tag import TagCreate, TagUpdate
+from inorta_backend.services.bulk import bulk_write
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.tag_index import tag_index
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
 
 
 class TagService:
     @staticmethod
-    def get_tags(db: Session, skip: int = 0, limit: int = 100) -> List[Tag]:
-        return db.query(Tag).offset(skip).limit(limit).all()
+    def get_tags(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[Tag]:
+        return paginate(db.query(Tag), (Tag.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_tag_by_id(db: Session, tag_id: int) -> Optional[Tag]:
@@ -20,29 +29,45 @@ class TagService:
 
     @staticmethod
     def create_tag(db: Session, data: TagCreate) -> Tag:
-        db_obj = Tag(name=data.name, slug=data.slug)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db_obj = insert_row(
+            db,
+            Tag(name=data.name, slug=data.slug),
+            {"slug": "Tag slug already exists", "name": "Tag name already exists"},
+        )
+        response_cache.invalidate("tags")
         return db_obj
 
+    @staticmethod
+    def bulk_create_tags(db: Session, items: List[TagCreate], upsert: bool = False) -> List[Dict[str, Any]]:
+        """Insert many tags, or with `upsert` update the name of those whose slug exists"""
+        return bulk_write(
+            db,
+            Tag.__table__,
+            "slug",
+            [item.model_dump() for item in items],
+            upsert=upsert,
+            update_columns=("name",),
+            exists_detail="Tag slug already exists",
+            unique_details={"name": "Tag name already exists"},
+            cache_tags=("tags",),
+        )
+
     @staticmethod
     def update_tag(db: Session, tag_id: int, data: TagUpdate) -> Optional[Tag]:
-        db_obj = db.query(Tag).filter(Tag.id == tag_id).first()
+        db_obj = update_by_id(db, Tag, tag_id, data.model_dump(exclude_unset=True))
         if not db_obj:
             return None
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
         db.commit()
-        db.refresh(db_obj)
+        response_cache.invalidate("tags")
         return db_obj
 
     @staticmethod
     def delete_tag(db: Session, tag_id: int) -> bool:
-        db_obj = db.query(Tag).filter(Tag.id == tag_id).first()
-        if not db_obj:
+        db.execute(delete(ContentTag).where(ContentTag.tag_id == tag_id))
+        if not delete_by_id(db, Tag, tag_id):
+            db.rollback()
             return False
-        db.delete(db_obj)
         db.commit()
+        response_cache.invalidate("tags", "contents")
+        tag_index.remove_tag(tag_id)
         return True
\ No newline at end of file
@@ -0,0 +1,160 @@
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import Table, delete, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from inorta_backend.db.routing import primary_bind
+from inorta_backend.db.session import engine as sync_engine
+from inorta_backend.models.category import Category
+from inorta_backend.models.content import Content
+from inorta_backend.models.content_category import ContentCategory
+from inorta_backend.models.content_tag import ContentTag
+from inorta_backend.models.tag import Tag
+from inorta_backend.schemas.assignment import AssignmentUpdate
+from inorta_backend.services.bulk import BULK_CHUNK_SIZE
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.tag_index import tag_index
+
+
+def _current(db: Session, table: Table, column: str, content_ids: Sequence[int]) -> Dict[int, Set[int]]:
+    current: Dict[int, Set[int]] = defaultdict(set)
+    rows = db.execute(select(table.c.content_id, table.c[column]).where(table.c.content_id.in_(content_ids)))
+    for content_id, target_id in rows:
+        current[content_id].add(target_id)
+    return current
+
+
+def _assign(
+    db: Session,
+    table: Table,
+    column: str,
+    target: Any,
+    label: str,
+    content_ids: Sequence[int],
+    update: AssignmentUpdate,
+    on_commit: Optional[Callable[[list, list], None]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Apply `update` to each content's set of `column` ids with one DELETE and one INSERT.
+
+    Returns one result per content, or None if any content doesn't exist; raises
+    ValueError for unknown target ids. Everything is written in a single transaction.
+    """
+    content_ids = list(dict.fromkeys(content_ids))
+    found = {row[0] for row in db.query(Content.id).filter(Content.id.in_(content_ids))}
+    if len(found) != len(content_ids):
+        return None
+    requested = set(update.ids or ()) | set(update.add)
+    if requested:
+        known = {row[0] for row in db.query(target.id).filter(target.id.in_(requested))}
+        missing = sorted(requested - known)
+        if missing:
+            raise ValueError(f"{label} not found: {', '.join(map(str, missing))}")
+
+    current = _current(db, table, column, content_ids)
+    results, to_add, to_remove = [], [], []
+    for content_id in content_ids:
+        before = current.get(content_id, set())
+        if update.ids is not None:
+            after = set(update.ids)
+        else:
+            after = (before | set(update.add)) - set(update.remove)
+        added, removed = sorted(after - before), sorted(before - after)
+        to_add.extend({"content_id": content_id, column: target_id} for target_id in added)
+        to_remove.extend((content_id, target_id) for target_id in removed)
+        results.append({"content_id": content_id, "ids": sorted(after), "added": added, "removed": removed})
+
+    for start in range(0, len(to_remove), BULK_CHUNK_SIZE):
+        db.execute(
+            delete(table).where(
+                tuple_(table.c.content_id, table.c[column]).in_(to_remove[start:start + BULK_CHUNK_SIZE])
+            )
+        )
+    if to_add:
+        db.execute(insert(table), to_add)
+    db.commit()
+    response_cache.invalidate("contents")
+    if on_commit is not None:
+        on_commit([(row["content_id"], row[column]) for row in to_add], to_remove)
+    return results
+
+
+class TaxonomyService:
+    """Tag and category sets of contents, kept in content_tags / content_categories"""
+
+    @staticmethod
+    def get_content_tag_ids(db: Session, content_id: int) -> List[int]:
+        return sorted(_current(db, ContentTag.__table__, "tag_id", [content_id]).get(content_id, ()))
+
+    @staticmethod
+    def get_content_category_ids(db: Session, content_id: int) -> List[int]:
+        return sorted(_current(db, ContentCategory.__table__, "category_id", [content_id]).get(content_id, ()))
+
+    @staticmethod
+    def assign_tags(
+        db: Session, content_ids: Sequence[int], update: AssignmentUpdate
+    ) -> Optional[List[Dict[str, Any]]]:
+        return _assign(db, ContentTag.__table__, "tag_id", Tag, "Tag", content_ids, update, on_commit=tag_index.apply)
+
+    @staticmethod
+    def assign_categories(
+        db: Session, content_ids: Sequence[int], update: AssignmentUpdate
+    ) -> Optional[List[Dict[str, Any]]]:
+        return _assign(db, ContentCategory.__table__, "category_id", Category, "Category", content_ids, update)
+
+    @staticmethod
+    def query_contents_by_tags(
+        db: Session,
+        all_tags: Sequence[int] = (),
+        any_tags: Sequence[int] = (),
+        none_tags: Sequence[int] = (),
+        limit: int = 100,
+        after: Optional[Sequence[Any]] = None,
+    ) -> List[Content]:
+        """Contents having every `all_tags`, at least one `any_tags` and none of `none_tags`, by id.
+
+        Served from the in-memory posting lists; while they are cold the same query
+        runs in SQL and the lists are rebuilt in the background.
+        """
+        ids = tag_index.query(all_tags, any_tags, none_tags)
+        if ids is None:
+            bind = primary_bind(db)
+            tag_index.warm(sync_engine if bind.dialect.is_async else bind)
+            return TaxonomyService._query_contents_by_tags_sql(db, all_tags, any_tags, none_tags, limit, after)
+        try:
+            start = bisect_right(ids, int(after[0])) if after else 0
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        page = list(ids[start:start + limit])
+        rows = {content.id: content for content in db.query(Content).filter(Content.id.in_(page))}
+        return [rows[content_id] for content_id in page if content_id in rows]
+
+    @staticmethod
+    def _query_contents_by_tags_sql(
+        db: Session,
+        all_tags: Sequence[int],
+        any_tags: Sequence[int],
+        none_tags: Sequence[int],
+        limit: int,
+        after: Optional[Sequence[Any]],
+    ) -> List[Content]:
+        query = db.query(Content)
+        if all_tags:
+            tag_ids = set(all_tags)
+            query = query.filter(Content.id.in_(
+                select(ContentTag.content_id)
+                .where(ContentTag.tag_id.in_(tag_ids))
+                .group_by(ContentTag.content_id)
+                .having(func.count() == len(tag_ids))
+            ))
+        if any_tags:
+            query = query.filter(Content.id.in_(
+                select(ContentTag.content_id).where(ContentTag.tag_id.in_(set(any_tags)))
+            ))
+        if none_tags:
+            query = query.filter(Content.id.notin_(
+                select(ContentTag.content_id).where(ContentTag.tag_id.in_(set(none_tags)))
+            ))
+        return paginate(query, (Content.id,), limit=limit, after=after)
@@ -1,17 +1,25 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
+from inorta_backend.models.media import Media
 from inorta_backend.models.user import User
 from inorta_backend.schemas.user import UserCreate, UserUpdate
+from inorta_backend.services.bulk import bulk_write
+from inorta_backend.services.pagination import paginate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.writes import delete_by_id, insert_row, update_by_id
 
 
 class UserService:
     """Service for User CRUD operations"""
 
     @staticmethod
-    def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_users(
+        db: Session, skip: int = 0, limit: int = 100, after: Optional[Sequence[Any]] = None
+    ) -> List[User]:
         """Get all users with pagination"""
-        return db.query(User).offset(skip).limit(limit).all()
+        return paginate(db.query(User), (User.id,), skip=skip, limit=limit, after=after)
 
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
@@ -30,33 +38,42 @@ class UserService:
             email=user.email,
             name=user.name
         )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        insert_row(db, db_user, {"email": "Email already registered"})
+        response_cache.invalidate("users")
         return db_user
 
+    @staticmethod
+    def bulk_create_users(db: Session, users: List[UserCreate], upsert: bool = False) -> List[Dict[str, Any]]:
+        """Create many users, or with `upsert` update the name of those whose email exists"""
+        return bulk_write(
+            db,
+            User.__table__,
+            "email",
+            [user.model_dump() for user in users],
+            upsert=upsert,
+            update_columns=("name",),
+            exists_detail="Email already registered",
+            cache_tags=("users",),
+        )
+
     @staticmethod
     def update_user(db: Session, user_id: int, user: UserUpdate) -> Optional[User]:
         """Update an existing user"""
-        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user = update_by_id(db, User, user_id, user.model_dump(exclude_unset=True))
         if not db_user:
             return None
-        
-        update_data = user.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        
         db.commit()
-        db.refresh(db_user)
+        response_cache.invalidate("users")
         return db_user
 
     @staticmethod
     def delete_user(db: Session, user_id: int) -> bool:
         """Delete a user"""
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
+        # Uploaded media stays, without an uploader
+        db.execute(update(Media).where(Media.uploaded_by == user_id).values(uploaded_by=None))
+        if not delete_by_id(db, User, user_id):
+            db.rollback()
             return False
-        
-        db.delete(db_user)
         db.commit()
+        response_cache.invalidate("users", "media")
         return True
@@ -0,0 +1,220 @@
+import glob
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional, TextIO
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from inorta_backend.core.config import settings
+from inorta_backend.db.session import SessionLocal
+from inorta_backend.models.content import Content
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so run a single worker per spool
+    fcntl = None
+
+# Seconds between writes of the spool's buffer to the file: what a crashed process
+# loses at most when a spool is configured
+SPOOL_SYNC_INTERVAL = 1.0
+
+
+def _lock(file: TextIO, blocking: bool = True) -> bool:
+    """Take the exclusive advisory lock of an open file; False if another process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+class ViewCounter:
+    """Write-behind buffer for `Content.views_count`.
+
+    Views are summed in memory per content and written every `interval` seconds as
+    one batched `UPDATE contents SET views_count = views_count + n WHERE id = ...`,
+    so a page view never takes a row lock or a commit. At most `max_pending_ids`
+    contents are buffered at once; views of further ones wake the flusher early
+    and are dropped until it has run, so made-up ids cannot grow the buffer.
+
+    Without a spool a crash loses at most one interval of views. With `spool_path`
+    each process appends its views to its own `<spool_path>.<pid>` file, buffered
+    and written out every SPOOL_SYNC_INTERVAL (no fsync), and holds an advisory
+    lock on it. On start, a process replays and removes the spools no live process
+    holds, so workers sharing the path never take each other's views. A spool is
+    only dropped once its counts are committed; a crash between that commit and
+    the file removal can count one batch twice.
+    """
+
+    def __init__(self, interval: float, spool_path: Optional[str] = None, max_pending_ids: int = 10000):
+        self.interval = interval
+        self.spool_path = spool_path
+        self.max_pending_ids = max_pending_ids
+        self.dropped = 0
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spool: Optional[TextIO] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> Dict[int, int]:
+        with self._lock:
+            return dict(self._pending)
+
+    def record(self, content_id: int, count: int = 1) -> None:
+        with self._lock:
+            if content_id not in self._pending and len(self._pending) >= self.max_pending_ids:
+                self.dropped += count
+                self._wake.set()
+                return
+            self._pending[content_id] += count
+            if self._spool is not None:
+                # Buffered: the flusher thread writes it out, not the request
+                self._spool.write(f"{content_id} {count}\n")
+
+    def _own_spool_path(self) -> str:
+        return f"{self.spool_path}.{os.getpid()}"
+
+    def _flushing_path(self) -> str:
+        return self._own_spool_path() + ".flushing"
+
+    def _replay(self) -> None:
+        # Spools of processes that died, before or while flushing (a .flushing file),
+        # plus a spool written under the bare path by older versions
+        pattern = re.compile(re.escape(self.spool_path) + r"(\.\d+(\.flushing)?)?$")
+        with open(self.spool_path + ".lock", "a") as guard:
+            _lock(guard)
+            for path in sorted(glob.glob(glob.escape(self.spool_path) + "*")):
+                if not pattern.match(path):
+                    continue
+                with open(path) as spool:
+                    if not _lock(spool, blocking=False):
+                        continue
+                    for line in spool:
+                        parts = line.split()
+                        if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                            self._pending[int(parts[0])] += int(parts[1])
+                    os.remove(path)
+        self._rewrite_spool()
+
+    def _rewrite_spool(self) -> None:
+        # Replace our spool with exactly the counts still pending; written and locked
+        # under a temporary name that replaying processes ignore, then moved in place
+        temp = self._own_spool_path() + ".tmp"
+        spool = open(temp, "w")
+        _lock(spool)
+        for content_id, count in self._pending.items():
+            spool.write(f"{content_id} {count}\n")
+        spool.flush()
+        os.replace(temp, self._own_spool_path())
+        previous, self._spool = self._spool, spool
+        if previous is not None:
+            previous.close()
+
+    def sync_spool(self) -> None:
+        """Write the spool's buffered views to the file"""
+        with self._lock:
+            if self._spool is not None:
+                self._spool.flush()
+
+    def flush(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Write pending views to the database; returns the number of views written"""
+        with self._flush_lock:
+            flushing = None
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, Counter()
+                if self._spool is not None:
+                    # Keep the old spool open, and so locked, until its counts are committed
+                    flushing = self._spool
+                    flushing.flush()
+                    os.replace(self._own_spool_path(), self._flushing_path())
+                    self._spool = None
+                    self._rewrite_spool()
+            contents = Content.__table__
+            statement = (
+                update(contents)
+                .where(contents.c.id == bindparam("content_id"))
+                # Keep updated_at as is: a view is not an edit, and validators/caches key on it
+                .values(
+                    views_count=func.coalesce(contents.c.views_count, 0) + bindparam("views"),
+                    updated_at=contents.c.updated_at,
+                )
+            )
+            db = None
+            try:
+                db = session_factory()
+                db.execute(statement, [
+                    {"content_id": content_id, "views": views} for content_id, views in sorted(batch.items())
+                ])
+                db.commit()
+            except Exception:
+                if db is not None:
+                    db.rollback()
+                # Put the batch back so the next flush retries it
+                with self._lock:
+                    self._pending.update(batch)
+                    if flushing is not None:
+                        self._rewrite_spool()
+                raise
+            finally:
+                if db is not None:
+                    db.close()
+                if flushing is not None:
+                    os.remove(self._flushing_path())
+                    flushing.close()
+            return sum(batch.values())
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        due = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            woken = self._wake.wait(min(self.interval, SPOOL_SYNC_INTERVAL) if self.spool_path else self.interval)
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            self.sync_spool()
+            if not woken and time.monotonic() < due:
+                continue
+            due = time.monotonic() + self.interval
+            try:
+                self.flush(session_factory)
+            except Exception as e:
+                print(f"✗ View count flush failed, will retry: {e}")
+
+    def start(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        """Replay the spools of dead processes and start the periodic flusher thread"""
+        if self.spool_path:
+            with self._lock:
+                self._replay()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session_factory,), name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        """Stop the flusher and write out whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush(session_factory)
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                # Views recorded during the last flush stay in the file for the next start
+                if not self._pending:
+                    os.remove(self._own_spool_path())
+                self._spool = None
+
+
+view_counter = ViewCounter(settings.view_flush_interval, settings.view_spool_path, settings.view_max_pending_ids)
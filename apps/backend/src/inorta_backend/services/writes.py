@@ -0,0 +1,66 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def conflict_detail(db: Session, obj: Any, unique_details: Dict[str, str]) -> Optional[str]:
+    """Detail of the first unique column whose value in `obj` is already taken, if any"""
+    model = type(obj)
+    for column, detail in unique_details.items():
+        if db.query(model.id).filter(getattr(model, column) == getattr(obj, column)).first():
+            return detail
+    return None
+
+
+def insert_row(db: Session, obj: Any, unique_details: Dict[str, str]) -> Any:
+    """Commit `obj` with a single INSERT, letting the unique constraints catch duplicates.
+
+    Nothing is looked up first, so concurrent creates can't both pass a check and
+    insert twice. On a conflict the transaction is rolled back and ValueError is
+    raised with the detail of the taken column from `unique_details`. Generated
+    keys and defaults come back from the INSERT itself (RETURNING where supported),
+    so the row is not refreshed.
+    """
+    db.add(obj)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        detail = conflict_detail(db, obj, unique_details)
+        if detail is None:
+            raise
+        raise ValueError(detail)
+    return obj
+
+
+def update_by_id(db: Session, model: Any, row_id: int, values: Dict[str, Any]) -> Optional[Any]:
+    """Apply `values` to one row with a single `UPDATE ... WHERE id` and return the row.
+
+    Dialects with `UPDATE ... RETURNING` (SQLite, PostgreSQL) get the new row back in
+    the same round trip; elsewhere a zero rowcount means the row is missing and the
+    updated row is read back by primary key. `onupdate` defaults such as `updated_at`
+    are applied by the statement. Returns None if no row has `row_id`; the caller
+    commits.
+    """
+    if not values:
+        return db.get(model, row_id)
+    statement = update(model).where(model.id == row_id).values(**values)
+    options = {"synchronize_session": False}
+    if db.get_bind().dialect.update_returning:
+        result = db.execute(statement.returning(model), execution_options={**options, "populate_existing": True})
+        return result.scalar_one_or_none()
+    if db.execute(statement, execution_options=options).rowcount == 0:
+        return None
+    return db.get(model, row_id, populate_existing=True)
+
+
+def delete_by_id(db: Session, model: Any, row_id: int) -> bool:
+    """Delete one row with a single `DELETE ... WHERE id`; False if there was none.
+
+    Unlike `Session.delete` the row is not loaded first, so dependents are left to the
+    database's foreign keys; the caller commits.
+    """
+    result = db.execute(delete(model).where(model.id == row_id), execution_options={"synchronize_session": False})
+    return result.rowcount > 0
@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.response_cache import CacheBackend, CachedResponse, MemoryCacheBackend, response_cache
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -28,7 +29,9 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def setup_database():
     """Create and drop tables for each test"""
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -149,3 +152,104 @@ def test_delete_user():
     # Verify user is deleted
     get_response = client.get(f"/api/users/{user_id}")
     assert get_response.status_code == 404
+
+
+def test_conditional_get_single_user():
+    """Test ETag/Last-Modified validators on a single row"""
+    user = client.post("/api/users", json={"email": "etag@example.com", "name": "Etag"}).json()
+    url = f"/api/users/{user['id']}"
+    response = client.get(url)
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+
+    client.put(url, json={"name": "Changed"})
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert client.get("/api/users/999", headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_conditional_get_list():
+    """Test body-hash ETags on list responses"""
+    client.post("/api/users", json={"email": "one@example.com"})
+    response = client.get("/api/users")
+    etag = response.headers["etag"]
+    assert client.get("/api/users").headers["etag"] == etag
+
+    response = client.get("/api/users", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.post("/api/users", json={"email": "two@example.com"})
+    response = client.get("/api/users", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_response_cache_hit_and_invalidation():
+    """Test repeated GETs are served from the cache until a write"""
+    client.post("/api/users", json={"email": "cached@example.com", "name": "Cached"})
+    response = client.get("/api/users?limit=10&offset=0")
+    assert response.headers["x-cache"] == "MISS"
+    etag = response.headers["etag"]
+
+    # Query parameter order doesn't matter
+    response = client.get("/api/users?offset=0&limit=10")
+    assert response.headers["x-cache"] == "HIT"
+    assert len(response.json()) == 1
+    response = client.get("/api/users?limit=10&offset=0", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["x-cache"] == "HIT"
+    assert client.get("/api/users?limit=10&offset=0", headers={"Cache-Control": "no-cache"}).headers["x-cache"] == "MISS"
+
+    client.post("/api/users", json={"email": "second@example.com"})
+    response = client.get("/api/users?limit=10&offset=0")
+    assert response.headers["x-cache"] == "MISS"
+    assert len(response.json()) == 2
+
+    # Errors are not cached
+    assert client.get("/api/users/999").headers["x-cache"] == "MISS"
+    assert client.get("/api/users/999").headers["x-cache"] == "MISS"
+
+    stats = client.get("/api/internal/response-cache").json()
+    assert stats["hits"] == 2
+    assert stats["invalidations"] >= 1
+    assert "x-cache" not in client.get("/api/internal/response-cache").headers
+
+
+def test_memory_cache_backend_lru_and_ttl():
+    """Test LRU eviction, expiry and the generation guard of the memory backend"""
+    backend = MemoryCacheBackend(max_entries=2)
+    value = CachedResponse(200, [], b"{}")
+    assert backend.set("a", value, ["users"], 60, backend.generation(["users"]))
+    assert backend.set("b", value, ["roles"], 60, backend.generation(["roles"]))
+    assert backend.get("a") is value
+    assert backend.set("c", value, ["users"], 60, backend.generation(["users"]))
+    assert backend.get("b") is None
+    assert backend.evictions == 1
+
+
+    generation = backend.generation(["users"])
+    assert backend.invalidate(["users"]) == 2
+    assert len(backend) == 0
+    assert not backend.set("a", value, ["users"], 60, generation)
+
+    assert backend.set("d", value, ["tags"], -1, backend.generation(["tags"]))
+    assert backend.get("d") is None
+
+
+def test_incomplete_cache_backend_is_rejected():
+    """Test that a backend missing part of the interface fails when constructed"""
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
@@ -0,0 +1,105 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from inorta_backend.bench import baseline
+from inorta_backend.bench.dataset import DatasetSize, seed, seeded_dataset
+from inorta_backend.bench.load import ENDPOINTS, in_process, percentile, run_load
+from inorta_backend.bench.services import CASES, run_cases
+from inorta_backend.models.category_closure import CategoryClosure
+from inorta_backend.models.content import Content, ContentStatus
+from inorta_backend.models.content_tag import ContentTag
+from inorta_backend.services.response_cache import response_cache
+
+BENCH_DATABASE_URL = "sqlite:///./test_bench.db"
+SIZE = DatasetSize(users=20, contents=200, tags=30, categories=12, menus=3, items_per_menu=8, media=40, settings=5)
+
+
+def test_seed_is_deterministic():
+    engine = create_engine(BENCH_DATABASE_URL)
+    try:
+        counts = seed(engine, SIZE, seed=7)
+        assert counts["contents"] == 200
+        assert counts["content_tags"] == 200 * SIZE.tags_per_content
+        assert counts["menu_items"] == 3 * 8
+        with engine.connect() as conn:
+            closure = conn.scalar(select(func.count()).select_from(CategoryClosure))
+            first = conn.execute(select(ContentTag.content_id, ContentTag.tag_id).order_by(ContentTag.id)).all()
+        assert closure == counts["category_closure"] >= 12
+        assert seeded_dataset(engine) == {"size": SIZE, "seed": 7}
+        # Rows written through the driver read back like ORM-written ones
+        with Session(engine) as db:
+            published = db.scalars(select(Content).where(Content.status == ContentStatus.published).limit(1)).one()
+            assert isinstance(published.published_at, datetime)
+            assert db.scalar(select(func.count()).where(Content.published_at <= published.published_at)) >= 1
+
+        seed(engine, SIZE, seed=7)
+        with engine.connect() as conn:
+            assert conn.execute(select(ContentTag.content_id, ContentTag.tag_id).order_by(ContentTag.id)).all() == first
+    finally:
+        engine.dispose()
+        os.remove("./test_bench.db")
+
+
+def test_load_run_covers_every_endpoint(tmp_path):
+    engine = create_engine(BENCH_DATABASE_URL)
+    seed(engine, SIZE)
+    engine.dispose()
+    response_cache.clear()
+    try:
+        with in_process(BENCH_DATABASE_URL) as transport:
+            result = run_load(transport, SIZE, concurrency=4, requests=300)
+    finally:
+        response_cache.clear()
+        os.remove("./test_bench.db")
+
+    report = result.report()
+    assert report["total"]["requests"] == 300
+    assert report["total"]["errors"] == 0, result.statuses
+    assert set(report["endpoints"]) == {endpoint.name for endpoint in ENDPOINTS}
+    for stats in report["endpoints"].values():
+        assert 0 < stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+    path = str(tmp_path / "load.json")
+    saved = baseline.save(path, "load", {"concurrency": 4}, report)
+    assert baseline.load(path) == saved
+    assert saved["environment"]["python"]
+
+
+def test_service_benchmarks_report_queries_and_plans():
+    engine = create_engine(BENCH_DATABASE_URL)
+    try:
+        seed(engine, SIZE)
+        cases = [case for case in CASES if case.name in (
+            "ContentService.get_content_by_slug", "MenuService.get_menu_tree_json[cold]", "CategoryService.get_categories",
+        )]
+        results = run_cases(engine, SIZE, cases, iterations=5, warmup=1)
+    finally:
+        engine.dispose()
+        os.remove("./test_bench.db")
+
+    by_slug = results["ContentService.get_content_by_slug"]
+    assert by_slug["queries_per_call"] == 1
+    assert 0 < by_slug["p50_ms"] <= by_slug["max_ms"]
+    [plan] = by_slug["plans"]
+    assert "FROM contents WHERE contents.slug = ?" in plan["statement"]
+    assert any("USING INDEX" in step for step in plan["plan"])
+    assert by_slug["full_scans"] == []
+
+    # The tree cache is emptied before every call, so each one loads the menu and its items
+    assert results["MenuService.get_menu_tree_json[cold]"]["queries_per_call"] == 2
+    assert results["CategoryService.get_categories"]["full_scans"] == ["SCAN categories"]
+
+
+def test_percentile_and_compare():
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+    assert percentile([], 95) == 0.0
+
+    before = {"endpoints": {"GET /a": {"rps": 100.0, "p95_ms": 10.0}, "GET /b": {"rps": 50.0, "p95_ms": 5.0}}}
+    after = {"endpoints": {"GET /a": {"rps": 95.0, "p95_ms": 13.0}, "GET /b": {"rps": 80.0, "p95_ms": 4.0}}}
+    rows, regressions = baseline.compare(before, after, threshold=0.10)
+    assert len(rows) == 4
+    assert regressions == ["GET /a p95_ms: 10.0 -> 13.0 (+30.0%)"]
@@ -5,6 +5,11 @@ from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.models.content_category import ContentCategory
+from inorta_backend.models.media import Media
+from inorta_backend.services import bulk
+from inorta_backend.services.bulk import bulk_insert
+from inorta_backend.services.response_cache import response_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_cat_tag_media.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -26,48 +31,56 @@ client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 def test_category_crud():
     # Create
-    resp = client.post('/categories', json={'name': 'News', 'slug': 'news'})
+    resp = client.post('/api/categories', json={'name': 'News', 'slug': 'news'})
     assert resp.status_code == 201
     cat = resp.json()
     assert cat['name'] == 'News'
 
     # List
-    resp = client.get('/categories')
+    resp = client.get('/api/categories')
     assert resp.status_code == 200
     assert len(resp.json()) >= 1
 
     # Update
-    resp = client.put(f"/categories/{cat['id']}", json={'description': 'News items'})
+    resp = client.put(f"/api/categories/{cat['id']}", json={'description': 'News items'})
     assert resp.status_code == 200
     assert resp.json()['description'] == 'News items'
 
     # Delete
-    resp = client.delete(f"/categories/{cat['id']}")
+    resp = client.delete(f"/api/categories/{cat['id']}")
     assert resp.status_code == 204
 
 
 def test_tag_crud():
-    resp = client.post('/tags', json={'name': 'python', 'slug': 'python'})
+    resp = client.post('/api/tags', json={'name': 'python', 'slug': 'python'})
     assert resp.status_code == 201
     tag = resp.json()
     assert tag['slug'] == 'python'
 
-    resp = client.get('/tags')
+    resp = client.post('/api/tags', json={'name': 'python', 'slug': 'python-2'})
+    assert resp.status_code == 400
+    assert resp.json()['detail'] == 'Tag name already exists'
+    resp = client.post('/api/tags', json={'name': 'Python 2', 'slug': 'python'})
+    assert resp.json()['detail'] == 'Tag slug already exists'
+
+    resp = client.get('/api/tags')
     assert resp.status_code == 200
     assert len(resp.json()) >= 1
 
-    resp = client.put(f"/tags/{tag['id']}", json={'name': 'py'})
+    resp = client.put(f"/api/tags/{tag['id']}", json={'name': 'py'})
     assert resp.status_code == 200
     assert resp.json()['name'] == 'py'
 
-    resp = client.delete(f"/tags/{tag['id']}")
+    resp = client.delete(f"/api/tags/{tag['id']}")
     assert resp.status_code == 204
 
 
@@ -76,18 +89,208 @@ def test_media_crud():
     create_user = client.post('/api/users', json={'email': 'uploader@example.com', 'name': 'Uploader'})
     user_id = create_user.json()['id']
 
-    resp = client.post('/media', json={'filename': 'file.jpg', 'file_path': '/uploads/file.jpg', 'uploaded_by': user_id})
+    resp = client.post('/api/media', json={'filename': 'file.jpg', 'file_path': '/uploads/file.jpg', 'uploaded_by': user_id})
     assert resp.status_code == 201
     media = resp.json()
     assert media['filename'] == 'file.jpg'
 
-    resp = client.get('/media')
+    resp = client.get('/api/media')
     assert resp.status_code == 200
     assert len(resp.json()) >= 1
 
-    resp = client.put(f"/media/{media['id']}", json={'alt_text': 'An image'})
+    resp = client.put(f"/api/media/{media['id']}", json={'alt_text': 'An image'})
     assert resp.status_code == 200
     assert resp.json()['alt_text'] == 'An image'
 
-    resp = client.delete(f"/media/{media['id']}")
-    assert resp.status_code == 204
\ No newline at end of file
+    resp = client.delete(f"/api/media/{media['id']}")
+    assert resp.status_code == 204
+
+
+def make_category(name, parent=None):
+    payload = {'name': name, 'slug': name.lower()}
+    if parent:
+        payload['parent_id'] = parent['id']
+    resp = client.post('/api/categories', json=payload)
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def names(resp):
+    assert resp.status_code == 200
+    return [c['name'] for c in resp.json()]
+
+
+def test_category_hierarchy_queries():
+    root = make_category('Root')
+    tech = make_category('Tech', root)
+    python = make_category('Python', tech)
+    make_category('Rust', tech)
+    make_category('Life', root)
+
+    assert names(client.get(f"/api/categories/{tech['id']}/subtree")) == ['Tech', 'Python', 'Rust']
+    assert names(client.get(f"/api/categories/{root['id']}/subtree", params={'max_depth': 1})) == ['Root', 'Tech', 'Life']
+    assert names(client.get(f"/api/categories/{python['id']}/ancestors")) == ['Root', 'Tech']
+    assert names(client.get(f"/api/categories/{root['id']}/ancestors")) == []
+    assert client.get('/api/categories/999/subtree').status_code == 404
+    assert client.get('/api/categories/999/ancestors').status_code == 404
+
+
+def test_category_move_keeps_index_in_sync():
+    root = make_category('Root')
+    tech = make_category('Tech', root)
+    python = make_category('Python', tech)
+    other = make_category('Other')
+
+    resp = client.put(f"/api/categories/{tech['id']}", json={'parent_id': other['id']})
+    assert resp.status_code == 200
+    assert names(client.get(f"/api/categories/{python['id']}/ancestors")) == ['Other', 'Tech']
+    assert names(client.get(f"/api/categories/{root['id']}/subtree")) == ['Root']
+
+    # Moving to the root detaches the subtree
+    client.put(f"/api/categories/{tech['id']}", json={'parent_id': None})
+    assert names(client.get(f"/api/categories/{python['id']}/ancestors")) == ['Tech']
+
+    # Cycles and unknown parents are rejected
+    assert client.put(f"/api/categories/{tech['id']}", json={'parent_id': python['id']}).status_code == 400
+    assert client.put(f"/api/categories/{tech['id']}", json={'parent_id': 999}).status_code == 400
+    assert client.post('/api/categories', json={'name': 'X', 'slug': 'x', 'parent_id': 999}).status_code == 400
+
+    # Parents with children can't be deleted; leaves can
+    assert client.delete(f"/api/categories/{tech['id']}").status_code == 400
+    assert client.delete(f"/api/categories/{python['id']}").status_code == 204
+    assert names(client.get(f"/api/categories/{tech['id']}/subtree")) == ['Tech']
+
+
+def test_category_subtree_contents():
+    author = client.post('/api/users', json={'email': 'a@example.com'}).json()
+    root = make_category('Root')
+    child = make_category('Child', root)
+    sibling = make_category('Sibling')
+    ids = {}
+    for slug in ['in-root', 'in-child', 'in-both', 'elsewhere']:
+        ids[slug] = client.post('/api/contents', json={'title': slug, 'slug': slug, 'author_id': author['id']}).json()['id']
+    db = TestingSessionLocal()
+    db.add_all([
+        ContentCategory(content_id=ids['in-root'], category_id=root['id']),
+        ContentCategory(content_id=ids['in-child'], category_id=child['id']),
+        ContentCategory(content_id=ids['in-both'], category_id=root['id']),
+        ContentCategory(content_id=ids['in-both'], category_id=child['id']),
+        ContentCategory(content_id=ids['elsewhere'], category_id=sibling['id']),
+    ])
+    db.commit()
+    db.close()
+
+    resp = client.get(f"/api/categories/{root['id']}/contents")
+    assert resp.status_code == 200
+    assert [c['slug'] for c in resp.json()] == ['in-root', 'in-child', 'in-both']
+    resp = client.get(f"/api/categories/{child['id']}/contents")
+    assert [c['slug'] for c in resp.json()] == ['in-child', 'in-both']
+
+
+def statuses(resp):
+    assert resp.status_code == 200
+    return [item['status'] for item in resp.json()['items']]
+
+
+def test_tag_bulk_insert_and_upsert():
+    client.post('/api/tags', json={'name': 'Existing', 'slug': 'existing'})
+    tags = [
+        {'name': 'Python', 'slug': 'python'},
+        {'name': 'Existing again', 'slug': 'existing'},
+        {'name': 'Rust', 'slug': 'rust'},
+        {'name': 'Rust 2', 'slug': 'rust'},
+        {'name': 'Python', 'slug': 'python-dup-name'},
+    ]
+    resp = client.post('/api/tags/bulk', json=tags)
+    assert statuses(resp) == ['created', 'error', 'created', 'error', 'error']
+    body = resp.json()
+    assert (body['created'], body['updated'], body['failed']) == (2, 0, 3)
+    assert body['items'][1]['detail'] == 'Tag slug already exists'
+    assert body['items'][3]['detail'] == 'Duplicate slug in request'
+    assert client.get(f"/api/tags/{body['items'][0]['id']}").json()['slug'] == 'python'
+
+    resp = client.post('/api/tags/bulk', params={'upsert': True}, json=[
+        {'name': 'Existing renamed', 'slug': 'existing'},
+        {'name': 'Go', 'slug': 'go'},
+        {'name': 'Rust', 'slug': 'rust-lang'},
+    ])
+    assert statuses(resp) == ['updated', 'created', 'error']
+    assert resp.json()['items'][2]['detail'] == 'Tag name already exists'
+    slugs = {t['slug']: t['name'] for t in client.get('/api/tags').json()}
+    assert slugs == {'existing': 'Existing renamed', 'python': 'Python', 'rust': 'Rust', 'go': 'Go'}
+
+
+def test_bulk_upsert_on_unsupported_dialect(monkeypatch):
+    monkeypatch.setattr(bulk, 'UPSERT_DIALECTS', ('postgresql',))
+    resp = client.post('/api/tags/bulk', params={'upsert': True}, json=[{'name': 'Go', 'slug': 'go'}])
+    assert resp.status_code == 400
+    assert resp.json()['detail'] == 'Bulk upsert is not supported on sqlite'
+    assert client.get('/api/tags').json() == []
+    # Plain inserts need no upsert
+    resp = client.post('/api/tags/bulk', json=[{'name': 'Go', 'slug': 'go'}])
+    assert statuses(resp) == ['created']
+
+
+def test_category_bulk_maintains_hierarchy():
+    root = make_category('Root')
+    other = make_category('Other')
+    resp = client.post('/api/categories/bulk', json=[
+        {'name': 'Tech', 'slug': 'tech', 'parent_id': root['id']},
+        {'name': 'Orphan', 'slug': 'orphan', 'parent_id': 999},
+    ])
+    assert statuses(resp) == ['created', 'error']
+    tech_id = resp.json()['items'][0]['id']
+    python = make_category('Python', {'id': tech_id})
+    assert names(client.get(f"/api/categories/{python['id']}/ancestors")) == ['Root', 'Tech']
+
+    resp = client.post('/api/categories/bulk', params={'upsert': True}, json=[
+        {'name': 'Tech', 'slug': 'tech', 'parent_id': other['id']},
+        {'name': 'Root', 'slug': 'root', 'parent_id': python['id']},
+    ])
+    assert statuses(resp) == ['updated', 'error']
+    assert names(client.get(f"/api/categories/{python['id']}/ancestors")) == ['Other', 'Tech']
+    assert names(client.get(f"/api/categories/{root['id']}/subtree")) == ['Root']
+
+
+def test_user_and_media_bulk():
+    resp = client.post('/api/users/bulk', json=[
+        {'email': f'user{i}@example.com', 'name': f'User {i}'} for i in range(3)
+    ])
+    assert statuses(resp) == ['created'] * 3
+    resp = client.post('/api/users/bulk', params={'upsert': True}, json=[
+        {'email': 'user0@example.com', 'name': 'Renamed'},
+    ])
+    assert statuses(resp) == ['updated']
+    assert client.get(f"/api/users/{resp.json()['items'][0]['id']}").json()['name'] == 'Renamed'
+    assert client.post('/api/users/bulk', json=[{'email': 'not-an-email'}]).status_code == 422
+
+    resp = client.post('/api/media/bulk', json=[
+        {'filename': f'{i}.png', 'file_path': f'/uploads/{i}.png'} for i in range(3)
+    ])
+    assert statuses(resp) == ['created'] * 3
+    ids = [item['id'] for item in resp.json()['items']]
+    assert [client.get(f'/api/media/{i}').json()['filename'] for i in ids] == ['0.png', '1.png', '2.png']
+
+    user_id = client.get('/api/users').json()[0]['id']
+    resp = client.post('/api/media/bulk', json=[
+        {'filename': 'a.png', 'file_path': '/uploads/a.png', 'uploaded_by': user_id},
+        {'filename': 'b.png', 'file_path': '/uploads/b.png', 'uploaded_by': 999},
+    ])
+    assert statuses(resp) == ['created', 'error']
+    assert resp.json()['items'][1]['detail'] == 'Uploader not found'
+
+
+def test_bulk_insert_isolates_failing_rows():
+    rows = [
+        {'filename': f'{i}.png', 'file_path': f'/uploads/{i}.png', 'content_hash': 'ab' * 32 if i else None}
+        for i in range(3)
+    ]
+    db = TestingSessionLocal()
+    try:
+        results = bulk_insert(db, Media.__table__, rows, errors={0: 'Rejected'}, cache_tags=('media',))
+        assert [(r['status'], r['detail']) for r in results] == [
+            ('error', 'Rejected'), ('created', None), ('error', 'Conflicts with an existing row'),
+        ]
+        assert db.query(Media).count() == 1
+    finally:
+        db.close()
@@ -1,10 +1,21 @@
+import fcntl
+import os
 import pytest
+import random
+from array import array
+from datetime import datetime
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.models.content import Content
+from inorta_backend.services.content_render import RENDER_VERSION, backfill, make_excerpt, render_body
+from inorta_backend.services.search_service import MemorySearchEngine, SearchEngine
+from inorta_backend.services.tag_index import difference, intersect, tag_index, union
+from inorta_backend.services.view_counter import ViewCounter, view_counter
+from inorta_backend.services.response_cache import response_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_content.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -26,7 +37,10 @@ client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    tag_index.invalidate()
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -60,8 +74,11 @@ def test_duplicate_slug_fails():
         'author_id': author['id']
     }
     client.post('/api/contents', json=payload)
-    resp = client.post('/api/contents', json=payload)
+    # Caught by the unique index on the INSERT itself, not a lookup before it
+    resp = client.post('/api/contents', json={**payload, 'title': 'Post B'})
     assert resp.status_code == 400
+    assert resp.json()['detail'] == 'Content slug already exists'
+    assert [c['title'] for c in client.get('/api/contents').json()] == ['Post A']
 
 
 def test_get_contents():
@@ -90,3 +107,433 @@ def test_delete_content():
     assert resp.status_code == 204
     get_resp = client.get(f'/api/contents/{content_id}')
     assert get_resp.status_code == 404
+
+
+def test_publishing_sets_published_at():
+    author = create_user()
+    draft = client.post('/api/contents', json={'title': 'D', 'slug': 'd', 'author_id': author['id']}).json()
+    assert draft['published_at'] is None
+    resp = client.put(f"/api/contents/{draft['id']}", json={'status': 'published'})
+    assert resp.json()['published_at'] is not None
+    live = client.post('/api/contents', json={'title': 'L', 'slug': 'l', 'status': 'published', 'author_id': author['id']}).json()
+    assert live['published_at'] is not None
+
+
+def test_content_feed_filters_and_order():
+    author = create_user()
+    other = client.post('/api/users', json={'email': 'other@example.com'}).json()
+    rows = [
+        ('a1', 'article', 'published', author, '2026-01-01T10:00:00'),
+        ('a2', 'article', 'published', other, '2026-01-03T10:00:00'),
+        ('a3', 'article', 'published', author, '2026-01-02T10:00:00'),
+        ('p1', 'page', 'published', author, '2026-01-04T10:00:00'),
+        ('d1', 'article', 'draft', author, None),
+    ]
+    for slug, ctype, status, user, _ in rows:
+        client.post('/api/contents', json={'title': slug, 'slug': slug, 'content_type': ctype, 'status': status, 'author_id': user['id']})
+    # Pin published_at so the expected order is deterministic
+    db = TestingSessionLocal()
+    for slug, _, _, _, published_at in rows:
+        db.query(Content).filter(Content.slug == slug).update(
+            {'published_at': datetime.fromisoformat(published_at) if published_at else None}
+        )
+    db.commit()
+    db.close()
+
+    def slugs(**params):
+        resp = client.get('/api/contents', params=params)
+        assert resp.status_code == 200
+        return [c['slug'] for c in resp.json()]
+
+    assert slugs(status='published', type='article', order='-published_at') == ['a2', 'a3', 'a1']
+    assert slugs(status='published', order='published_at') == ['a1', 'a3', 'a2', 'p1']
+    assert slugs(author_id=author['id'], order='-published_at') == ['p1', 'a3', 'a1']
+    assert slugs(status='draft') == ['d1']
+    assert client.get('/api/contents', params={'order': 'title'}).status_code == 422
+
+    # Keyset pages over a datetime sort key
+    resp = client.get('/api/contents', params={'status': 'published', 'order': '-published_at', 'limit': 2})
+    assert [c['slug'] for c in resp.json()] == ['p1', 'a2']
+    resp = client.get('/api/contents', params={
+        'status': 'published', 'order': '-published_at', 'limit': 2, 'after': resp.headers['x-next-cursor'],
+    })
+    assert [c['slug'] for c in resp.json()] == ['a3', 'a1']
+
+
+def views_of(content_id):
+    db = TestingSessionLocal()
+    try:
+        return db.query(Content.views_count).filter(Content.id == content_id).scalar()
+    finally:
+        db.close()
+
+
+def test_view_tracking_is_buffered_then_batched():
+    author = create_user()
+    a = client.post('/api/contents', json={'title': 'A', 'slug': 'a', 'author_id': author['id']}).json()
+    b = client.post('/api/contents', json={'title': 'B', 'slug': 'b', 'author_id': author['id']}).json()
+    view_counter.flush(TestingSessionLocal)
+
+    for _ in range(3):
+        assert client.post(f"/api/contents/{a['id']}/views").status_code == 202
+    client.post(f"/api/contents/{b['id']}/views")
+    assert views_of(a['id']) == 0
+
+    assert view_counter.flush(TestingSessionLocal) == 4
+    assert views_of(a['id']) == 3
+    assert views_of(b['id']) == 1
+    assert view_counter.flush(TestingSessionLocal) == 0
+
+
+def test_content_validators_follow_views():
+    author = create_user()
+    a = client.post('/api/contents', json={'title': 'A', 'slug': 'a', 'author_id': author['id']}).json()
+    view_counter.flush(TestingSessionLocal)
+    url = f"/api/contents/{a['id']}"
+    first = client.get(url)
+    etag = first.headers['etag']
+    # Flushed views keep updated_at, so a date alone can't validate a content
+    assert 'last-modified' not in first.headers
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post(f"{url}/views")
+    view_counter.flush(TestingSessionLocal)
+    resp = client.get(url, headers={'If-None-Match': etag, 'Cache-Control': 'no-cache'})
+    assert resp.status_code == 200
+    assert resp.json()['views_count'] == 1
+    assert resp.headers['etag'] != etag
+
+
+def test_view_spool_survives_restart(tmp_path):
+    author = create_user()
+    a = client.post('/api/contents', json={'title': 'A', 'slug': 'a', 'author_id': author['id']}).json()
+    spool = str(tmp_path / 'views.spool')
+
+    crashed = ViewCounter(interval=3600, spool_path=spool)
+    crashed.start(TestingSessionLocal)
+    crashed.record(a['id'], 5)
+    crashed.record(a['id'])
+    # Simulate a crash: the thread dies without a final flush, the OS closes the spool
+    crashed._stop.set()
+    crashed._wake.set()
+    crashed._thread.join()
+    crashed._spool.close()
+
+    restarted = ViewCounter(interval=3600, spool_path=spool)
+    restarted.start(TestingSessionLocal)
+    assert restarted.pending == {a['id']: 6}
+    restarted.stop(TestingSessionLocal)
+    assert views_of(a['id']) == 6
+
+    again = ViewCounter(interval=3600, spool_path=spool)
+    again.start(TestingSessionLocal)
+    assert again.pending == {}
+    again.stop(TestingSessionLocal)
+    assert os.listdir(tmp_path) == ['views.spool.lock']
+
+
+def test_view_spools_of_live_workers_are_left_alone(tmp_path):
+    spool = str(tmp_path / 'views.spool')
+    with open(f'{spool}.4242', 'w') as live, open(f'{spool}.4343.flushing', 'w') as dead:
+        live.write('7 2\n')
+        dead.write('8 3\n')
+    with open(f'{spool}.4242') as live:
+        fcntl.flock(live.fileno(), fcntl.LOCK_EX)
+        counter = ViewCounter(interval=3600, spool_path=spool)
+        counter.start(TestingSessionLocal)
+        try:
+            # The locked spool belongs to a running worker
+            assert counter.pending == {8: 3}
+            assert os.path.exists(f'{spool}.4242')
+        finally:
+            counter._stop.set()
+            counter._wake.set()
+            counter._thread.join()
+            counter._spool.close()
+
+
+def test_view_buffer_is_bounded():
+    counter = ViewCounter(interval=3600, max_pending_ids=2)
+    for content_id in (1, 2, 1, 3, 4):
+        counter.record(content_id)
+    assert counter.pending == {1: 2, 2: 1}
+    assert counter.dropped == 2
+    assert counter._wake.is_set()
+
+
+def test_failed_flush_keeps_views():
+    def broken_session():
+        raise RuntimeError("db down")
+
+    counter = ViewCounter(interval=3600)
+    counter.record(1, 2)
+    with pytest.raises(RuntimeError):
+        counter.flush(broken_session)
+    assert counter.pending == {1: 2}
+
+
+def create_searchable(author_id, slug, title, content, excerpt=None):
+    resp = client.post('/api/contents', json={
+        'title': title, 'slug': slug, 'content': content, 'excerpt': excerpt, 'author_id': author_id,
+    })
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def search(q, **params):
+    resp = client.get('/api/contents/search', params={'q': q, **params})
+    assert resp.status_code == 200
+    return [item['slug'] for item in resp.json()]
+
+
+def test_body_is_rendered_on_write():
+    author = create_user()
+    body = (
+        '<h2 onclick="x()">Intro</h2><p>Hello <b>brave</b> new <a href="javascript:alert(1)">world</a>'
+        '<script>steal()</script></p><p><a href="https://example.com" target="_blank">Read more</a>'
+        '<img src="/media/a.png" onerror="x()" alt="A"><iframe src="https://evil"></iframe>'
+    )
+    created = client.post('/api/contents', json={
+        'title': 'Rendered', 'slug': 'rendered', 'content': body, 'excerpt': '', 'author_id': author['id'],
+    }).json()
+    assert created['content_html'] == (
+        '<h2>Intro</h2><p>Hello <b>brave</b> new <a>world</a></p>'
+        '<p><a href="https://example.com">Read more</a><img src="/media/a.png" alt="A"></p>'
+    )
+    assert created['content'] == body
+    assert created['excerpt'] == 'Intro Hello brave new world Read more'
+    assert created['excerpt_auto'] is True
+    assert (created['word_count'], created['reading_time']) == (7, 1)
+
+    # The generated excerpt follows the body, also when an editor sends it back unchanged
+    updated = client.put(f"/api/contents/{created['id']}", json={
+        'content': 'Plain 1 < 2\n\nSecond paragraph', 'excerpt': created['excerpt'],
+    }).json()
+    assert updated['content_html'] == '<p>Plain 1 &lt; 2</p><p>Second paragraph</p>'
+    assert updated['excerpt'] == 'Plain 1 < 2 Second paragraph'
+    assert updated['excerpt_auto'] is True
+
+    # A custom excerpt sticks across body changes until it is cleared
+    client.put(f"/api/contents/{created['id']}", json={'excerpt': 'Hand written'})
+    updated = client.put(f"/api/contents/{created['id']}", json={'content': 'Other words'}).json()
+    assert (updated['excerpt'], updated['excerpt_auto'], updated['word_count']) == ('Hand written', False, 2)
+    updated = client.put(f"/api/contents/{created['id']}", json={'excerpt': None}).json()
+    assert (updated['excerpt'], updated['excerpt_auto']) == ('Other words', True)
+    assert client.get(f"/api/contents/{created['id']}").json()['content_html'] == '<p>Other words</p>'
+
+
+def test_render_body():
+    rendered = render_body('<ul><li>one<li>two</ul><p>unclosed <em>tags')
+    assert rendered.html == '<ul><li>one</li><li>two</li></ul><p>unclosed <em>tags</em></p>'
+    assert rendered.word_count == 4
+    assert render_body('<a href=" jav&#x09;ascript:x">x</a>').html == '<a>x</a>'
+    assert render_body('<code class="language-py">x</code>').html == '<code class="language-py">x</code>'
+    assert render_body('<p class="evil">&lt;b&gt;</p>').html == '<p>&lt;b&gt;</p>'
+    assert render_body(None).html == '' and render_body(None).excerpt is None
+    assert render_body(' '.join(['word'] * 500)).reading_time == 3
+
+    # Plain text with "<" is not markup
+    plain = render_body('if a<b and c>d then stop')
+    assert plain.html == '<p>if a&lt;b and c&gt;d then stop</p>'
+    assert plain.excerpt == 'if a<b and c>d then stop'
+    assert render_body('x<y\n\nsecond').html == '<p>x&lt;y</p><p>second</p>'
+    assert render_body('use <b> for bold\nor <em>').html == '<p>use &lt;b&gt; for bold<br>or &lt;em&gt;</p>'
+    assert render_body('line<br>break').html == 'line<br>break'
+
+    excerpt = make_excerpt('lorem ipsum ' * 100, 40)
+    assert len(excerpt) <= 40 and excerpt.endswith('ipsum…')
+
+
+def test_backfill_renders_outdated_rows():
+    author = create_user()
+    contents = Content.__table__
+    with engine.begin() as conn:
+        conn.execute(contents.insert(), [
+            {'title': f'Old {i}', 'slug': f'old-{i}', 'content': f'<p>Body number {i}</p>', 'author_id': author['id'],
+             'excerpt': 'Kept' if i == 0 else None, 'created_at': datetime(2020, 1, 1), 'updated_at': datetime(2020, 1, 1)}
+            for i in range(25)
+        ])
+    # Rendered when written, so not picked up
+    client.post('/api/contents', json={'title': 'New', 'slug': 'new', 'content': 'x', 'author_id': author['id']})
+
+    seen = []
+    assert backfill(TestingSessionLocal, batch_size=4, workers=2, progress=seen.append) == 25
+    assert seen[-1] == 25
+    with engine.connect() as conn:
+        rows = conn.execute(contents.select().where(contents.c.slug.like('old-%')).order_by(contents.c.id)).all()
+    assert all(row.render_version == RENDER_VERSION for row in rows)
+    assert rows[0].excerpt == 'Kept' and not rows[0].excerpt_auto
+    assert rows[3].content_html == '<p>Body number 3</p>'
+    assert (rows[3].excerpt, rows[3].excerpt_auto, rows[3].word_count) == ('Body number 3', True, 3)
+    assert rows[3].updated_at == datetime(2020, 1, 1)
+
+    assert backfill(TestingSessionLocal, workers=1) == 0
+    assert backfill(TestingSessionLocal, workers=1, rerender_all=True) == 26
+
+
+def test_search_ranks_title_matches_first():
+    author = create_user()
+    create_searchable(author['id'], 'body', 'Weekly notes', 'Tuning the python garbage collector')
+    create_searchable(author['id'], 'title', 'Python performance', 'Profiling tips')
+    create_searchable(author['id'], 'other', 'Gardening', 'Tomatoes and basil')
+
+    assert search('python') == ['title', 'body']
+    assert search('PYTHON profiling') == ['title']
+    assert search('python', limit=1, offset=1) == ['body']
+    assert search('"python" OR NOT') == []
+    assert search('tomatoes')[0] == 'other'
+    assert client.get('/api/contents/search').status_code == 422
+
+
+def test_search_index_follows_writes():
+    author = create_user()
+    item = create_searchable(author['id'], 'post', 'Draft title', 'Nothing here yet')
+    assert search('nothing') == ['post']
+
+    client.put(f"/api/contents/{item['id']}", json={'content': 'Now about kubernetes'})
+    assert search('nothing') == []
+    assert search('kubernetes') == ['post']
+
+    client.delete(f"/api/contents/{item['id']}")
+    assert search('kubernetes') == []
+
+
+def test_memory_search_engine():
+    author = create_user()
+    create_searchable(author['id'], 'a', 'Search engines', 'Inverted index basics')
+    create_searchable(author['id'], 'b', 'Cooking', 'An index of recipes', excerpt='search the cookbook')
+    engine = MemorySearchEngine()
+    db = TestingSessionLocal()
+    try:
+        ids = {c.slug: c.id for c in db.query(Content)}
+        # Built lazily from the table on first search
+        assert [cid for cid, _ in engine.search(db, 'search index')] == [ids['a'], ids['b']]
+
+        content = db.get(Content, ids['b'])
+        content.title = 'Search cookery'
+        engine.index(db, content)
+        # Applied when the write commits, and dropped when it rolls back
+        assert engine.search(db, 'cookery') == []
+        db.commit()
+        assert [cid for cid, _ in engine.search(db, 'cookery')] == [ids['b']]
+
+        content.title = 'Phantom'
+        engine.index(db, content)
+        db.rollback()
+        db.commit()
+        assert engine.search(db, 'phantom') == []
+
+        engine.remove(db, ids['a'])
+        db.commit()
+        assert [cid for cid, _ in engine.search(db, 'index')] == [ids['b']]
+        assert engine.search(db, 'missing') == []
+    finally:
+        db.close()
+
+
+def test_search_engine_requires_search():
+    class IndexOnly(SearchEngine):
+        name = "index-only"
+
+    with pytest.raises(TypeError):
+        IndexOnly()
+
+
+def test_content_tag_assignment():
+    author = create_user()
+    posts = [create_searchable(author['id'], f'p{i}', f'Post {i}', 'body') for i in range(3)]
+    tags = [client.post('/api/tags', json={'name': n, 'slug': n}).json()['id'] for n in ('a', 'b', 'c')]
+    url = f"/api/contents/{posts[0]['id']}/tags"
+
+    resp = client.put(url, json={'ids': tags[:2]})
+    assert resp.status_code == 200
+    assert resp.json() == {'content_id': posts[0]['id'], 'ids': tags[:2], 'added': tags[:2], 'removed': []}
+
+    resp = client.put(url, json={'add': [tags[2], tags[0]], 'remove': [tags[1]]})
+    assert (resp.json()['ids'], resp.json()['added'], resp.json()['removed']) == ([tags[0], tags[2]], [tags[2]], [tags[1]])
+    assert client.get(url).json()['ids'] == [tags[0], tags[2]]
+
+    assert client.put(url, json={'ids': [999]}).status_code == 400
+    assert client.put(url, json={'ids': [tags[0]], 'add': [tags[1]]}).status_code == 422
+    assert client.put('/api/contents/999/tags', json={'ids': []}).status_code == 404
+
+    resp = client.post('/api/contents/tags/batch', json={
+        'content_ids': [p['id'] for p in posts], 'add': [tags[1]], 'remove': [tags[2]],
+    })
+    assert resp.status_code == 200
+    assert [r['ids'] for r in resp.json()] == [[tags[0], tags[1]], [tags[1]], [tags[1]]]
+    resp = client.post('/api/contents/tags/batch', json={'content_ids': [posts[1]['id'], 999], 'ids': []})
+    assert resp.status_code == 404
+    assert client.get(f"/api/contents/{posts[1]['id']}/tags").json()['ids'] == [tags[1]]
+
+
+def test_content_category_assignment():
+    author = create_user()
+    posts = [create_searchable(author['id'], f'p{i}', f'Post {i}', 'body') for i in range(2)]
+    root = client.post('/api/categories', json={'name': 'Root', 'slug': 'root'}).json()
+    child = client.post('/api/categories', json={'name': 'Child', 'slug': 'child', 'parent_id': root['id']}).json()
+
+    resp = client.post('/api/contents/categories/batch', json={
+        'content_ids': [p['id'] for p in posts], 'ids': [child['id']],
+    })
+    assert [r['added'] for r in resp.json()] == [[child['id']], [child['id']]]
+    resp = client.get(f"/api/categories/{root['id']}/contents")
+    assert [c['slug'] for c in resp.json()] == ['p0', 'p1']
+
+    client.put(f"/api/contents/{posts[0]['id']}/categories", json={'ids': []})
+    resp = client.get(f"/api/categories/{root['id']}/contents")
+    assert [c['slug'] for c in resp.json()] == ['p1']
+
+
+def test_posting_list_merges():
+    rng = random.Random(7)
+    for _ in range(50):
+        a = sorted(rng.sample(range(500), rng.randint(0, 80)))
+        b = sorted(rng.sample(range(500), rng.randint(0, 300)))
+        c = sorted(rng.sample(range(500), rng.randint(0, 20)))
+        arrays = [array('q', x) for x in (a, b, c)]
+        assert list(intersect(arrays[0], arrays[1])) == sorted(set(a) & set(b))
+        assert list(difference(arrays[1], arrays[0])) == sorted(set(b) - set(a))
+        assert list(union(arrays)) == sorted(set(a) | set(b) | set(c))
+
+
+def tagged(**params):
+    resp = client.get('/api/contents/by-tags', params=params)
+    assert resp.status_code == 200
+    return [item['slug'] for item in resp.json()]
+
+
+def test_multi_tag_queries():
+    author = create_user()
+    posts = {f'p{i}': create_searchable(author['id'], f'p{i}', f'Post {i}', 'body')['id'] for i in range(5)}
+    a, b, c = (client.post('/api/tags', json={'name': n, 'slug': n}).json()['id'] for n in ('a', 'b', 'c'))
+    assignments = {'p0': [a, b], 'p1': [a, b, c], 'p2': [a], 'p3': [b, c], 'p4': []}
+    for slug, tag_ids in assignments.items():
+        client.put(f"/api/contents/{posts[slug]}/tags", json={'ids': tag_ids})
+
+    def check_all():
+        assert tagged(all=[a, b]) == ['p0', 'p1']
+        assert tagged(all=[a, b], none=[c]) == ['p0']
+        assert tagged(any=[a, c]) == ['p0', 'p1', 'p2', 'p3']
+        assert tagged(all=[b], any=[a, c], none=[c]) == ['p0']
+        assert tagged(all=[a, 999]) == []
+
+    # Cold: answered in SQL while the posting lists load in the background
+    assert not tag_index.is_warm
+    check_all()
+    tag_index.warm(engine).join()
+    assert tag_index.is_warm
+    check_all()
+
+    resp = client.get('/api/contents/by-tags', params={'any': [a, b, c], 'limit': 2})
+    assert [item['slug'] for item in resp.json()] == ['p0', 'p1']
+    resp = client.get('/api/contents/by-tags', params={'any': [a, b, c], 'limit': 2, 'after': resp.headers['x-next-cursor']})
+    assert [item['slug'] for item in resp.json()] == ['p2', 'p3']
+    assert client.get('/api/contents/by-tags', params={'none': [a]}).status_code == 400
+
+    # Assignment changes and deletes keep the warm lists current
+    client.post('/api/contents/tags/batch', json={'content_ids': [posts['p2'], posts['p4']], 'add': [b]})
+    client.delete(f"/api/contents/{posts['p0']}")
+    assert tag_index.is_warm
+    assert tagged(all=[a, b]) == ['p1', 'p2']
+    assert tagged(all=[b], none=[a]) == ['p3', 'p4']
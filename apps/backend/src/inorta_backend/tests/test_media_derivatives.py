@@ -0,0 +1,212 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.services import media_derivatives as derivatives_module
+from inorta_backend.services.media_derivatives import (
+    DerivativeGenerator, Preset, derivative_path, images_available, media_derivatives, parse_presets,
+)
+from inorta_backend.services.media_storage import media_storage
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_media_derivatives.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+requires_pillow = pytest.mark.skipif(not images_available(), reason="Pillow is not installed")
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database(tmp_path, monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(media_storage, "root", str(tmp_path))
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    media_derivatives.stop()
+    Base.metadata.drop_all(bind=engine)
+
+
+def png(width, height):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def upload(body, filename='photo.png'):
+    resp = client.post('/api/media/upload', params={'filename': filename}, content=body)
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def test_parse_presets():
+    presets = parse_presets("thumb=320x200:webp, big=2000x2000:JPEG, plain=10x10")
+    assert presets['thumb'] == Preset('thumb', 320, 200, 'webp')
+    assert presets['big'].mime_type == 'image/jpeg'
+    assert presets['plain'].format == 'webp'
+    for spec in ("thumb=320:webp", "thumb=0x10", "thumb=10x10:gif", "=10x10"):
+        with pytest.raises(ValueError):
+            parse_presets(spec)
+    with pytest.raises(ValueError):
+        DerivativeGenerator(presets, ['missing'], 1, 80)
+
+    digest = 'ab' * 32
+    assert derivative_path(f'ab/ab/{digest}.png', presets['thumb']) == f'ab/ab/{digest}-thumb-320x200.webp'
+
+
+@requires_pillow
+def test_derivative_rendered_on_demand_and_cleaned_up(tmp_path):
+    from PIL import Image
+
+    media = upload(png(800, 600))
+    # The eager thumb was rendered right after the upload
+    assert [d['preset'] for d in client.get(f"/api/media/{media['id']}/derivatives").json()] == ['thumb']
+
+    resp = client.get(f"/api/media/{media['id']}/derivatives/medium")
+    assert resp.status_code == 200
+    assert resp.headers['content-type'] == 'image/webp'
+    with Image.open(io.BytesIO(resp.content)) as image:
+        assert image.size == (800, 600)  # never upscaled
+
+    listed = {d['preset']: d for d in client.get(f"/api/media/{media['id']}/derivatives").json()}
+    assert sorted(listed) == ['medium', 'thumb']
+    thumb = listed['thumb']
+    assert (thumb['width'], thumb['height'], thumb['format']) == (320, 240, 'webp')
+    served = client.get(thumb['file_url'])
+    assert served.status_code == 200
+    assert 'immutable' in served.headers['cache-control']
+    assert len(served.content) == thumb['size']
+
+    # A second request reuses the stored file
+    rendered = media_derivatives.rendered
+    assert client.get(f"/api/media/{media['id']}/derivatives/thumb").status_code == 200
+    assert media_derivatives.rendered == rendered
+
+    paths = [tmp_path / d['file_path'] for d in listed.values()]
+    assert all(path.exists() for path in paths)
+    assert client.delete(f"/api/media/{media['id']}").status_code == 204
+    assert not any(path.exists() for path in paths)
+
+
+@requires_pillow
+def test_create_derivatives_in_one_call():
+    media = upload(png(3000, 1000))
+    resp = client.post(f"/api/media/{media['id']}/derivatives", params={'preset': ['large', 'medium']})
+    assert resp.status_code == 200
+    assert [(d['preset'], d['width'], d['height'], d['mime_type']) for d in resp.json()] == [
+        ('large', 2048, 683, 'image/jpeg'), ('medium', 1024, 341, 'image/webp'),
+    ]
+    assert len(client.post(f"/api/media/{media['id']}/derivatives").json()) == 3
+
+
+@requires_pillow
+def test_oversized_image_is_rejected(monkeypatch):
+    from PIL import Image
+
+    media = upload(png(800, 600))
+    # Render processes are forked after this, so they inherit the lower limit
+    media_derivatives.stop()
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    resp = client.get(f"/api/media/{media['id']}/derivatives/medium")
+    assert resp.status_code == 400
+    assert 'Cannot render media' in resp.json()['detail']
+
+
+def test_broken_pool_is_replaced(tmp_path):
+    def render(source, target, width, height, image_format, quality):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    generator = DerivativeGenerator(parse_presets("thumb=10x10"), [], 1, 80)
+    generator.render = render
+    executor = generator._executor = ThreadPoolExecutor(1)
+    try:
+        job = generator.submit('a.png', str(tmp_path / 'a-thumb.webp'), generator.presets['thumb'])
+        with pytest.raises(BrokenProcessPool):
+            job.result(5)
+        # The dead pool is dropped, so the next render starts a fresh one
+        assert generator._executor is None
+        assert executor._shutdown
+    finally:
+        generator.stop()
+
+
+def test_broken_pool_answers_503(monkeypatch):
+    def render(source, target, width, height, image_format, quality):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    image = upload(b'\x89PNG\r\n\x1a\n' + b'\x00' * 64, 'photo.png')
+    monkeypatch.setattr(derivatives_module, 'images_available', lambda: True)
+    monkeypatch.setattr(media_derivatives, 'render', render)
+    monkeypatch.setattr(media_derivatives, '_executor', ThreadPoolExecutor(1))
+    resp = client.get(f"/api/media/{image['id']}/derivatives/thumb")
+    assert resp.status_code == 503
+    assert resp.json()['detail'] == 'Image workers stopped unexpectedly, try again'
+    assert media_derivatives._executor is None
+
+
+def test_derivative_errors(monkeypatch):
+    media = upload(b'%PDF-1.7 not an image', 'doc.pdf')
+    assert client.get(f"/api/media/{media['id']}/derivatives/thumb").status_code == 400
+    assert client.get(f"/api/media/{media['id']}/derivatives/huge").status_code == 404
+    assert client.get('/api/media/999/derivatives/thumb').status_code == 404
+
+    image = upload(b'\x89PNG\r\n\x1a\n' + b'\x00' * 64, 'broken.png')
+    monkeypatch.setattr(derivatives_module, 'images_available', lambda: False)
+    resp = client.get(f"/api/media/{image['id']}/derivatives/thumb")
+    assert resp.status_code == 503
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    calls = []
+    release = threading.Event()
+
+    def render(source, target, width, height, image_format, quality):
+        calls.append(target)
+        release.wait(5)
+        return width, height, 1
+
+    generator = DerivativeGenerator(parse_presets("thumb=10x10"), [], 2, 80)
+    generator.render = render
+    generator._executor = ThreadPoolExecutor(2)
+    preset = generator.presets['thumb']
+    try:
+        first = generator.submit('a.png', str(tmp_path / 'a-thumb.webp'), preset)
+        second = generator.submit('a.png', str(tmp_path / 'a-thumb.webp'), preset)
+        other = generator.submit('b.png', str(tmp_path / 'b-thumb.webp'), preset)
+        assert first is second and other is not first
+        assert generator.stats()['in_flight'] == 2
+        release.set()
+        assert first.result(5) == (10, 10, 1)
+        other.result(5)
+        deadline = time.monotonic() + 5
+        while generator.stats()['in_flight'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert generator.stats() == {'workers': 2, 'in_flight': 0, 'rendered': 2, 'joined': 1}
+        assert len(calls) == 2
+    finally:
+        generator.stop()
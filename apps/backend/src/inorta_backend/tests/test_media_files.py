@@ -0,0 +1,207 @@
+import os
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.api.media_files import MediaFileResponse, media_file_response, parse_range
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.media_storage import media_storage
+from inorta_backend.services.open_files import OpenFileCache, open_files
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_media_files.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 400
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database(tmp_path, monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(media_storage, "root", str(tmp_path))
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    open_files.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def video():
+    resp = client.post('/api/media/upload', params={'filename': 'clip.mp4'}, content=VIDEO)
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def test_serves_content_addressed_file(video):
+    resp = client.get(video['file_url'])
+    assert resp.status_code == 200
+    assert resp.content == VIDEO
+    assert resp.headers['content-type'] == 'video/mp4'
+    assert resp.headers['content-length'] == str(len(VIDEO))
+    assert resp.headers['accept-ranges'] == 'bytes'
+    assert resp.headers['etag'] == f'"{video["content_hash"]}"'
+    assert 'immutable' in resp.headers['cache-control']
+
+    head = client.head(video['file_url'])
+    assert head.status_code == 200
+    assert head.content == b''
+    assert head.headers['content-length'] == str(len(VIDEO))
+
+    by_id = client.get(f"/api/media/{video['id']}/file")
+    assert by_id.content == VIDEO
+    assert by_id.headers['cache-control'] == 'public, no-cache'
+    assert "filename*=utf-8''clip.mp4" in by_id.headers['content-disposition']
+
+    assert client.get('/media/00/00/missing.mp4').status_code == 404
+    assert client.get('/media/../test_media_files.db').status_code == 404
+    assert client.get('/api/media/999/file').status_code == 404
+
+
+def test_conditional_requests(video):
+    url = video['file_url']
+    etag = client.get(url).headers['etag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url, headers={'If-Match': '"other"'}).status_code == 412
+    last_modified = client.get(url).headers['last-modified']
+    resp = client.get(url, headers={'If-Modified-Since': last_modified})
+    assert resp.status_code == 304
+    assert resp.content == b''
+
+
+def test_single_range(video):
+    url = video['file_url']
+    resp = client.get(url, headers={'Range': 'bytes=100-199'})
+    assert resp.status_code == 206
+    assert resp.content == VIDEO[100:200]
+    assert resp.headers['content-range'] == f'bytes 100-199/{len(VIDEO)}'
+
+    resp = client.get(url, headers={'Range': 'bytes=-10'})
+    assert resp.content == VIDEO[-10:]
+    resp = client.get(url, headers={'Range': 'bytes=102000-'})
+    assert resp.content == VIDEO[102000:]
+
+    resp = client.get(url, headers={'Range': f'bytes={len(VIDEO)}-'})
+    assert resp.status_code == 416
+    assert resp.headers['content-range'] == f'bytes */{len(VIDEO)}'
+
+    # Malformed headers and an outdated If-Range get the whole file
+    assert client.get(url, headers={'Range': 'bytes=9-3'}).status_code == 200
+    assert client.get(url, headers={'Range': 'lines=1-2'}).status_code == 200
+    resp = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert resp.status_code == 200
+    assert resp.content == VIDEO
+    etag = resp.headers['etag']
+    assert client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': etag}).status_code == 206
+
+
+def test_multiple_ranges(video):
+    resp = client.get(video['file_url'], headers={'Range': 'bytes=0-9, 50-59, 55-64'})
+    assert resp.status_code == 206
+    content_type = resp.headers['content-type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    boundary = content_type.split('boundary=')[1].encode()
+    assert int(resp.headers['content-length']) == len(resp.content)
+    parts = resp.content.split(b'--' + boundary)
+    assert parts[0] == b'' and parts[-1] == b'--\r\n'
+    bodies = [part.split(b'\r\n\r\n', 1) for part in parts[1:-1]]
+    assert [headers.split(b'Content-Range: ')[1] for headers, _ in bodies] == [
+        f'bytes 0-9/{len(VIDEO)}'.encode(), f'bytes 50-64/{len(VIDEO)}'.encode(),
+    ]
+    assert [body for _, body in bodies] == [VIDEO[0:10] + b'\r\n', VIDEO[50:65] + b'\r\n']
+
+
+def test_parse_range():
+    assert parse_range('bytes=0-0', 10) == [(0, 0)]
+    assert parse_range('bytes=5-100', 10) == [(5, 9)]
+    assert parse_range('bytes=-3', 10) == [(7, 9)]
+    assert parse_range('bytes=0-1,2-3,8-', 10) == [(0, 3), (8, 9)]
+    assert parse_range('bytes=20-30', 10) == []
+    assert parse_range('bytes=-0', 10) == []
+    assert parse_range('bytes=a-b', 10) is None
+    assert parse_range('bytes=-', 10) is None
+    assert parse_range('bytes=' + ','.join(['0-1'] * 17), 10) is None
+
+
+def test_zero_copy_extensions(video):
+    def serve(extensions, headers=()):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        scope = {'type': 'http', 'method': 'GET', 'headers': list(headers), 'extensions': extensions}
+        response = media_file_response(video['file_path'])
+        anyio.run(response, scope, receive, send)
+        return messages
+
+    messages = serve({'http.response.pathsend': {}})
+    assert messages[1] == {'type': 'http.response.pathsend', 'path': media_storage.path(video['file_path'])}
+
+    messages = serve({'http.response.zerocopysend': {}}, [(b'range', b'bytes=10-19,100-')])
+    sends = [m for m in messages if m['type'] == 'http.response.zerocopysend']
+    assert [(m['offset'], m['count']) for m in sends] == [(10, 10), (100, len(VIDEO) - 100)]
+    assert sends[0]['file'].fileno() > 0
+
+
+def test_open_file_cache(tmp_path):
+    cache = OpenFileCache(max_open=2, valid=0)
+    paths = []
+    for name in 'abc':
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+
+    first = cache.acquire(paths[0])
+    cache.release(first)
+    assert cache.acquire(paths[0]) is first
+    assert cache.stats()['hits'] == 1
+
+    # Evicted while in use: stays open until released
+    cache.release(cache.acquire(paths[1]))
+    cache.release(cache.acquire(paths[2]))
+    assert paths[0] not in cache.files
+    assert first.read(0, 1) == b'a'
+    cache.release(first)
+    assert first.file.closed
+
+    # A replaced file is reopened; the old descriptor closes as it is not in use
+    second = cache.files[paths[1]]
+    os.replace(paths[2], paths[1])
+    replaced = cache.acquire(paths[1])
+    assert replaced is not second and second.file.closed
+    assert replaced.read(0, 1) == b'c'
+    cache.release(replaced)
+
+    cache.clear()
+    assert replaced.file.closed
+
+
+def test_deleting_media_drops_cached_descriptor(video):
+    client.get(video['file_url'])
+    path = media_storage.path(video['file_path'])
+    assert path in open_files.files
+    assert client.delete(f"/api/media/{video['id']}").status_code == 204
+    assert path not in open_files.files
+    assert client.get(video['file_url']).status_code == 404
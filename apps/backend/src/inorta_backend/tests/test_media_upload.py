@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tracemalloc
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.media_storage import (
+    MediaStorage, UploadTooLarge, guess_mime_type, media_storage,
+)
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_media_upload.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database(tmp_path, monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(media_storage, "root", str(tmp_path))
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def upload(body, **params):
+    params.setdefault('filename', 'photo.bin')
+    return client.post('/api/media/upload', params=params, content=body)
+
+
+def test_upload_fills_size_type_and_hash(tmp_path):
+    resp = upload(PNG, filename='Holiday.bin', alt_text='Beach')
+    assert resp.status_code == 201
+    media = resp.json()
+    digest = hashlib.sha256(PNG).hexdigest()
+    assert media['content_hash'] == digest
+    assert media['size'] == len(PNG)
+    assert media['mime_type'] == 'image/png'
+    assert media['file_type'] == 'image'
+    assert media['original_filename'] == 'Holiday.bin'
+    assert media['alt_text'] == 'Beach'
+    assert media['file_path'] == f"{digest[:2]}/{digest[2:4]}/{digest}.png"
+    assert media['file_url'] == f"/media/{media['file_path']}"
+    with open(tmp_path / media['file_path'], 'rb') as handle:
+        assert handle.read() == PNG
+    # No temporary file is left behind
+    assert os.listdir(tmp_path / 'tmp') == []
+
+
+def test_duplicate_upload_reuses_row_and_file(tmp_path):
+    first = upload(PNG, filename='a.png').json()
+    again = upload(iter([PNG[:100], PNG[100:]]), filename='b.png')
+    assert again.status_code == 200
+    assert again.json()['id'] == first['id']
+    assert again.json()['original_filename'] == 'a.png'
+    assert len(client.get('/api/media').json()) == 1
+
+    # Deleting the row removes its file
+    assert client.delete(f"/api/media/{first['id']}").status_code == 204
+    assert not os.path.exists(tmp_path / first['file_path'])
+
+
+def test_upload_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_storage, "max_size", 1024)
+    assert upload(b"x" * 2048).status_code == 413
+    assert upload(iter([b"x" * 1000, b"x" * 1000])).status_code == 413
+    assert os.listdir(tmp_path / 'tmp') == []
+    assert client.get('/api/media').json() == []
+
+
+def test_mime_type_fallbacks():
+    assert guess_mime_type(b"\x00\x00\x00\x18ftypmp42") == 'video/mp4'
+    assert guess_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == 'image/webp'
+    assert guess_mime_type(b"plain", 'notes.txt') == 'text/plain'
+    assert guess_mime_type(b"plain", 'blob', 'text/csv; charset=utf-8') == 'text/csv'
+    assert guess_mime_type(b"plain", 'blob', 'application/octet-stream') == 'application/octet-stream'
+
+
+def test_save_stream_memory_stays_constant(tmp_path):
+    storage = MediaStorage(str(tmp_path), max_size=1024 ** 3)
+    chunk_size, chunks = 64 * 1024, 512  # 32 MiB
+
+    async def body():
+        for i in range(chunks):
+            yield bytes([i % 256]) * chunk_size
+
+    tracemalloc.start()
+    try:
+        stored = anyio.run(storage.save_stream, body(), 'big.bin')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert stored.size == chunk_size * chunks
+    assert os.path.getsize(storage.path(stored.file_path)) == stored.size
+    assert peak < 8 * 1024 * 1024
+
+    async def too_big():
+        yield b"x" * 10
+
+    small = MediaStorage(str(tmp_path), max_size=5)
+    with pytest.raises(UploadTooLarge):
+        anyio.run(small.save_stream, too_big())
@@ -5,6 +5,8 @@ from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.menu_service import menu_tree_cache
+from inorta_backend.services.response_cache import response_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_menus.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -26,38 +28,99 @@ client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    menu_tree_cache.invalidate()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 def test_menu_and_items():
     # Create menu
-    resp = client.post('/menus', json={'name': 'Main Menu', 'location': 'header'})
+    resp = client.post('/api/menus', json={'name': 'Main Menu', 'location': 'header'})
     assert resp.status_code == 201
     menu = resp.json()
     assert menu['name'] == 'Main Menu'
 
     # Create menu item
-    resp = client.post('/menu-items', json={'menu_id': menu['id'], 'label': 'Home', 'url': '/'})
+    resp = client.post('/api/menu-items', json={'menu_id': menu['id'], 'label': 'Home', 'url': '/'})
     assert resp.status_code == 201
     item = resp.json()
     assert item['label'] == 'Home'
 
     # List items by menu
-    resp = client.get(f'/menu-items?menu_id={menu["id"]}')
+    resp = client.get(f'/api/menu-items?menu_id={menu["id"]}')
     assert resp.status_code == 200
     assert len(resp.json()) >= 1
 
     # Update item
-    resp = client.put(f"/menu-items/{item['id']}", json={'label': 'Homepage'})
+    resp = client.put(f"/api/menu-items/{item['id']}", json={'label': 'Homepage'})
     assert resp.status_code == 200
     assert resp.json()['label'] == 'Homepage'
 
     # Delete item
-    resp = client.delete(f"/menu-items/{item['id']}")
+    resp = client.delete(f"/api/menu-items/{item['id']}")
     assert resp.status_code == 204
 
     # Delete menu
-    resp = client.delete(f"/menus/{menu['id']}")
+    resp = client.delete(f"/api/menus/{menu['id']}")
     assert resp.status_code == 204
+
+
+def labels(nodes):
+    return [(n['label'], labels(n['children'])) for n in nodes]
+
+
+def test_menu_tree_nested_and_ordered():
+    menu = client.post('/api/menus', json={'name': 'Main', 'location': 'header'}).json()
+    mid = menu['id']
+    about = client.post('/api/menu-items', json={'menu_id': mid, 'label': 'About', 'order': 2}).json()
+    client.post('/api/menu-items', json={'menu_id': mid, 'label': 'Home', 'order': 1})
+    client.post('/api/menu-items', json={'menu_id': mid, 'label': 'Team', 'parent_id': about['id'], 'order': 2})
+    history = client.post('/api/menu-items', json={'menu_id': mid, 'label': 'History', 'parent_id': about['id'], 'order': 1}).json()
+    client.post('/api/menu-items', json={'menu_id': mid, 'label': '1990s', 'parent_id': history['id']})
+    hidden = client.post('/api/menu-items', json={'menu_id': mid, 'label': 'Hidden', 'is_active': False}).json()
+    client.post('/api/menu-items', json={'menu_id': mid, 'label': 'Under hidden', 'parent_id': hidden['id']})
+
+    resp = client.get(f'/api/menus/{mid}/tree')
+    assert resp.status_code == 200
+    tree = resp.json()
+    assert tree['menu']['name'] == 'Main'
+    assert labels(tree['items']) == [
+        ('Home', []),
+        ('About', [('History', [('1990s', [])]), ('Team', [])]),
+    ]
+
+    by_location = client.get('/api/menus/by-location/header/tree')
+    assert by_location.status_code == 200
+    assert by_location.json() == tree
+
+
+def test_menu_tree_cached_until_write(monkeypatch):
+    menu = client.post('/api/menus', json={'name': 'Footer', 'location': 'footer'}).json()
+    item = client.post('/api/menu-items', json={'menu_id': menu['id'], 'label': 'Contact'}).json()
+    first = client.get('/api/menus/by-location/footer/tree').json()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE menu_items SET label = 'Sneaky' WHERE id = ?", (item['id'],))
+    assert client.get('/api/menus/by-location/footer/tree').json() == first
+
+    # Another worker's write shows up once the tree expires
+    monkeypatch.setattr(menu_tree_cache, 'ttl', 0)
+    tree = client.get('/api/menus/by-location/footer/tree', headers={'Cache-Control': 'no-cache'}).json()
+    assert labels(tree['items']) == [('Sneaky', [])]
+    monkeypatch.setattr(menu_tree_cache, 'ttl', 60)
+
+    client.put(f"/api/menu-items/{item['id']}", json={'label': 'Contact us'})
+    tree = client.get('/api/menus/by-location/footer/tree').json()
+    assert labels(tree['items']) == [('Contact us', [])]
+
+    client.put(f"/api/menus/{menu['id']}", json={'location': 'sidebar'})
+    assert client.get('/api/menus/by-location/footer/tree').status_code == 404
+    assert client.get('/api/menus/by-location/sidebar/tree').status_code == 200
+
+
+def test_menu_tree_missing_menu():
+    assert client.get('/api/menus/999/tree').status_code == 404
+    assert client.get('/api/menus/by-location/nowhere/tree').status_code == 404
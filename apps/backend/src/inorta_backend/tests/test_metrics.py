@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.metrics import Metrics, merge, render
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_metrics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def scrape():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_request_metrics_by_route_template():
+    before = scrape()
+    role = client.post("/api/roles", json={"name": "metrics"}).json()
+    client.get(f"/api/roles/{role['id']}")
+    client.get("/api/roles/999")
+    client.get("/api/no-such-route")
+    samples = scrape()
+
+    def delta(series):
+        return samples.get(series, 0) - before.get(series, 0)
+
+    assert delta('http_requests_total{method="POST",route="/api/roles",status="201"}') == 1
+    assert delta('http_requests_total{method="GET",route="/api/roles/{role_id}",status="200"}') == 1
+    assert delta('http_requests_total{method="GET",route="/api/roles/{role_id}",status="404"}') == 1
+    assert delta('http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    assert delta('http_request_duration_seconds_count{method="GET",route="/api/roles/{role_id}",status="200"}') == 1
+    assert delta('http_request_duration_seconds_bucket{method="GET",route="/api/roles/{role_id}",status="200",le="+Inf"}') == 1
+    assert delta('http_response_size_bytes_sum{method="POST",route="/api/roles",status="201"}') > 0
+    assert delta('db_statements_total{method="GET",route="/api/roles/{role_id}"}') >= 2
+    assert delta('db_request_duration_seconds_count{method="POST",route="/api/roles"}') == 1
+    # The scrape itself is the request in progress
+    assert samples['http_requests_in_progress{method="GET"}'] == 1
+
+
+def test_cache_hits_are_counted_under_their_route():
+    client.get("/api/tags")
+    before = scrape()
+    for _ in range(2):
+        assert client.get("/api/tags").headers["X-Cache"] == "HIT"
+    samples = scrape()
+
+    def delta(series):
+        return samples.get(series, 0) - before.get(series, 0)
+
+    assert delta('http_requests_total{method="GET",route="/api/tags",status="200"}') == 2
+    assert delta('http_requests_total{method="GET",route="<unmatched>",status="200"}') == 0
+
+
+def test_render_format():
+    text = render(merge([(True, [
+        ["http_requests_total", [["method", "GET"], ["route", 'a"b\\c'], ["status", "200"]], 3],
+        ["db_request_duration_seconds", [["method", "GET"], ["route", "/x"]], [1] + [0] * 12 + [0.0004, 1]],
+    ])]))
+    assert '# TYPE http_requests_total counter' in text
+    assert 'http_requests_total{method="GET",route="a\\"b\\\\c",status="200"} 3' in text
+    assert 'db_request_duration_seconds_bucket{method="GET",route="/x",le="0.0005"} 1' in text
+    assert 'db_request_duration_seconds_bucket{method="GET",route="/x",le="+Inf"} 1' in text
+    assert 'db_request_duration_seconds_sum{method="GET",route="/x"} 0.0004' in text
+
+
+def test_metrics_summed_across_workers(tmp_path):
+    worker = Metrics(str(tmp_path), flush_interval=60)
+    labels = (("method", "GET"), ("route", "/api/tags"), ("status", "200"))
+    worker.registry.inc("http_requests_total", labels, 2)
+    worker.registry.inc("http_requests_in_progress", (("method", "GET"),))
+
+    # An exited worker: its counters still count, its gauges don't
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    (tmp_path / f"metrics-{exited.pid}.json").write_text(json.dumps({"pid": exited.pid, "series": [
+        ["http_requests_total", [list(pair) for pair in labels], 5],
+        ["http_requests_in_progress", [["method", "GET"]], 7],
+    ]}))
+
+    text = worker.render()
+    assert 'http_requests_total{method="GET",route="/api/tags",status="200"} 7' in text
+    assert 'http_requests_in_progress{method="GET"} 1' in text
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [f"metrics-{exited.pid}.json", f"metrics-{os.getpid()}.json"]
+    )
@@ -0,0 +1,89 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.services.pagination import decode_cursor, encode_cursor
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_pagination.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor([42])) == [42]
+    assert decode_cursor(encode_cursor([3, 7]), size=2) == [3, 7]
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([1, 2]))
+
+
+def test_tags_keyset_pages():
+    for i in range(5):
+        client.post('/api/tags', json={'name': f'tag{i}', 'slug': f'tag-{i}'})
+
+    seen = []
+    params = {'limit': 2}
+    while True:
+        resp = client.get('/api/tags', params=params)
+        assert resp.status_code == 200
+        seen.extend(t['slug'] for t in resp.json())
+        cursor = resp.headers.get('x-next-cursor')
+        if not cursor:
+            break
+        params = {'limit': 2, 'after': cursor}
+
+    assert seen == [f'tag-{i}' for i in range(5)]
+
+
+def test_cursor_ignores_rows_inserted_before_it():
+    for i in range(3):
+        client.post('/api/tags', json={'name': f'tag{i}', 'slug': f'tag-{i}'})
+    first = client.get('/api/tags', params={'limit': 2})
+    cursor = first.headers['x-next-cursor']
+
+    client.post('/api/tags', json={'name': 'late', 'slug': 'late'})
+    resp = client.get('/api/tags', params={'limit': 2, 'after': cursor})
+    assert [t['slug'] for t in resp.json()] == ['tag-2', 'late']
+
+
+def test_menu_items_keyset_follows_order():
+    menu = client.post('/api/menus', json={'name': 'Main'}).json()
+    for label, order in [('c', 2), ('a', 0), ('b', 1), ('b2', 1)]:
+        client.post('/api/menu-items', json={'menu_id': menu['id'], 'label': label, 'order': order})
+
+    resp = client.get('/api/menu-items', params={'menu_id': menu['id'], 'limit': 2})
+    assert [i['label'] for i in resp.json()] == ['a', 'b']
+    resp = client.get('/api/menu-items', params={'menu_id': menu['id'], 'limit': 2, 'after': resp.headers['x-next-cursor']})
+    assert [i['label'] for i in resp.json()] == ['b2', 'c']
+
+
+def test_invalid_cursor_is_rejected():
+    resp = client.get('/api/users', params={'after': '!!!'})
+    assert resp.status_code == 400
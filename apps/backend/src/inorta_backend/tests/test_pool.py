@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from inorta_backend.db.pool import LatencyHistogram, PoolStats, install_idle_ping, instrumented_pool_class, pool_stats
+from inorta_backend.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def stats():
+    stats = pool_stats["test"] = PoolStats("test")
+    yield stats
+    del pool_stats["test"]
+
+
+def make_engine(tmp_path, stats, **kwargs):
+    return create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, stats),
+        **kwargs,
+    )
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram((1, 10, 100))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 0.5, 5, 50, 500):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == [[1, 2], [10, 3], [100, 4], ["+Inf", 5]]
+    assert snapshot["count"] == 5
+    assert snapshot["p50"] == 10
+    assert snapshot["p99"] is None
+
+
+def test_pool_counts_waits_and_timeouts(tmp_path, stats):
+    engine = make_engine(tmp_path, stats, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    with engine.connect() as held:
+        held.execute(text("SELECT 1"))
+        snapshot = stats.snapshot()
+        assert (snapshot["checked_out"], snapshot["checked_in"]) == (1, 0)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    with engine.connect():
+        pass
+
+    snapshot = stats.snapshot()
+    assert (snapshot["checkouts"], snapshot["waits"], snapshot["timeouts"]) == (3, 1, 1)
+    assert snapshot["checkout_ms"]["count"] == 3
+    # The timed-out checkout blocked for the whole pool_timeout
+    assert snapshot["checkout_ms"]["buckets"][-1][1] == 3
+    assert snapshot["checkout_ms"]["sum"] >= 50
+
+    # Stats follow the pool across dispose()
+    engine.dispose()
+    with engine.connect():
+        assert stats.snapshot()["checked_out"] == 1
+    engine.dispose()
+
+
+def test_idle_ping_only_after_idle(tmp_path, stats):
+    engine = make_engine(tmp_path, stats, pool_size=1)
+    install_idle_ping(engine, "test", idle_seconds=3600)
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert stats.pings == 0
+    engine.dispose()
+
+    engine = make_engine(tmp_path, stats, pool_size=1)
+    install_idle_ping(engine, "test", idle_seconds=0)
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    # The first checkout opens a fresh connection, which is not pinged
+    assert stats.pings == 2
+    engine.dispose()
+
+
+def test_pool_endpoint(stats):
+    stats.record(1.5, waited=False, timed_out=False)
+    body = client.get("/api/internal/pool").json()
+    entry = next(item for item in body if item["engine"] == "test")
+    assert entry["checkouts"] == 1
+    assert entry["checkout_ms"]["p50"] == 2.5
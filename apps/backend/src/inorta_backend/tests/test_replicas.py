@@ -0,0 +1,206 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.api.replicas import STICKY_COOKIE, ReplicaRoutingMiddleware
+from inorta_backend.api.routes import router as api_router
+from inorta_backend.db.routing import ReplicaSet, RoutingSession, allow_replica_reads
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.models.role import Role
+from inorta_backend.services.menu_service import menu_tree_cache
+from inorta_backend.services.response_cache import CachedResponse, MemoryCacheBackend, ResponseCache
+from inorta_backend.services.setting_service import settings_snapshot
+from inorta_backend.services.view_counter import view_counter
+
+# Two files stand in for a primary and its replica; "replication" is done by hand
+PRIMARY_URL = "sqlite:///./test_replicas_primary.db"
+REPLICA_URL = "sqlite:///./test_replicas_replica.db"
+primary = create_engine(PRIMARY_URL, connect_args={"check_same_thread": False})
+replica = create_engine(REPLICA_URL, connect_args={"check_same_thread": False})
+replicas = ReplicaSet([replica])
+TestingSessionLocal = sessionmaker(
+    class_=RoutingSession, autoflush=False, expire_on_commit=False, bind=primary, replicas=replicas
+)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app = FastAPI()
+app.add_middleware(ReplicaRoutingMiddleware, sticky_seconds=5)
+app.include_router(api_router, prefix="/api")
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    for engine in (primary, replica):
+        Base.metadata.create_all(bind=engine)
+    client.cookies.clear()
+    yield
+    for engine in (primary, replica):
+        Base.metadata.drop_all(bind=engine)
+
+
+def replicate():
+    """Copy the primary's roles to the replica"""
+    with primary.connect() as source, replica.begin() as target:
+        rows = [dict(row._mapping) for row in source.execute(Role.__table__.select())]
+        target.execute(Role.__table__.delete())
+        if rows:
+            target.execute(Role.__table__.insert(), rows)
+
+
+def role_names():
+    return [role['name'] for role in client.get('/api/roles').json()]
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary():
+    created = client.post('/api/roles', json={'name': 'editor'})
+    assert created.status_code == 201
+    with primary.connect() as conn:
+        assert conn.execute(Role.__table__.select()).all()
+
+    # The writer reads its own write from the primary, then the replica once the window is over
+    assert STICKY_COOKIE in created.cookies
+    assert role_names() == ['editor']
+    client.cookies.clear()
+    assert role_names() == []
+
+    replicate()
+    assert role_names() == ['editor']
+
+
+def test_sticky_window_expires():
+    client.post('/api/roles', json={'name': 'author'})
+    assert role_names() == ['author']
+    client.cookies.set(STICKY_COOKIE, str(time.time() - 1))
+    assert role_names() == []
+    client.cookies.set(STICKY_COOKIE, 'garbage')
+    assert role_names() == []
+
+
+def test_failed_writes_do_not_stick():
+    client.post('/api/roles', json={'name': 'admin'})
+    client.cookies.clear()
+    duplicate = client.post('/api/roles', json={'name': 'admin'})
+    assert duplicate.status_code == 400
+    assert STICKY_COOKIE not in duplicate.cookies
+
+
+def test_requests_without_writes_do_not_stick():
+    # The page-view beacon only buffers the view in memory
+    beacon = client.post('/api/contents/1/views')
+    assert beacon.status_code == 202
+    assert STICKY_COOKIE not in beacon.cookies
+    view_counter.flush(TestingSessionLocal)
+
+
+def test_in_process_caches_are_filled_from_the_primary():
+    settings_snapshot.invalidate()
+    menu_tree_cache.invalidate()
+    client.post('/api/settings', json={'key': 'site_name', 'value': 'Inorta'})
+    menu = client.post('/api/menus', json={'name': 'Main', 'location': 'header'}).json()
+    client.post('/api/menu-items', json={'menu_id': menu['id'], 'label': 'Home', 'url': '/'})
+    # A reader that never wrote, while the replica still lags behind
+    client.cookies.clear()
+    assert client.get('/api/settings/snapshot').json()['settings'] == {'general': {'site_name': 'Inorta'}}
+    tree = client.get('/api/menus/by-location/header/tree')
+    assert tree.status_code == 200
+    assert [item['label'] for item in tree.json()['items']] == ['Home']
+    settings_snapshot.invalidate()
+    menu_tree_cache.invalidate()
+
+
+def test_session_pins_to_primary_on_write():
+    with allow_replica_reads():
+        db = TestingSessionLocal()
+    try:
+        assert db.replica is replica
+        assert replicas.in_use[replica] == 1
+        assert db.query(Role).count() == 0
+        db.add(Role(name='viewer'))
+        db.flush()
+        # After the flush every statement, reads included, goes to the primary
+        assert db.replica is None
+        assert replicas.in_use[replica] == 0
+        assert db.query(Role).count() == 1
+        db.commit()
+    finally:
+        db.close()
+
+    # Outside a read-only request there is no replica at all
+    with TestingSessionLocal() as db:
+        assert db.replica is None
+        assert db.query(Role).count() == 1
+
+
+def test_async_reads_go_to_the_replica():
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from inorta_backend.api.async_routes import router as async_api_router
+    from inorta_backend.db.session import async_session_factory, get_async_db
+
+    async_primary = create_async_engine("sqlite+aiosqlite:///./test_replicas_primary.db", poolclass=NullPool)
+    async_replica = create_async_engine("sqlite+aiosqlite:///./test_replicas_replica.db", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_session_factory(async_primary, ReplicaSet([async_replica.sync_engine]))
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.add_middleware(ReplicaRoutingMiddleware, sticky_seconds=5)
+    async_app.include_router(async_api_router, prefix="/api")
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_client = TestClient(async_app)
+
+    created = async_client.post('/api/roles', json={'name': 'editor'})
+    assert created.status_code == 201
+    assert STICKY_COOKIE in created.cookies
+    assert [role['name'] for role in async_client.get('/api/roles').json()] == ['editor']
+    async_client.cookies.clear()
+    assert async_client.get('/api/roles').json() == []
+    replicate()
+    assert [role['name'] for role in async_client.get('/api/roles').json()] == ['editor']
+
+
+def test_replica_strategies():
+    engines = [create_engine("sqlite://"), create_engine("sqlite://"), create_engine("sqlite://")]
+    round_robin = ReplicaSet(engines)
+    assert [round_robin.acquire() for _ in range(4)] == [engines[0], engines[1], engines[2], engines[0]]
+
+    least = ReplicaSet(engines, "least_connections")
+    first, second, third = least.acquire(), least.acquire(), least.acquire()
+    assert {first, second, third} == set(engines)
+    least.release(second)
+    assert least.acquire() is second
+    assert [entry["in_use"] for entry in least.stats()] == [1, 1, 1]
+
+    with pytest.raises(ValueError):
+        ReplicaSet(engines, "random")
+
+
+def test_response_cache_waits_for_replicas_to_settle():
+    cache = ResponseCache(MemoryCacheBackend(10), ttl=30, settle=0.2)
+    response = CachedResponse(200, [], b"[]")
+    cache.invalidate("roles")
+    cache.set("/api/roles?", response, ("roles",), cache.generation(("roles",)))
+    assert cache.get("/api/roles?") is None
+    time.sleep(0.25)
+    cache.set("/api/roles?", response, ("roles",), cache.generation(("roles",)))
+    assert cache.get("/api/roles?") == response
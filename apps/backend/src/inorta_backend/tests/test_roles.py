@@ -1,10 +1,15 @@
 import pytest
+import threading
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.models.role import Role
+from inorta_backend.schemas.role import RoleCreate
+from inorta_backend.services.response_cache import response_cache
+from inorta_backend.services.role_service import RoleService
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_roles.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -26,42 +31,86 @@ client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 def test_create_role():
-    response = client.post("/roles", json={"name": "editor", "description": "Can edit posts"})
+    response = client.post("/api/roles", json={"name": "editor", "description": "Can edit posts"})
     assert response.status_code == 201
     data = response.json()
     assert data["name"] == "editor"
 
 
 def test_get_roles():
-    client.post("/roles", json={"name": "author", "description": "Author role"})
-    response = client.get("/roles")
+    client.post("/api/roles", json={"name": "author", "description": "Author role"})
+    response = client.get("/api/roles")
     assert response.status_code == 200
     data = response.json()
     assert len(data) >= 1
 
 
 def test_update_role():
-    create = client.post("/roles", json={"name": "contrib", "description": "Contrib"})
+    create = client.post("/api/roles", json={"name": "contrib", "description": "Contrib"})
     role_id = create.json()["id"]
-    response = client.put(f"/roles/{role_id}", json={"description": "Contributor"})
+    response = client.put(f"/api/roles/{role_id}", json={"description": "Contributor"})
     assert response.status_code == 200
     assert response.json()["description"] == "Contributor"
 
 
 def test_delete_role():
-    create = client.post("/roles", json={"name": "to-delete", "description": "Temp"})
+    create = client.post("/api/roles", json={"name": "to-delete", "description": "Temp"})
     role_id = create.json()["id"]
-    response = client.delete(f"/roles/{role_id}")
+    response = client.delete(f"/api/roles/{role_id}")
     assert response.status_code == 204
 
 
 def test_duplicate_role_fails():
-    client.post("/roles", json={"name": "unique", "description": "x"})
-    response = client.post("/roles", json={"name": "unique", "description": "dup"})
+    client.post("/api/roles", json={"name": "unique", "description": "x"})
+    response = client.post("/api/roles", json={"name": "unique", "description": "dup"})
     assert response.status_code == 400
+
+
+def test_create_is_a_single_insert():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with TestingSessionLocal(expire_on_commit=False) as db:
+            role = RoleService.create_role(db, RoleCreate(name="writer"))
+            assert role.id is not None
+            assert role.created_at is not None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == ["INSERT"]
+
+
+def test_parallel_creates_insert_once():
+    workers = 8
+    barrier = threading.Barrier(workers)
+    outcomes = []
+
+    def create():
+        with TestingSessionLocal() as db:
+            barrier.wait()
+            try:
+                RoleService.create_role(db, RoleCreate(name="racer"))
+                outcomes.append("created")
+            except ValueError as e:
+                outcomes.append(str(e))
+
+    threads = [threading.Thread(target=create) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["Role already exists"] * (workers - 1) + ["created"]
+    with TestingSessionLocal() as db:
+        assert db.query(Role).filter(Role.name == "racer").count() == 1
@@ -1,10 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from inorta_backend.main import app
 from inorta_backend.db.session import Base, get_db
+from inorta_backend.schemas.setting import SettingUpdate
+from inorta_backend.services.setting_service import SettingService, decode_setting_value, settings_snapshot
+from inorta_backend.services.response_cache import response_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_settings.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -26,34 +29,113 @@ client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    # The snapshot is process-wide; don't let one test's table leak into the next
+    settings_snapshot.invalidate()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 def test_create_setting():
-    resp = client.post('/settings', json={'key': 'site_name', 'value': 'Inorta CMS'})
+    resp = client.post('/api/settings', json={'key': 'site_name', 'value': 'Inorta CMS'})
     assert resp.status_code == 201
     data = resp.json()
     assert data['key'] == 'site_name'
 
 
 def test_duplicate_setting_fails():
-    client.post('/settings', json={'key': 'site_name', 'value': 'Inorta CMS'})
-    resp = client.post('/settings', json={'key': 'site_name', 'value': 'Dup'})
+    client.post('/api/settings', json={'key': 'site_name', 'value': 'Inorta CMS'})
+    resp = client.post('/api/settings', json={'key': 'site_name', 'value': 'Dup'})
     assert resp.status_code == 400
 
 
 def test_update_setting():
-    create = client.post('/settings', json={'key': 'tagline', 'value': 'Hello'})
+    create = client.post('/api/settings', json={'key': 'tagline', 'value': 'Hello'})
     sid = create.json()['id']
-    resp = client.put(f'/settings/{sid}', json={'value': 'Hello World'})
+    resp = client.put(f'/api/settings/{sid}', json={'value': 'Hello World'})
     assert resp.status_code == 200
     assert resp.json()['value'] == 'Hello World'
 
 
 def test_delete_setting():
-    create = client.post('/settings', json={'key': 'temp', 'value': 'x'})
+    create = client.post('/api/settings', json={'key': 'temp', 'value': 'x'})
     sid = create.json()['id']
-    resp = client.delete(f'/settings/{sid}')
+    resp = client.delete(f'/api/settings/{sid}')
     assert resp.status_code == 204
+    assert client.delete(f'/api/settings/{sid}').status_code == 404
+    assert client.put(f'/api/settings/{sid}', json={'value': 'y'}).status_code == 404
+
+
+def test_update_and_delete_are_single_statements():
+    sid = client.post('/api/settings', json={'key': 'fast', 'value': 'a'}).json()['id']
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0])
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        with TestingSessionLocal(expire_on_commit=False) as db:
+            updated = SettingService.update_setting(db, sid, SettingUpdate(value='b'))
+            assert updated.value == 'b'
+            assert updated.updated_at is not None
+            assert statements == ['UPDATE']
+            assert SettingService.update_setting(db, 999, SettingUpdate(value='b')) is None
+            assert SettingService.delete_setting(db, sid)
+            assert not SettingService.delete_setting(db, sid)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements == ['UPDATE', 'UPDATE', 'DELETE', 'DELETE']
+
+
+def test_decode_setting_value():
+    assert decode_setting_value('42', 'integer') == 42
+    assert decode_setting_value('1.5', 'float') == 1.5
+    assert decode_setting_value('true', 'boolean') is True
+    assert decode_setting_value('off', 'bool') is False
+    assert decode_setting_value('{"a": [1]}', 'json') == {'a': [1]}
+    assert decode_setting_value('abc', 'integer') == 'abc'
+    assert decode_setting_value(None, 'integer') is None
+
+
+def test_settings_snapshot_typed_and_grouped():
+    client.post('/api/settings', json={'key': 'site_name', 'value': 'Inorta'})
+    client.post('/api/settings', json={'key': 'per_page', 'value': '20', 'data_type': 'integer', 'category': 'reading'})
+    client.post('/api/settings', json={'key': 'comments', 'value': 'false', 'data_type': 'boolean', 'category': 'reading'})
+
+    resp = client.get('/api/settings/snapshot')
+    assert resp.status_code == 200
+    assert resp.json()['settings'] == {
+        'general': {'site_name': 'Inorta'},
+        'reading': {'per_page': 20, 'comments': False},
+    }
+
+
+def test_settings_snapshot_served_from_memory_until_write():
+    create = client.post('/api/settings', json={'key': 'per_page', 'value': '10', 'data_type': 'int'})
+    sid = create.json()['id']
+    first = client.get('/api/settings/snapshot').json()
+
+    # Out-of-band change is not seen: the snapshot is not re-read
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE settings SET value = '99' WHERE id = ?", (sid,))
+    assert client.get('/api/settings/snapshot').json() == first
+
+    # A write through the service bumps the version and invalidates it
+    client.put(f'/api/settings/{sid}', json={'value': '30'})
+    snapshot = client.get('/api/settings/snapshot').json()
+    assert snapshot['version'] > first['version']
+    assert snapshot['settings']['general']['per_page'] == 30
+
+    client.delete(f'/api/settings/{sid}')
+    assert client.get('/api/settings/snapshot').json()['settings'] == {}
+
+
+def test_update_without_returning_checks_rowcount(monkeypatch):
+    sid = client.post('/api/settings', json={'key': 'legacy', 'value': 'a'}).json()['id']
+    monkeypatch.setattr(engine.dialect, 'update_returning', False)
+    with TestingSessionLocal() as db:
+        assert SettingService.update_setting(db, sid, SettingUpdate(value='b')).value == 'b'
+        assert SettingService.update_setting(db, 999, SettingUpdate(value='b')) is None
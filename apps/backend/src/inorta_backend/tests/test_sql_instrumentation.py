@@ -0,0 +1,96 @@
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from inorta_backend.main import app
+from inorta_backend.db.instrumentation import assert_max_queries, capture_queries, statement_shape
+from inorta_backend.db.session import Base, get_db
+from inorta_backend.models.content import Content
+from inorta_backend.services.response_cache import response_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_sql_instrumentation.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def create_authored_contents(count):
+    users = [{'email': f'author{i}@example.com'} for i in range(count)]
+    ids = [item['id'] for item in client.post('/api/users/bulk', json=users).json()['items']]
+    with TestingSessionLocal() as db:
+        db.add_all(Content(title=f'Post {i}', slug=f'post-{i}', author_id=author_id) for i, author_id in enumerate(ids))
+        db.commit()
+
+
+def test_statement_shape():
+    assert statement_shape('SELECT a FROM t WHERE id IN (?, ?, ?) AND b = ?') == 'SELECT a FROM t WHERE id IN (?) AND b = ?'
+    assert statement_shape('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)') == 'INSERT INTO t (a, b) VALUES (?)'
+    assert statement_shape('SELECT *\n  FROM t WHERE id = :id_1') == 'SELECT * FROM t WHERE id = ?'
+
+
+def test_server_timing_header():
+    client.post('/api/users', json={'email': 'timed@example.com'})
+    response = client.get('/api/users')
+    timing = response.headers['server-timing']
+    assert timing.startswith('db;dur=')
+    assert '1 queries' in timing
+    assert 'app;dur=' in timing
+    assert 'n1' not in timing
+
+    # A cache hit runs no SQL
+    assert '0 queries' in client.get('/api/users').headers['server-timing']
+
+
+def test_assert_max_queries():
+    create_authored_contents(3)
+    with assert_max_queries(1):
+        client.get('/api/contents')
+    with pytest.raises(AssertionError, match='at most 0 statements'):
+        with assert_max_queries(0):
+            client.get('/api/contents?limit=5')
+
+
+def test_lazy_loads_in_a_loop_are_flagged(capsys):
+    create_authored_contents(12)
+    with capture_queries() as stats:
+        with TestingSessionLocal() as db:
+            authors = [content.author.email for content in db.query(Content)]
+    assert len(authors) == 12
+    [(shape, count)] = stats.repeated(10)
+    assert count == 12
+    assert 'FROM users WHERE users.id = ?' in shape
+
+    # The same pattern inside a request is printed and reported
+    @app.get('/api/test-n-plus-one')
+    def list_authors(db=Depends(get_db)):
+        return [content.author.email for content in db.query(Content)]
+
+    try:
+        response = client.get('/api/test-n-plus-one')
+        assert 'n1;desc="1 repeated queries"' in response.headers['server-timing']
+        assert '! Likely N+1 on GET /api/test-n-plus-one: 12 x SELECT' in capsys.readouterr().out
+    finally:
+        app.router.routes.pop()